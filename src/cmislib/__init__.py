@@ -20,8 +20,8 @@
 Define package contents so that they are easy to import.
 """
 
-from cmislib.model import CmisClient
+from cmislib.model import CmisClient, AsyncCmisClient
 from cmislib.domain import Repository, Folder
 from cmislib.cmis_services import Binding, RepositoryServiceIfc
 
-__all__ = ["Binding", "CmisClient", "RepositoryServiceIfc", "Repository", "Folder"]
+__all__ = ["AsyncCmisClient", "Binding", "CmisClient", "RepositoryServiceIfc", "Repository", "Folder"]
@@ -21,17 +21,23 @@
 Module containing the Atom Pub binding-specific objects used to work with a CMIS
 provider.
 """
+from cmislib.bulk import getObjects, createDocuments
+from cmislib.crawl import walk
+from cmislib.download import downloadTo
+from cmislib.cache import LRUCache
 from cmislib.cmis_services import Binding, RepositoryServiceIfc
 from cmislib.domain import CmisId, CmisObject, ObjectType, Property, ACL, ACE, ChangeEntry, ResultSet, Rendition
 from cmislib import messages
-from cmislib.net import RESTService as Rest
 from cmislib.exceptions import CmisException, \
     ObjectNotFoundException, InvalidArgumentException, \
     NotSupportedException
-from cmislib.util import multiple_replace, parsePropValue, parseBoolValue, toCMISValue, parseDateTimeValue, safe_quote
+from cmislib.net import FileBody
+from cmislib.util import parsePropValue, parseBoolValue, toCMISValue, parseDateTimeValue, safe_quote, \
+    getRowFactory, internName, getFileExtent
+from cmislib.workers import parallelPages, readAhead
 
 from urllib import quote
-from urlparse import urlparse, urlunparse
+from urlparse import urlparse, urlunparse, parse_qs
 import re
 import mimetypes
 from xml.parsers.expat import ExpatError
@@ -39,6 +45,7 @@ import datetime
 import StringIO
 import logging
 from xml.dom import minidom
+from xml.etree import cElementTree
 
 moduleLogger = logging.getLogger('cmislib.atompub.binding')
 
@@ -63,6 +70,7 @@ CMIS_ACL_TYPE = 'application/cmisacl+xml'
 
 # Standard rels
 DOWN_REL = 'down'
+EDIT_MEDIA_REL = 'edit-media'
 FIRST_REL = 'first'
 LAST_REL = 'last'
 NEXT_REL = 'next'
@@ -78,6 +86,32 @@ CHANGE_LOG_REL = 'http://docs.oasis-open.org/ns/cmis/link/200908/changes'
 POLICIES_REL = 'http://docs.oasis-open.org/ns/cmis/link/200908/policies'
 RENDITION_REL = 'alternate'
 
+_TEMPLATE_VARIABLE = re.compile(r'\{([^}]*)\}')
+# values of the objectbyid and objectbypath template variables that
+# aren't passed in
+_OBJECT_TEMPLATE_DEFAULTS = {'filter': '',
+                             'includeAllowableActions': 'false',
+                             'includePolicyIds': 'false',
+                             'includeRelationships': '',
+                             'includeACL': 'false',
+                             'renditionFilter': ''}
+
+# Qualified names used by FeedReader
+_ATOM_PREFIX = '{%s}' % ATOM_NS
+_CMIS_PREFIX = '{%s}' % CMIS_NS
+_CMISRA_PREFIX = '{%s}' % CMISRA_NS
+_ATOM_ENTRY = _ATOM_PREFIX + 'entry'
+_ATOM_LINK = _ATOM_PREFIX + 'link'
+_ATOM_ID = _ATOM_PREFIX + 'id'
+_ATOM_TITLE = _ATOM_PREFIX + 'title'
+_ATOM_CONTENT = _ATOM_PREFIX + 'content'
+_CMIS_PROPERTIES = _CMIS_PREFIX + 'properties'
+_CMIS_ALLOWABLE_ACTIONS = _CMIS_PREFIX + 'allowableActions'
+_CMIS_VALUE = _CMIS_PREFIX + 'value'
+_CMISRA_OBJECT = _CMISRA_PREFIX + 'object'
+_CMISRA_CHILDREN = _CMISRA_PREFIX + 'children'
+_CMISRA_NUM_ITEMS = _CMISRA_PREFIX + 'numItems'
+
 # Collection types
 QUERY_COLL = 'query'
 TYPES_COLL = 'types'
@@ -116,18 +150,19 @@ class AtomPubBinding(Binding):
         if len(self.extArgs) > 0:
             kwargs.update(self.extArgs)
 
-        resp, content = Rest().get(url,
-                                   username=username,
-                                   password=password,
-                                   **kwargs)
-        if resp['status'] != '200':
+        resp, result = self._conditionalGet(url, username, password, **kwargs)
+        if resp['status'] not in ('200', '304'):
             self._processCommonErrors(resp, url)
-            return content
-        else:
-            try:
-                return minidom.parseString(content)
-            except ExpatError:
-                raise CmisException('Could not parse server response', url)
+        return result
+
+    def _parseResponse(self, content, url):
+
+        """ Parses an Atom response into a minidom document. """
+
+        try:
+            return minidom.parseString(content)
+        except ExpatError:
+            raise CmisException('Could not parse server response', url)
 
     def delete(self, url, username, password, **kwargs):
 
@@ -143,10 +178,10 @@ class AtomPubBinding(Binding):
         if len(self.extArgs) > 0:
             kwargs.update(self.extArgs)
 
-        resp, content = Rest().delete(url,
-                                      username=username,
-                                      password=password,
-                                      **kwargs)
+        resp, content = self.getRestService().delete(url,
+                                                     username=username,
+                                                     password=password,
+                                                     **kwargs)
         if resp['status'] != '200' and resp['status'] != '204':
             self._processCommonErrors(resp, url)
             return content
@@ -168,12 +203,12 @@ class AtomPubBinding(Binding):
         if len(self.extArgs) > 0:
             kwargs.update(self.extArgs)
 
-        resp, content = Rest().post(url,
-                                    payload,
-                                    contentType,
-                                    username=username,
-                                    password=password,
-                                    **kwargs)
+        resp, content = self.getRestService().post(url,
+                                                   payload,
+                                                   contentType,
+                                                   username=username,
+                                                   password=password,
+                                                   **kwargs)
         if resp['status'] == '200':
             try:
                 return minidom.parseString(content)
@@ -203,12 +238,12 @@ class AtomPubBinding(Binding):
         if len(self.extArgs) > 0:
             kwargs.update(self.extArgs)
 
-        resp, content = Rest().put(url,
-                                   payload,
-                                   contentType,
-                                   username=username,
-                                   password=password,
-                                   **kwargs)
+        resp, content = self.getRestService().put(url,
+                                                  payload,
+                                                  contentType,
+                                                  username=username,
+                                                  password=password,
+                                                  **kwargs)
         if resp['status'] != '200' and resp['status'] != '201':
             self._processCommonErrors(resp, url)
             return content
@@ -219,6 +254,49 @@ class AtomPubBinding(Binding):
                 # This may happen and is normal
                 return None
 
+    def getFeed(self, url, username, password, **kwargs):
+
+        """
+        Does a get against the CMIS service like :meth:`get`, but instead of
+        parsing the whole response into a DOM, returns a :class:`FeedReader`
+        that parses it one entry at a time as it is read from the
+        connection. The body is never held in memory as a whole.
+        """
+
+        # merge the cmis client extended args with the ones that got passed in
+        if len(self.extArgs) > 0:
+            kwargs.update(self.extArgs)
+
+        stream = self.getRestService().getStream(url,
+                                                 username=username,
+                                                 password=password,
+                                                 **kwargs)
+        if stream.status != 200:
+            stream.close()
+            self._processCommonErrors({'status': str(stream.status)}, url)
+        return FeedReader(stream, url)
+
+    def postFeed(self, url, username, password, payload, contentType, **kwargs):
+
+        """
+        Does a post against the CMIS service like :meth:`post`, but returns
+        a :class:`FeedReader` over the response instead of a DOM.
+        """
+
+        # merge the cmis client extended args with the ones that got passed in
+        if len(self.extArgs) > 0:
+            kwargs.update(self.extArgs)
+
+        resp, content = self.getRestService().post(url,
+                                                   payload,
+                                                   contentType,
+                                                   username=username,
+                                                   password=password,
+                                                   **kwargs)
+        if resp['status'] != '200' and resp['status'] != '201':
+            self._processCommonErrors(resp, url)
+        return FeedReader(content, url)
+
 
 class RepositoryService(RepositoryServiceIfc):
 
@@ -246,13 +324,9 @@ class RepositoryService(RepositoryServiceIfc):
         Get the repository for the specified repositoryId.
         """
 
-        doc = client.binding.get(client.repositoryUrl, client.username, client.password, **client.extArgs)
-        workspaceElements = doc.getElementsByTagNameNS(APP_NS, 'workspace')
-
-        for workspaceElement in workspaceElements:
-            idElement = workspaceElement.getElementsByTagNameNS(CMIS_NS, 'repositoryId')
-            if idElement[0].childNodes[0].data == repositoryId:
-                return AtomPubRepository(self, workspaceElement)
+        for repository in self._getRepositories(client):
+            if repository.getRepositoryId() == repositoryId:
+                return repository
 
         raise ObjectNotFoundException(url=client.repositoryUrl)
 
@@ -262,16 +336,10 @@ class RepositoryService(RepositoryServiceIfc):
         Get all of the repositories provided by the server.
         """
 
-        result = client.binding.get(client.repositoryUrl, client.username, client.password, **client.extArgs)
-
-        workspaceElements = result.getElementsByTagNameNS(APP_NS, 'workspace')
-        # instantiate a Repository object using every workspace element
-        # in the service URL then ask the repository object for its ID
-        # and name, and return that back
-
+        # ask every repository object built from the workspace elements
+        # in the service URL for its ID and name, and return that back
         repositories = []
-        for node in [e for e in workspaceElements if e.nodeType == e.ELEMENT_NODE]:
-            repository = AtomPubRepository(client, node)
+        for repository in self._getRepositories(client):
             repositories.append({'repositoryId': repository.getRepositoryId(),
                                  'repositoryName': repository.getRepositoryInfo()['repositoryName']})
         return repositories
@@ -282,12 +350,27 @@ class RepositoryService(RepositoryServiceIfc):
         Returns the default repository for the server via the AtomPub binding.
         """
 
-        doc = client.binding.get(client.repositoryUrl, client.username, client.password, **client.extArgs)
+        # the repository object built from the first workspace element
+        return self._getRepositories(client)[0]
+
+    def _getRepositories(self, client):
+
+        """
+        Returns a repository object for each workspace element of the
+        client's service document. They are only rebuilt when the service
+        document changes, so the repository info, capabilities and URI
+        templates they parse lazily are parsed once.
+        """
+
+        doc = client.binding.getServiceDocument(client)
+        cached = client._repositories
+        if cached is not None and cached[0] is doc:
+            return cached[1]
         workspaceElements = doc.getElementsByTagNameNS(APP_NS, 'workspace')
-        # instantiate a Repository object with the first workspace
-        # element we find
-        repository = AtomPubRepository(client, [e for e in workspaceElements if e.nodeType == e.ELEMENT_NODE][0])
-        return repository
+        repositories = [AtomPubRepository(client, e) for e in workspaceElements
+                        if e.nodeType == e.ELEMENT_NODE]
+        client._repositories = (doc, repositories)
+        return repositories
 
 
 class UriTemplate(dict):
@@ -295,6 +378,15 @@ class UriTemplate(dict):
     """
     Simple dictionary to represent the data stored in
     a URI template entry.
+
+    The template is split into its literal text and its {variable}s once,
+    when the entry is created, so that filling it in is a simple join.
+
+    >>> template = repo.getUriTemplates()['objectbyid']
+    >>> template.variables
+    frozenset([u'id', u'filter', u'includeACL', ...])
+    >>> template.expand({'id': 'workspace://SpacesStore/123', 'filter': '*'})
+    u'http://localhost:8080/alfresco/s/cmis/arg/n?noderef=workspace://SpacesStore/123&filter=*...'
     """
 
     def __init__(self, template, templateType, mediaType):
@@ -307,10 +399,52 @@ class UriTemplate(dict):
         self['template'] = template
         self['type'] = templateType
         self['mediaType'] = mediaType
+        # literal text and variable names alternate, starting with text
+        self._parts = _TEMPLATE_VARIABLE.split(template or '')
+        self.variables = frozenset(self._parts[1::2])
+
+    def expand(self, values):
+
+        """
+        Returns the template with each variable replaced by its value in the
+        values dict. Variables that have no value are left empty.
+        """
+
+        parts = self._parts
+        url = [parts[0]]
+        for i in xrange(1, len(parts), 2):
+            value = values.get(parts[i])
+            if value is not None:
+                url.append(value)
+            url.append(parts[i + 1])
+        return u''.join(url)
+
+    def splitArgs(self, args):
+
+        """
+        Splits a dict of optional arguments into the values of the
+        template's variables and the arguments the template has no variable
+        for, which have to go on the query string. Both come back converted
+        with :func:`cmislib.util.toCMISValue`.
+        """
+
+        values = {}
+        extraArgs = {}
+        variables = self.variables
+        for k, v in args.iteritems():
+            if k in variables:
+                values[k] = toCMISValue(v)
+            else:
+                extraArgs[k] = toCMISValue(v)
+        return values, extraArgs
 
 
 class AtomPubCmisObject(CmisObject):
 
+    __slots__ = ('_cmisClient', '_repository', '_objectId', '_name', '_properties',
+                 '_allowableActions', 'xmlDoc', '_links', '_kwargs', '__weakref__')
+    logger = logging.getLogger('cmislib.atompub.binding.AtomPubCmisObject')
+
     def __init__(self, cmisClient, repository, objectId=None, xmlDoc=None, **kwargs):
         """ Constructor """
         self._cmisClient = cmisClient
@@ -320,8 +454,8 @@ class AtomPubCmisObject(CmisObject):
         self._properties = {}
         self._allowableActions = {}
         self.xmlDoc = xmlDoc
+        self._links = None
         self._kwargs = kwargs
-        self.logger = logging.getLogger('cmislib.atompub.binding.AtomPubCmisObject')
         self.logger.debug('Creating an instance of AtomPubCmisObject')
 
     def __str__(self):
@@ -347,8 +481,7 @@ class AtomPubCmisObject(CmisObject):
             else:
                 self._kwargs = kwargs
 
-        templates = self._repository.getUriTemplates()
-        template = templates['objectbyid']['template']
+        template = self._repository.getUriTemplates()['objectbyid']
 
         # Doing some refactoring here. Originally, we snagged the template
         # and then "filled in" the template based on the args passed in.
@@ -359,34 +492,28 @@ class AtomPubCmisObject(CmisObject):
         # passed in, those will get tacked on to the query string as
         # "additional" options.
 
-        params = {'{id}': self.getObjectId(),
-                  '{filter}': '',
-                  '{includeAllowableActions}': 'false',
-                  '{includePolicyIds}': 'false',
-                  '{includeRelationships}': '',
-                  '{includeACL}': 'false',
-                  '{renditionFilter}': ''}
-
-        options = {}
-        addOptions = {}  # args specified, but not in the template
-        for k, v in self._kwargs.items():
-            pKey = "{" + k + "}"
-            if template.find(pKey) >= 0:
-                options[pKey] = toCMISValue(v)
-            else:
-                addOptions[k] = toCMISValue(v)
+        params = dict(_OBJECT_TEMPLATE_DEFAULTS)
+        params['id'] = self.getObjectId()
+
+        # args specified, but not in the template, go in addOptions
+        options, addOptions = template.splitArgs(self._kwargs)
 
         # merge the templated args with the default params
         params.update(options)
 
         # fill in the template
-        byObjectIdUrl = multiple_replace(params, template)
+        byObjectIdUrl = template.expand(params)
 
-        self.xmlDoc = self._cmisClient.binding.get(byObjectIdUrl.encode('utf-8'),
-                                                   self._cmisClient.username,
-                                                   self._cmisClient.password,
-                                                   **addOptions)
-        self._initData()
+        xmlDoc = self._cmisClient.binding.get(byObjectIdUrl.encode('utf-8'),
+                                              self._cmisClient.username,
+                                              self._cmisClient.password,
+                                              **addOptions)
+        # an unchanged object comes back as the document already parsed,
+        # so what was read from it is still good
+        if xmlDoc is not self.xmlDoc:
+            self.xmlDoc = xmlDoc
+            self._initData()
+            self._checkChangeToken()
 
         # if a returnVersion arg was passed in, it is possible we got back
         # a different object ID than the value we started with, so it needs
@@ -406,6 +533,28 @@ class AtomPubCmisObject(CmisObject):
         self._name = None
         self._allowableActions = {}
 
+    def _checkChangeToken(self):
+
+        """
+        Drops the cached copy of this object from the client's objectCache
+        if it has another cmis:changeToken than the one just fetched.
+        """
+
+        objectCache = self._cmisClient.objectCache
+        if objectCache is not None:
+            properties = self.getProperties()
+            objectCache.checkChangeToken(self._repository, properties['cmis:objectId'],
+                                         properties.get('cmis:changeToken'))
+
+    def _invalidateCache(self):
+
+        """
+        Drops this object from the client's objectCache, if it has one.
+        """
+
+        if self._cmisClient.objectCache is not None:
+            self._cmisClient.objectCache.invalidate(self._repository, self.getObjectId())
+
     def getObjectId(self):
 
         """
@@ -441,14 +590,8 @@ class AtomPubCmisObject(CmisObject):
         if parentUrl is None:
             raise NotSupportedException('Root folder does not support getObjectParents')
 
-        # invoke the URL
-        result = self._cmisClient.binding.get(parentUrl.encode('utf-8'),
-                                              self._cmisClient.username,
-                                              self._cmisClient.password,
-                                              **kwargs)
-
-        # return the result set
-        return AtomPubResultSet(self._cmisClient, self._repository, result)
+        # invoke the URL and return the result set
+        return getResultSet(self._cmisClient, self._repository, parentUrl, **kwargs)
 
     def getPaths(self):
         """
@@ -510,17 +653,24 @@ class AtomPubCmisObject(CmisObject):
         canGetProperties:True
         """
 
-        if self._allowableActions == {}:
-            self.reload(includeAllowableActions=True)
-            allowElements = self.xmlDoc.getElementsByTagNameNS(CMIS_NS, 'allowableActions')
+        allowableActions = self._allowableActions
+        if allowableActions == {}:
+            allowElements = []
+            if self.xmlDoc is not None:
+                allowElements = self.xmlDoc.getElementsByTagNameNS(CMIS_NS, 'allowableActions')
+            if not allowElements:
+                self.reload(includeAllowableActions=True)
+                allowElements = self.xmlDoc.getElementsByTagNameNS(CMIS_NS, 'allowableActions')
             assert len(allowElements) == 1, "Expected response to have exactly one allowableActions element"
             allowElement = allowElements[0]
+            allowableActions = {}
             for node in [e for e in allowElement.childNodes if e.nodeType == e.ELEMENT_NODE]:
                 actionName = node.localName
                 actionValue = parseBoolValue(node.childNodes[0].data)
-                self._allowableActions[actionName] = actionValue
+                allowableActions[actionName] = actionValue
+            self._allowableActions = allowableActions
 
-        return self._allowableActions
+        return allowableActions
 
     def getTitle(self):
 
@@ -559,15 +709,20 @@ class AtomPubCmisObject(CmisObject):
         """
 
         # TODO implement filter
-        if self._properties == {}:
+        properties = self._properties
+        if properties == {}:
             if self.xmlDoc is None:
                 self.reload()
-            propertiesElement = self.xmlDoc.getElementsByTagNameNS(CMIS_NS, 'properties')[0]
+            # build the dict before publishing it so that other threads
+            # sharing this object never see it half-populated
+            xmlDoc = self.xmlDoc
+            properties = {}
+            propertiesElement = xmlDoc.getElementsByTagNameNS(CMIS_NS, 'properties')[0]
             # cpattern = re.compile(r'^property([\w]*)')
             for node in [e for e in propertiesElement.childNodes if e.nodeType == e.ELEMENT_NODE and e.namespaceURI == CMIS_NS]:
                 # propertyId, propertyString, propertyDateTime
                 # propertyType = cpattern.search(node.localName).groups()[0]
-                propertyName = node.attributes['propertyDefinitionId'].value
+                propertyName = internName(node.attributes['propertyDefinitionId'].value)
                 if node.childNodes and \
                    node.getElementsByTagNameNS(CMIS_NS, 'value')[0] and \
                    node.getElementsByTagNameNS(CMIS_NS, 'value')[0].childNodes:
@@ -587,17 +742,18 @@ class AtomPubCmisObject(CmisObject):
                                 pass
                 else:
                     propertyValue = None
-                self._properties[propertyName] = propertyValue
+                properties[propertyName] = propertyValue
 
-            for node in [e for e in self.xmlDoc.childNodes if e.nodeType == e.ELEMENT_NODE and e.namespaceURI == CMISRA_NS]:
+            for node in [e for e in xmlDoc.childNodes if e.nodeType == e.ELEMENT_NODE and e.namespaceURI == CMISRA_NS]:
                 propertyName = node.nodeName
                 if node.childNodes:
                     propertyValue = node.firstChild.nodeValue
                 else:
                     propertyValue = None
-                self._properties[propertyName] = propertyValue
+                properties[propertyName] = propertyValue
+            self._properties = properties
 
-        return self._properties
+        return properties
 
     def getName(self):
 
@@ -653,13 +809,17 @@ class AtomPubCmisObject(CmisObject):
 
         self.logger.debug('xmlEntryDoc:' + xmlEntryDoc.toxml())
 
-        # do a PUT of the entry
-        updatedXmlDoc = self._cmisClient.binding.put(selfUrl.encode('utf-8'),
-                                                     self._cmisClient.username,
-                                                     self._cmisClient.password,
-                                                     xmlEntryDoc.toxml(encoding='utf-8'),
-                                                     ATOM_XML_TYPE,
-                                                     **args)
+        # do a PUT of the entry, and forget any cached copy even if the
+        # update is refused for a stale change token
+        try:
+            updatedXmlDoc = self._cmisClient.binding.put(selfUrl.encode('utf-8'),
+                                                         self._cmisClient.username,
+                                                         self._cmisClient.password,
+                                                         xmlEntryDoc.toxml(encoding='utf-8'),
+                                                         ATOM_XML_TYPE,
+                                                         **args)
+        finally:
+            self._invalidateCache()
 
         # reset the xmlDoc for this object with what we got back from
         # the PUT, then call initData we dont' want to call
@@ -684,6 +844,9 @@ class AtomPubCmisObject(CmisObject):
 
         args = {"sourceFolderId": sourceFolder.id}
 
+        if self.xmlDoc is None:
+            self.reload()
+
         # post the Atom entry
         self._cmisClient.binding.post(postUrl.encode('utf-8'),
                                       self._cmisClient.username,
@@ -691,6 +854,7 @@ class AtomPubCmisObject(CmisObject):
                                       self.xmlDoc.toxml(encoding='utf-8'),
                                       ATOM_XML_ENTRY_TYPE,
                                       **args)
+        self._invalidateCache()
 
     def delete(self, **kwargs):
 
@@ -711,6 +875,7 @@ class AtomPubCmisObject(CmisObject):
                                         self._cmisClient.username,
                                         self._cmisClient.password,
                                         **kwargs)
+        self._invalidateCache()
 
     def applyPolicy(self, policyId):
 
@@ -786,13 +951,8 @@ class AtomPubCmisObject(CmisObject):
         url = self._getLink(RELATIONSHIPS_REL)
         assert url is not None, 'Could not determine relationships URL'
 
-        result = self._cmisClient.binding.get(url.encode('utf-8'),
-                                              self._cmisClient.username,
-                                              self._cmisClient.password,
-                                              **kwargs)
-
         # return the result set
-        return AtomPubResultSet(self._cmisClient, self._repository, result)
+        return getResultSet(self._cmisClient, self._repository, url, **kwargs)
 
     def removePolicy(self, policyId):
 
@@ -888,9 +1048,14 @@ class AtomPubCmisObject(CmisObject):
 
         """
         Returns the HREF attribute of an Atom link element for the
-        specified rel.
+        specified rel. An object read from a feed entry looks in the
+        entry's links before reloading.
         """
 
+        if self.xmlDoc is None and self._links is not None:
+            for link in self._links:
+                if link.get('rel') == rel and (not ltype or ltype.match(link.get('type') or '')):
+                    return link.get('href')
         if self.xmlDoc is None:
             self.reload()
         linkElements = self.xmlDoc.getElementsByTagNameNS(ATOM_NS, 'link')
@@ -953,6 +1118,7 @@ class AtomPubRepository(object):
         self._permMap = {}
         self._permissions = None
         self._propagation = None
+        self.typeCache = LRUCache(cmisClient.typeCacheSize, cmisClient.typeCacheTtl)
         self.logger = logging.getLogger('cmislib.atompub.binding.AtomPubRepository')
         self.logger.debug('Creating an instance of AtomPubRepository')
 
@@ -963,12 +1129,27 @@ class AtomPubRepository(object):
     def reload(self):
         """
         This method will re-fetch the repository's XML data from the CMIS
-        repository.
+        repository, such as its latestChangeLogToken. The service document
+        may list several workspaces; the one of this repository is picked
+        by its repositoryId.
         """
         self.logger.debug('Reload called on object')
-        self.xmlDoc = self._cmisClient.binding.get(self._cmisClient.repositoryUrl.encode('utf-8'),
-                                                   self._cmisClient.username,
-                                                   self._cmisClient.password)
+        repositoryId = None
+        if self.xmlDoc is not None:
+            repositoryId = self.getRepositoryId()
+        doc = self._cmisClient.binding.get(self._cmisClient.repositoryUrl.encode('utf-8'),
+                                           self._cmisClient.username,
+                                           self._cmisClient.password)
+        workspace = None
+        for element in doc.getElementsByTagNameNS(APP_NS, 'workspace'):
+            idElements = element.getElementsByTagNameNS(CMIS_NS, 'repositoryId')
+            if repositoryId is None or \
+                    (idElements and idElements[0].firstChild.data == repositoryId):
+                workspace = element
+                break
+        if workspace is None:
+            raise ObjectNotFoundException(url=self._cmisClient.repositoryUrl)
+        self.xmlDoc = workspace
         self._initData()
 
     def _initData(self):
@@ -1194,10 +1375,12 @@ class AtomPubRepository(object):
         productName:Alfresco Repository (Community)
         """
 
-        if not self._repositoryInfo:
+        repoInfo = self._repositoryInfo
+        if not repoInfo:
             if self.xmlDoc is None:
                 self.reload()
             repoInfoElement = self.xmlDoc.getElementsByTagNameNS(CMISRA_NS, 'repositoryInfo')[0]
+            repoInfo = {}
             for node in repoInfoElement.childNodes:
                 if node.nodeType == node.ELEMENT_NODE and \
                    node.localName != 'capabilities' and \
@@ -1208,8 +1391,9 @@ class AtomPubRepository(object):
                         data = None
                     except AttributeError:
                         data = None
-                    self._repositoryInfo[node.localName] = data
-        return self._repositoryInfo
+                    repoInfo[node.localName] = data
+            self._repositoryInfo = repoInfo
+        return repoInfo
 
     def getCapabilities(self):
 
@@ -1236,15 +1420,32 @@ class AtomPubRepository(object):
         Changes:None
         """
 
-        if not self._capabilities:
+        caps = self._capabilities
+        if not caps:
             if self.xmlDoc is None:
                 self.reload()
             capabilitiesElement = self.xmlDoc.getElementsByTagNameNS(CMIS_NS, 'capabilities')[0]
+            caps = {}
             for node in [e for e in capabilitiesElement.childNodes if e.nodeType == e.ELEMENT_NODE]:
                 key = node.localName.replace('capability', '')
                 value = parseBoolValue(node.childNodes[0].data)
-                self._capabilities[key] = value
-        return self._capabilities
+                caps[key] = value
+            self._capabilities = caps
+        return caps
+
+    def crawl(self, rootPath='/', maxWorkers=8, maxDepth=None, onError=None, **kwargs):
+
+        """
+        Walks the folder at rootPath, the root folder by default, with
+        :func:`cmislib.crawl.walk`.
+
+        >>> for path, obj in repo.crawl('/Sites', maxWorkers=16):
+        ...     index(path, obj)
+        """
+
+        folder = self.getObjectByPath(rootPath)
+        return walk(folder, rootPath, maxWorkers=maxWorkers, maxDepth=maxDepth,
+                    onError=onError, **kwargs)
 
     def getRootFolder(self):
         """
@@ -1428,13 +1629,53 @@ class AtomPubRepository(object):
         """
         Returns an :class:`ObjectType` object for the specified object type id.
 
+        Type definitions are kept in the repository's typeCache, a
+        :class:`cmislib.cache.LRUCache`, so asking for the same type again
+        does not go back to the server until the cached definition expires
+        or is invalidated.
+
         >>> folderType = repo.getTypeDefinition('cmis:folder')
         """
 
-        objectType = AtomPubObjectType(self._cmisClient, self, typeId)
-        objectType.reload()
+        objectType = self.typeCache.get(typeId)
+        if objectType is None:
+            objectType = AtomPubObjectType(self._cmisClient, self, typeId)
+            objectType.reload()
+            self.typeCache.put(typeId, objectType)
         return objectType
 
+    def invalidateTypeCache(self, typeId=None):
+
+        """
+        Drops the cached definition of the specified type, or of every type
+        if no typeId is given, so that the next :meth:`getTypeDefinition`
+        fetches it from the server again. Call this after changing a type.
+
+        >>> repo.invalidateTypeCache('cmis:document')
+        """
+
+        self.typeCache.invalidate(typeId)
+
+    def warmTypeCache(self, typeId=None, depth=None):
+
+        """
+        Fills the type cache with the definitions of the descendants of the
+        specified type, or of every type in the repository if no typeId is
+        given, using a single :meth:`getTypeDescendants` call. Returns the
+        number of types cached.
+
+        >>> repo.warmTypeCache()
+        42
+        """
+
+        kwargs = {'includePropertyDefinitions': 'true'}
+        if depth is not None:
+            kwargs['depth'] = depth
+        types = self.getTypeDescendants(typeId, **kwargs)
+        for objectType in types:
+            self.typeCache.put(objectType.getTypeId(), objectType)
+        return len(types)
+
     def getLink(self, rel):
         """
         Returns the HREF attribute of an Atom link element for the
@@ -1528,9 +1769,35 @@ class AtomPubRepository(object):
          - renditionFilter
          - includeACL
          - includeAllowableActions
+
+        If the client has an objectCache, see
+        :class:`cmislib.cache.ObjectCache`, and no optional argument is
+        passed, the object comes from the cache when it is there, with its
+        properties and allowable actions. When it isn't, it is fetched with
+        includeAllowableActions, so that they can be cached too.
+        """
+
+        objectCache = self._cmisClient.objectCache
+        if objectCache is None or kwargs:
+            return getSpecializedObject(AtomPubCmisObject(self._cmisClient, self, CmisId(objectId), **kwargs), **kwargs)
+        entry = objectCache.get(self, objectId)
+        if entry is not None:
+            return getSpecializedObjectFromEntry(self._cmisClient, self, entry)
+        obj = getSpecializedObject(AtomPubCmisObject(self._cmisClient, self, CmisId(objectId),
+                                                     includeAllowableActions=True))
+        objectCache.put(self, obj)
+        return obj
+
+    def getObjects(self, objectIds, chunkSize=100, maxWorkers=4, **kwargs):
+
+        """
+        Returns the objects with the specified object IDs, in order, fetched
+        in bulk by :func:`cmislib.bulk.getObjects`.
+
+        >>> docs = repo.getObjects(objectIds, filter='cmis:name')
         """
 
-        return getSpecializedObject(AtomPubCmisObject(self._cmisClient, self, CmisId(objectId), **kwargs), **kwargs)
+        return getObjects(self, objectIds, chunkSize, maxWorkers, **kwargs)
 
     def getObjectByPath(self, path, **kwargs):
 
@@ -1544,33 +1811,39 @@ class AtomPubRepository(object):
         The following optional arguments are not currently supported:
          - filter
          - includeAllowableActions
+
+        Like :meth:`getObject`, it uses the client's objectCache when no
+        optional argument is passed.
         """
 
+        objectCache = self._cmisClient.objectCache
+        if objectCache is not None and not kwargs:
+            entry = objectCache.getByPath(self, path)
+            if entry is not None:
+                return getSpecializedObjectFromEntry(self._cmisClient, self, entry)
+            obj = self._getObjectByPath(path, includeAllowableActions=True)
+            objectCache.put(self, obj, path)
+            return obj
+        return self._getObjectByPath(path, **kwargs)
+
+    def _getObjectByPath(self, path, **kwargs):
+
+        """ Fetches the object at the specified path. """
+
         # get the uritemplate
-        template = self.getUriTemplates()['objectbypath']['template']
+        template = self.getUriTemplates()['objectbypath']
 
         # fill in the template with the path provided
-        params = {'{path}': safe_quote(path),
-                  '{filter}': '',
-                  '{includeAllowableActions}': 'false',
-                  '{includePolicyIds}': 'false',
-                  '{includeRelationships}': '',
-                  '{includeACL}': 'false',
-                  '{renditionFilter}': ''}
-
-        options = {}
-        addOptions = {}  # args specified, but not in the template
-        for k, v in kwargs.items():
-            pKey = "{" + k + "}"
-            if template.find(pKey) >= 0:
-                options[pKey] = toCMISValue(v)
-            else:
-                addOptions[k] = toCMISValue(v)
+        params = dict(_OBJECT_TEMPLATE_DEFAULTS)
+        params['path'] = safe_quote(path)
+
+        # args specified, but not in the template, go in addOptions
+        options, addOptions = template.splitArgs(kwargs)
 
         # merge the templated args with the default params
         params.update(options)
 
-        byObjectPathUrl = multiple_replace(params, template)
+        byObjectPathUrl = template.expand(params)
 
         # do a GET against the URL
         result = self._cmisClient.binding.get(byObjectPathUrl.encode('utf-8'),
@@ -1583,7 +1856,7 @@ class AtomPubRepository(object):
         assert(len(entryElements) == 1), "Expected entry element in result from calling %s" % byObjectPathUrl
         return getSpecializedObject(AtomPubCmisObject(self._cmisClient, self, xmlDoc=entryElements[0], **kwargs), **kwargs)
 
-    def query(self, statement, **kwargs):
+    def query(self, statement, rowFormat=None, **kwargs):
 
         """
         Returns a list of :class:`CmisObject` objects based on the CMIS
@@ -1624,6 +1897,17 @@ class AtomPubRepository(object):
         5
         >>> rs.hasNext()
         True
+
+        Reports that only need a few columns can ask for plain rows instead
+        of objects with rowFormat. 'dict' rows map property ids to values
+        and 'tuple' rows hold the values of the select list, in order. The
+        rows are parsed as they are read and keep nothing of the response
+        alive, but only the one page of results selected by maxItems and
+        skipCount is returned.
+
+        >>> q = 'select cmis:objectId, cmis:name from cmis:document'
+        >>> for objectId, name in repo.query(q, rowFormat='tuple'):
+        ...     print name
         """
 
         if self.xmlDoc is None:
@@ -1635,8 +1919,25 @@ class AtomPubRepository(object):
         # build the CMIS query XML that we're going to POST
         xmlDoc = self._getQueryXmlDoc(statement, **kwargs)
 
+        if rowFormat is not None:
+            makeRow = getRowFactory(statement, rowFormat)
+            reader = self._cmisClient.binding.postFeed(queryUrl.encode('utf-8'),
+                                                       self._cmisClient.username,
+                                                       self._cmisClient.password,
+                                                       xmlDoc.toxml(encoding='utf-8'),
+                                                       CMIS_QUERY_TYPE)
+            return (makeRow(entry['properties']) for entry in reader)
+
         # do the POST
         # print 'posting:%s' % xmlDoc.toxml(encoding='utf-8')
+        if not self._cmisClient.minidomFeeds:
+            reader = self._cmisClient.binding.postFeed(queryUrl.encode('utf-8'),
+                                                       self._cmisClient.username,
+                                                       self._cmisClient.password,
+                                                       xmlDoc.toxml(encoding='utf-8'),
+                                                       CMIS_QUERY_TYPE)
+            return AtomPubResultSet(self._cmisClient, self, reader=reader)
+
         result = self._cmisClient.binding.post(queryUrl.encode('utf-8'),
                                                self._cmisClient.username,
                                                self._cmisClient.password,
@@ -1646,6 +1947,33 @@ class AtomPubRepository(object):
         # return the result set
         return AtomPubResultSet(self._cmisClient, self, result)
 
+    def iterQuery(self, statement, pageSize=100, maxWorkers=4, **kwargs):
+
+        """
+        Returns a generator over every result of the query, in order, like
+        query(statement).iterAll() does. Instead of fetching one page after
+        the other it learns the total number of results from the first page
+        and then fetches the skipCount windows of pageSize results after it
+        on up to maxWorkers threads at once. Windows the server returns
+        short, because it caps maxItems for instance, are completed page by
+        page. See :func:`cmislib.workers.parallelPages`.
+
+        Results that are added or removed while the query runs can shift
+        the windows, so use an ORDER BY on a stable property for exports.
+        The optional arguments are those of :meth:`query`, except maxItems
+        and skipCount.
+
+        >>> q = "select * from cmis:document order by cmis:objectId"
+        >>> for doc in repo.iterQuery(q, pageSize=500, maxWorkers=8):
+        ...     export(doc)
+        """
+
+        def fetchPage(skipCount, maxItems):
+            return self.query(statement, maxItems=str(maxItems),
+                              skipCount=str(skipCount), **kwargs)
+
+        return parallelPages(fetchPage, pageSize, maxWorkers)
+
     def getContentChanges(self, **kwargs):
 
         """
@@ -1763,6 +2091,13 @@ class AtomPubRepository(object):
         >>> doc.getTitle()
         u'sample-a.pdf'
 
+        Content larger than the client's mediaUploadThreshold, 16 MiB by
+        default, is not embedded base64 encoded in the Atom entry. The
+        document is created without content, and the content is then sent
+        as is with :meth:`Document.setContentStream`. If that fails, the
+        document is deleted again. The content file must be seekable for
+        this, content that isn't is always embedded.
+
         The following optional arguments are not currently supported:
          - versioningState
          - policies
@@ -1795,21 +2130,61 @@ class AtomPubRepository(object):
         elif not isinstance(properties['cmis:objectTypeId'], CmisId):
             properties['cmis:objectTypeId'] = CmisId(properties['cmis:objectTypeId'])
 
-        # build the Atom entry
-        xmlDoc = getEntryXmlDoc(self, None, properties, contentFile,
-                                contentType, contentEncoding)
+        # large content is sent on its own once the document exists
+        threshold = getattr(self._cmisClient, 'mediaUploadThreshold', None)
+        mediaFile = None
+        if contentFile and threshold is not None:
+            # a file that can't seek comes back read into memory
+            contentFile, start, size = getFileExtent(contentFile)
+            if size > threshold:
+                mediaFile = contentFile
+                contentFile = None
+
+        # build the Atom entry, which streams the content
+        body = getEntryBody(self, None, properties, contentFile,
+                            contentType, contentEncoding)
 
         # post the Atom entry
         result = self._cmisClient.binding.post(postUrl.encode('utf-8'),
                                                self._cmisClient.username,
                                                self._cmisClient.password,
-                                               xmlDoc.toxml(encoding='utf-8'),
+                                               body,
                                                ATOM_XML_ENTRY_TYPE)
 
         # what comes back is the XML for the new document,
         # so use it to instantiate a new document
         # then return it
-        return AtomPubDocument(self._cmisClient, self, xmlDoc=result)
+        doc = AtomPubDocument(self._cmisClient, self, xmlDoc=result)
+        if mediaFile is None:
+            return doc
+
+        self.logger.debug('Sending the content of %s to its edit-media link', name)
+        try:
+            updated = doc.setContentStream(mediaFile, contentType)
+        except Exception:
+            # don't leave a document without its content behind
+            try:
+                doc.delete()
+            except CmisException:
+                self.logger.debug('Could not delete %s after its content failed', name)
+            raise
+        if updated.xmlDoc is not None:
+            return updated
+        doc.reload()
+        return doc
+
+    def createDocuments(self, items, parentFolder=None, maxWorkers=4, maxRetries=3,
+                        retryDelay=1.0, callback=None):
+
+        """
+        Creates a document for each item of items, as
+        :func:`cmislib.bulk.createDocuments` does.
+
+        >>> results = repo.createDocuments(items, folder, maxWorkers=16)
+        """
+
+        return createDocuments(self, items, parentFolder, maxWorkers, maxRetries,
+                               retryDelay, callback)
 
     def createDocumentFromSource(self,
                                  sourceId,
@@ -1887,13 +2262,15 @@ class AtomPubRepository(object):
         u'http://localhost:8080/alfresco/s/cmis/type/{id}'
         """
 
-        if self._uriTemplates == {}:
+        uriTemplates = self._uriTemplates
+        if uriTemplates == {}:
 
             if self.xmlDoc is None:
                 self.reload()
 
             uriTemplateElements = self.xmlDoc.getElementsByTagNameNS(CMISRA_NS, 'uritemplate')
 
+            uriTemplates = {}
             for uriTemplateElement in uriTemplateElements:
                 template = None
                 templType = None
@@ -1907,11 +2284,12 @@ class AtomPubRepository(object):
                     elif node.localName == 'mediatype':
                         mediatype = node.childNodes[0].data
 
-                self._uriTemplates[templType] = UriTemplate(template,
-                                                            templType,
-                                                            mediatype)
+                uriTemplates[templType] = UriTemplate(template,
+                                                      templType,
+                                                      mediatype)
+            self._uriTemplates = uriTemplates
 
-        return self._uriTemplates
+        return uriTemplates
 
     def getCollection(self, collectionType, **kwargs):
 
@@ -1945,13 +2323,8 @@ class AtomPubRepository(object):
         elif collectionType == TYPES_COLL:
             return self.getTypeDefinitions()
 
-        result = self._cmisClient.binding.get(self.getCollectionLink(collectionType).encode('utf-8'),
-                                              self._cmisClient.username,
-                                              self._cmisClient.password,
-                                              **kwargs)
-
         # return the result set
-        return AtomPubResultSet(self._cmisClient, self, result)
+        return getResultSet(self._cmisClient, self, self.getCollectionLink(collectionType), **kwargs)
 
     def getCollectionLink(self, collectionType):
 
@@ -2016,16 +2389,25 @@ class AtomPubResultSet(ResultSet):
 
     """
     Represents a paged result set. In CMIS, this is most often an Atom feed.
+
+    The feed is either a parsed DOM, xmlDoc, or a :class:`FeedReader`,
+    reader. A reader is read right away, keeping only the results and the
+    feed's links and number of items, and the pages the result set moves
+    to are read with a :class:`FeedReader` as well.
     """
 
-    def __init__(self, cmisClient, repository, xmlDoc):
+    def __init__(self, cmisClient, repository, xmlDoc=None, reader=None):
         """ Constructor """
         self._cmisClient = cmisClient
         self._repository = repository
         self._xmlDoc = xmlDoc
         self._results = []
+        self._links = None
+        self._numItems = None
         self.logger = logging.getLogger('cmislib.atompub.binding.AtomPubResultSet')
         self.logger.debug('Creating an instance of AtomPubResultSet')
+        if reader is not None:
+            self._readFeed(reader)
 
     def __iter__(self):
         """ Iterator for the result set """
@@ -2043,6 +2425,10 @@ class AtomPubResultSet(ResultSet):
         """
         Returns the link found in the feed's XML for the specified rel.
         """
+        if self._links is not None:
+            return self._links.get(rel)
+        if not self._xmlDoc:
+            return None
         linkElements = self._xmlDoc.getElementsByTagNameNS(ATOM_NS, 'link')
 
         for linkElement in linkElements:
@@ -2064,6 +2450,12 @@ class AtomPubResultSet(ResultSet):
         """
         link = self._getLink(rel)
         if link:
+            if self._links is not None:
+                self._readFeed(self._cmisClient.binding.getFeed(link.encode('utf-8'),
+                                                                self._cmisClient.username,
+                                                                self._cmisClient.password))
+                return self._results
+
             result = self._cmisClient.binding.get(link.encode('utf-8'),
                                                   self._cmisClient.username,
                                                   self._cmisClient.password)
@@ -2073,6 +2465,17 @@ class AtomPubResultSet(ResultSet):
             self._results = []
             return self.getResults()
 
+    def _readFeed(self, reader):
+        """
+        Reads the results, links and number of items of a page from a
+        :class:`FeedReader`.
+        """
+        self._xmlDoc = None
+        self._results = [getSpecializedObjectFromEntry(self._cmisClient, self._repository, entry)
+                         for entry in reader]
+        self._links = reader.links
+        self._numItems = reader.numItems
+
     def reload(self):
 
         """
@@ -2127,6 +2530,83 @@ class AtomPubResultSet(ResultSet):
                 return True
         return False
 
+    def iterPages(self, limit=None, prefetch=0):
+
+        """
+        Returns a generator that yields the results one page, a list, at a
+        time. It starts with the page this result set holds and follows the
+        next links until there are no more pages or until limit results have
+        been returned. The pages after the first are parsed incrementally
+        with :class:`FeedReader` and are not kept around once the generator
+        moves on, so memory use is bounded by the page size rather than by
+        the total number of results. The result set itself stays on its
+        current page.
+
+        If prefetch is greater than zero, the pages are fetched by a
+        background thread that stays up to that many pages ahead of the
+        caller, so that the server round-trip for the next page overlaps
+        with the processing of the current one. See
+        :func:`cmislib.workers.readAhead`.
+
+        >>> rs = repo.query("select * from cmis:document", maxItems=200)
+        >>> for page in rs.iterPages():
+        ...     export(page)
+        >>> for page in rs.iterPages(prefetch=2):
+        ...     export(page)
+        """
+
+        if prefetch > 0:
+            return readAhead(self._iterPages(limit), prefetch)
+        return self._iterPages(limit)
+
+    def _iterPages(self, limit):
+
+        """ Generator behind :meth:`iterPages`. """
+
+        count = 0
+        page = self.getResults()
+        nextLink = self._getLink(NEXT_REL)
+        while True:
+            if limit is not None:
+                page = page[:max(limit - count, 0)]
+            if not page:
+                return
+            count += len(page)
+            yield page
+            if not nextLink or (limit is not None and count >= limit):
+                return
+            page, nextLink = self._fetchPage(nextLink)
+
+    def iterAll(self, limit=None, prefetch=0):
+
+        """
+        Returns a generator over every result of every page, fetching the
+        pages lazily, and in the background if prefetch is set, as
+        :meth:`iterPages` does. Stops after limit results if a limit is
+        given.
+
+        >>> for doc in rs.iterAll(limit=100000):
+        ...     print doc.name
+        """
+
+        for page in self.iterPages(limit, prefetch):
+            for result in page:
+                yield result
+
+    def _fetchPage(self, link):
+
+        """
+        Fetches the page at the specified link without touching this result
+        set. Returns the list of results and the page's next link.
+        """
+
+        reader = self._cmisClient.binding.getFeed(link.encode('utf-8'),
+                                                  self._cmisClient.username,
+                                                  self._cmisClient.password)
+        page = [getSpecializedObjectFromEntry(self._cmisClient, self._repository, entry)
+                for entry in reader]
+        return page, reader.links.get(NEXT_REL)
+
     def getFirst(self):
 
         """
@@ -2210,6 +2690,42 @@ class AtomPubResultSet(ResultSet):
         else:
             return False
 
+    def getChangeLogToken(self):
+
+        """
+        Returns the change log token to pass to
+        :meth:`Repository.getContentChanges` for the changes that follow
+        the ones on this page, or None if the server didn't say.
+
+        >>> rs = repo.getContentChanges(changeLogToken='2692', maxItems=100)
+        >>> rs.getChangeLogToken()
+        u'2792'
+        """
+
+        # the server puts the token in the query of the next link
+        nextLink = self._getLink(NEXT_REL)
+        if nextLink:
+            values = parse_qs(urlparse(nextLink).query).get('changeLogToken')
+            if values:
+                return values[0]
+
+    def getNumItems(self):
+
+        """
+        Returns the total number of results the server reported for the
+        query or listing behind this result set, or None if it didn't.
+
+        >>> resultSet.getNumItems()
+        3
+        """
+
+        if self._links is not None:
+            return self._numItems
+        if self._xmlDoc:
+            numItemsElements = self._xmlDoc.getElementsByTagNameNS(CMISRA_NS, 'numItems')
+            if numItemsElements and numItemsElements[0].childNodes:
+                return int(numItemsElements[0].childNodes[0].data)
+
     def hasPrev(self):
 
         """
@@ -2262,6 +2778,8 @@ class AtomPubDocument(AtomPubCmisObject):
     An object typically associated with file content.
     """
 
+    __slots__ = ()
+
     def checkout(self):
 
         """
@@ -2405,7 +2923,7 @@ class AtomPubDocument(AtomPubCmisObject):
 
         if not properties and not contentFile:
             # Build an empty ATOM entry
-            entryXmlDoc = getEmptyXmlDoc()
+            body = getEmptyXmlDoc().toxml(encoding='utf-8')
         else:
             # the getEntryXmlDoc function may need the object type
             objectTypeId = None
@@ -2414,7 +2932,7 @@ class AtomPubDocument(AtomPubCmisObject):
                 self.logger.debug('This object type is:%s', objectTypeId)
 
             # build the entry based on the properties provided
-            entryXmlDoc = getEntryXmlDoc(
+            body = getEntryBody(
                 self._repository, objectTypeId, properties, contentFile, contentType)
 
         # Get the self link
@@ -2423,7 +2941,7 @@ class AtomPubDocument(AtomPubCmisObject):
         result = self._cmisClient.binding.put(url.encode('utf-8'),
                                               self._cmisClient.username,
                                               self._cmisClient.password,
-                                              entryXmlDoc.toxml(encoding='utf-8'),
+                                              body,
                                               ATOM_XML_TYPE,
                                               **kwargs)
 
@@ -2489,36 +3007,43 @@ class AtomPubDocument(AtomPubCmisObject):
         # get the version history link
         versionsUrl = self._getLink(VERSION_HISTORY_REL)
 
-        # invoke the URL
-        result = self._cmisClient.binding.get(versionsUrl.encode('utf-8'),
-                                              self._cmisClient.username,
-                                              self._cmisClient.password,
-                                              **kwargs)
-
-        # return the result set
-        return AtomPubResultSet(self._cmisClient, self._repository, result)
+        # invoke the URL and return the result set
+        return getResultSet(self._cmisClient, self._repository, versionsUrl, **kwargs)
 
-    def getContentStream(self):
+    def getContentStream(self, offset=None, length=None):
 
         """
-        Returns the CMIS service response from invoking the 'enclosure' link.
+        Returns the CMIS service response from invoking the 'enclosure' link,
+        as a :class:`cmislib.net.ContentStream` that reads the content from
+        the connection as it is consumed rather than holding it in memory.
 
         >>> doc.getName()
         u'sample-b.pdf'
         >>> o = open('tmp.pdf', 'wb')
         >>> result = doc.getContentStream()
-        >>> o.write(result.read())
+        >>> result.copyTo(o)
+        117248
         >>> result.close()
         >>> o.close()
         >>> import os.path
         >>> os.path.getsize('tmp.pdf')
         117248
 
+        To get part of the content, pass the offset of its first byte and,
+        unless it runs to the end, its length. The part is asked for with
+        an HTTP Range request, see :meth:`cmislib.net.RESTService.getRange`.
+
+        >>> result = doc.getContentStream(offset=100000)
+        >>> len(result.read())
+        17248
+
         The optional streamId argument is not yet supported.
         """
 
         # TODO: Need to implement the streamId
 
+        if self.xmlDoc is None:
+            self.reload()
         contentElements = self.xmlDoc.getElementsByTagNameNS(ATOM_NS, 'content')
 
         # CMIS-701
@@ -2532,36 +3057,69 @@ class AtomPubDocument(AtomPubCmisObject):
         if contentElements[0].attributes.has_key('src'):
             srcUrl = contentElements[0].attributes['src'].value
 
-            # the cmis client class parses non-error responses
-            result, content = Rest().get(srcUrl.encode('utf-8'),
-                                         username=self._cmisClient.username,
-                                         password=self._cmisClient.password,
-                                         **self._cmisClient.extArgs)
-            if result['status'] != '200':
-                raise CmisException(result['status'])
-            return StringIO.StringIO(content)
+            # stream the content rather than reading it into memory
+            rest = self._cmisClient.binding.getRestService()
+            if offset is None and length is None:
+                stream = rest.getStream(srcUrl.encode('utf-8'),
+                                        username=self._cmisClient.username,
+                                        password=self._cmisClient.password,
+                                        **self._cmisClient.extArgs)
+            else:
+                stream = rest.getRange(srcUrl.encode('utf-8'),
+                                       offset or 0,
+                                       length,
+                                       username=self._cmisClient.username,
+                                       password=self._cmisClient.password,
+                                       **self._cmisClient.extArgs)
+            if stream.status not in (200, 206):
+                stream.close()
+                raise CmisException(str(stream.status))
+            return stream
         else:
             # otherwise, try to return the value of the content element
             if contentElements[0].childNodes:
-                return contentElements[0].childNodes[0].data
+                data = contentElements[0].childNodes[0].data
+                if offset is not None or length is not None:
+                    start = offset or 0
+                    if length is None:
+                        return data[start:]
+                    return data[start:start + length]
+                return data
+
+    def downloadTo(self, path, resume=True, maxRetries=3, retryDelay=1.0, **kwargs):
+
+        """
+        Writes the content of this document to the file at path, resuming an
+        interrupted download, with :func:`cmislib.download.downloadTo`.
+
+        >>> doc.downloadTo('/tmp/big.iso')
+        4294967296L
+        """
+
+        return downloadTo(self, path, resume, maxRetries, retryDelay, **kwargs)
 
     def setContentStream(self, contentFile, contentType=None):
 
         """
-        Sets the content stream on this object.
+        Sets the content stream on this object. The content is read from
+        contentFile in chunks while it is sent to the edit-media link.
 
         The following optional arguments are not yet supported:
          - overwriteFlag=None
         """
 
         # get this object's content stream link
-        contentElements = self.xmlDoc.getElementsByTagNameNS(ATOM_NS, 'content')
+        if self.xmlDoc is None:
+            self.reload()
+        srcUrl = self._getLink(EDIT_MEDIA_REL)
+        if not srcUrl:
+            contentElements = self.xmlDoc.getElementsByTagNameNS(ATOM_NS, 'content')
 
-        assert(len(contentElements) == 1), 'Expected to find exactly one atom:content element.'
+            assert(len(contentElements) == 1), 'Expected to find exactly one atom:content element.'
 
-        # if the src element exists, follow that
-        if contentElements[0].attributes.has_key('src'):
-            srcUrl = contentElements[0].attributes['src'].value
+            # if the src element exists, follow that
+            if contentElements[0].attributes.has_key('src'):
+                srcUrl = contentElements[0].attributes['src'].value
 
         # there may be times when this URL is absent, but I'm not sure how to
         # set the content stream when that is the case
@@ -2585,7 +3143,7 @@ class AtomPubDocument(AtomPubCmisObject):
         result = self._cmisClient.binding.put(srcUrl.encode('utf-8'),
                                               self._cmisClient.username,
                                               self._cmisClient.password,
-                                              contentFile.read(),
+                                              FileBody(contentFile),
                                               mimetype,
                                               **args)
 
@@ -2602,6 +3160,8 @@ class AtomPubDocument(AtomPubCmisObject):
         """
 
         # get this object's content stream link
+        if self.xmlDoc is None:
+            self.reload()
         contentElements = self.xmlDoc.getElementsByTagNameNS(ATOM_NS, 'content')
 
         assert(len(contentElements) == 1), 'Expected to find exactly one atom:content element.'
@@ -2641,14 +3201,10 @@ class AtomPubDocument(AtomPubCmisObject):
             raise NotSupportedException('Root folder does not support getObjectParents')
 
         # invoke the URL
-        result = self._cmisClient.binding.get(parentUrl.encode('utf-8'),
-                                              self._cmisClient.username,
-                                              self._cmisClient.password,
-                                              filter='cmis:path',
-                                              includeRelativePathSegment=True)
+        rs = getResultSet(self._cmisClient, self._repository, parentUrl,
+                          filter='cmis:path', includeRelativePathSegment=True)
 
         paths = []
-        rs = AtomPubResultSet(self._cmisClient, self._repository, result)
         for res in rs:
             path = res.properties['cmis:path']
             relativePathSegment = res.properties['cmisra:relativePathSegment']
@@ -2666,6 +3222,8 @@ class AtomPubFolder(AtomPubCmisObject):
     A container object that can hold other :class:`CmisObject` objects
     """
 
+    __slots__ = ()
+
     def createFolder(self, name, properties={}):
 
         """
@@ -2787,6 +3345,19 @@ class AtomPubFolder(AtomPubCmisObject):
                                                contentType,
                                                contentEncoding)
 
+    def createDocuments(self, items, maxWorkers=4, maxRetries=3, retryDelay=1.0,
+                        callback=None):
+
+        """
+        Creates a document in this folder for each item of items, as
+        :func:`cmislib.bulk.createDocuments` does.
+
+        >>> results = folder.createDocuments(items, maxWorkers=16)
+        """
+
+        return self._repository.createDocuments(items, self, maxWorkers, maxRetries,
+                                                retryDelay, callback)
+
     def getChildren(self, **kwargs):
 
         """
@@ -2812,14 +3383,8 @@ class AtomPubFolder(AtomPubCmisObject):
 
         # get the appropriate 'down' link
         childrenUrl = self.getChildrenLink()
-        # invoke the URL
-        result = self._cmisClient.binding.get(childrenUrl.encode('utf-8'),
-                                              self._cmisClient.username,
-                                              self._cmisClient.password,
-                                              **kwargs)
-
-        # return the result set
-        return AtomPubResultSet(self._cmisClient, self._repository, result)
+        # invoke the URL and return the result set
+        return getResultSet(self._cmisClient, self._repository, childrenUrl, **kwargs)
 
     def getChildrenLink(self):
 
@@ -2897,7 +3462,8 @@ class AtomPubFolder(AtomPubCmisObject):
         # get the appropriate 'down' link
         descendantsUrl = self.getDescendantsLink()
 
-        # invoke the URL
+        # invoke the URL. The feed nests each folder's children in its
+        # entry, which FeedReader skips, so it is parsed into a DOM.
         result = self._cmisClient.binding.get(descendantsUrl.encode('utf-8'),
                                               self._cmisClient.username,
                                               self._cmisClient.password,
@@ -2935,6 +3501,7 @@ class AtomPubFolder(AtomPubCmisObject):
         # Get the descendants link and do a GET against it
         url = self._getLink(FOLDER_TREE_REL)
         assert url is not None, 'Unable to determine folder tree link'
+        # like the descendants, the tree nests entries and needs a DOM
         result = self._cmisClient.binding.get(url.encode('utf-8'),
                                               self._cmisClient.username,
                                               self._cmisClient.password,
@@ -2943,6 +3510,17 @@ class AtomPubFolder(AtomPubCmisObject):
         # return the result set
         return AtomPubResultSet(self._cmisClient, self._repository, result)
 
+    def walk(self, maxWorkers=8, maxDepth=None, onError=None, **kwargs):
+
+        """
+        Walks the descendants of this folder with :func:`cmislib.crawl.walk`.
+
+        >>> for path, obj in folder.walk(filter='cmis:name', maxItems=500):
+        ...     print path
+        """
+
+        return walk(self, maxWorkers=maxWorkers, maxDepth=maxDepth, onError=onError, **kwargs)
+
     def getParent(self):
 
         """
@@ -3061,6 +3639,8 @@ class AtomPubRelationship(AtomPubCmisObject):
     Defines a relationship object between two :class:`CmisObjects` objects
     """
 
+    __slots__ = ()
+
     def getSourceId(self):
 
         """
@@ -3116,7 +3696,7 @@ class AtomPubPolicy(AtomPubCmisObject):
     repository identifies as being 'controllable'.
     """
 
-    pass
+    __slots__ = ()
 
 
 class AtomPubObjectType(ObjectType):
@@ -3303,10 +3883,8 @@ class AtomPubObjectType(ObjectType):
                 self._kwargs.update(kwargs)
             else:
                 self._kwargs = kwargs
-        templates = self._repository.getUriTemplates()
-        template = templates['typebyid']['template']
-        params = {'{id}': self._typeId}
-        byTypeIdUrl = multiple_replace(params, template)
+        template = self._repository.getUriTemplates()['typebyid']
+        byTypeIdUrl = template.expand({'id': self._typeId})
         result = self._cmisClient.binding.get(byTypeIdUrl.encode('utf-8'),
                                               self._cmisClient.username,
                                               self._cmisClient.password,
@@ -3341,10 +3919,12 @@ class AtomPubProperty(Property):
     type.
     """
 
+    __slots__ = ('xmlDoc',)
+    logger = logging.getLogger('cmislib.atompub.binding.AtomPubProperty')
+
     def __init__(self, propNode):
         """Constructor"""
         self.xmlDoc = propNode
-        self.logger = logging.getLogger('cmislib.atompub.binding.AtomPubProperty')
         self.logger.debug('Creating an instance of AtomPubProperty')
 
     def __str__(self):
@@ -3647,7 +4227,7 @@ class AtomPubACE(ACE):
     Represents an ACE for the AtomPub binding.
     """
 
-    pass
+    __slots__ = ()
 
 
 class AtomPubChangeEntry(ChangeEntry):
@@ -3675,6 +4255,10 @@ class AtomPubChangeEntry(ChangeEntry):
     u'updated'
     """
 
+    __slots__ = ('_cmisClient', '_repository', '_xmlDoc', '_properties', '_objectId',
+                 '_changeEntryId', '_changeType', '_changeTime')
+    logger = logging.getLogger('cmislib.atompub.binding.AtomPubChangeEntry')
+
     def __init__(self, cmisClient, repository, xmlDoc):
         """Constructor"""
         self._cmisClient = cmisClient
@@ -3685,7 +4269,6 @@ class AtomPubChangeEntry(ChangeEntry):
         self._changeEntryId = None
         self._changeType = None
         self._changeTime = None
-        self.logger = logging.getLogger('cmislib.atompub.binding.AtomPubChangeEntry')
         self.logger.debug('Creating an instance of AtomPubChangeEntry')
 
     def getId(self):
@@ -3762,8 +4345,10 @@ class AtomPubChangeEntry(ChangeEntry):
         include the actual property values that changed.
         """
 
-        if self._properties == {}:
+        properties = self._properties
+        if properties == {}:
             propertiesElement = self._xmlDoc.getElementsByTagNameNS(CMIS_NS, 'properties')[0]
+            properties = {}
             for node in [e for e in propertiesElement.childNodes if e.nodeType == e.ELEMENT_NODE]:
                 propertyName = node.attributes['propertyDefinitionId'].value
                 if node.childNodes and \
@@ -3774,8 +4359,9 @@ class AtomPubChangeEntry(ChangeEntry):
                         node.localName)
                 else:
                     propertyValue = None
-                self._properties[propertyName] = propertyValue
-        return self._properties
+                properties[propertyName] = propertyValue
+            self._properties = properties
+        return properties
 
     def _getLink(self, rel):
 
@@ -3852,6 +4438,18 @@ class AtomPubChangeEntryResultSet(AtomPubResultSet):
 
         return self._results
 
+    def _fetchPage(self, link):
+
+        """
+        Overriding because change entries are built from the DOM.
+        """
+
+        result = self._cmisClient.binding.get(link.encode('utf-8'),
+                                              self._cmisClient.username,
+                                              self._cmisClient.password)
+        resultSet = AtomPubChangeEntryResultSet(self._cmisClient, self._repository, result)
+        return resultSet.getResults(), resultSet._getLink(NEXT_REL)
+
 
 class AtomPubRendition(Rendition):
 
@@ -3859,10 +4457,12 @@ class AtomPubRendition(Rendition):
     This class represents a Rendition.
     """
 
+    __slots__ = ('xmlDoc',)
+    logger = logging.getLogger('cmislib.atompub.binding.AtomPubRendition')
+
     def __init__(self, propNode):
         """Constructor"""
         self.xmlDoc = propNode
-        self.logger = logging.getLogger('cmislib.atompub.binding.AtomPubRendition')
         self.logger.debug('Creating an instance of AtomPubRendition')
 
     def __str__(self):
@@ -3937,43 +4537,259 @@ class AtomPubCmisId(CmisId):
     pass
 
 
+class FeedReader(object):
+
+    """
+    Parses an Atom feed incrementally, one entry at a time, instead of
+    building a DOM for the whole response. Each entry is handed back as a
+    plain dict with these keys:
+
+     - id: the atom:id
+     - title: the atom:title
+     - properties: dict of CMIS properties, parsed the same way
+       :meth:`CmisObject.getProperties` does
+     - allowableActions: dict of allowable actions, or None if the entry has
+       none
+     - links: list of dicts holding the attributes (rel, href, type, ...) of
+       each atom:link
+     - content: the src of the atom:content element, or None
+
+    Feed level links are collected in the links dict, keyed by rel, and the
+    cmisra:numItems value, if any, in numItems. Servers put both ahead of the
+    entries, so they are normally available as soon as the first entry has
+    been read. A reader can only be iterated once, and the source is
+    closed once it has been.
+
+    >>> reader = FeedReader(content)
+    >>> for entry in reader:
+    ...     print entry['properties']['cmis:name']
+    >>> reader.links.get('next')
+    u'http://localhost:8080/alfresco/s/cmis/children?id=...&skipCount=100'
+    """
+
+    def __init__(self, source, url=None):
+
+        """
+        Source is the feed as a string or a file-like object. The url is
+        only used in error messages.
+        """
+
+        if isinstance(source, basestring):
+            source = StringIO.StringIO(source)
+        self._source = source
+        self._url = url
+        self.links = {}
+        self.numItems = None
+
+    def __iter__(self):
+        """ Iterator over the entries of the feed """
+        depth = 0
+        root = None
+        try:
+            for event, elem in cElementTree.iterparse(self._source, events=('start', 'end')):
+                if event == 'start':
+                    if root is None:
+                        root = elem
+                    depth += 1
+                    continue
+                depth -= 1
+                if depth == 1 and root.tag != _ATOM_ENTRY:
+                    if elem.tag == _ATOM_ENTRY:
+                        yield readEntryElement(elem)
+                    elif elem.tag == _ATOM_LINK:
+                        rel = elem.get('rel')
+                        if rel is not None and rel not in self.links:
+                            self.links[rel] = _text(elem.get('href'))
+                    elif elem.tag == _CMISRA_NUM_ITEMS and elem.text:
+                        self.numItems = int(elem.text)
+                    # everything the feed element holds has been read, so
+                    # let the parsed elements go
+                    root.clear()
+                elif depth == 0 and elem.tag == _ATOM_ENTRY:
+                    # the response was a single entry rather than a feed
+                    yield readEntryElement(elem)
+        except SyntaxError:
+            raise CmisException('Could not parse server response', self._url)
+        finally:
+            # give a streamed response's connection back
+            if hasattr(self._source, 'close'):
+                self._source.close()
+
+
 def getSpecializedObject(obj, **kwargs):
 
     """
     Returns an instance of the appropriate :class:`CmisObject` class or one
-    of its child types depending on the specified baseType.
+    of its child types depending on the specified baseType. The returned
+    object starts out with the properties and allowable actions obj has
+    already parsed.
     """
 
     moduleLogger.debug('Inside getSpecializedObject')
 
-    if 'cmis:baseTypeId' in obj.getProperties():
-        baseType = obj.getProperties()['cmis:baseTypeId']
-        if baseType == 'cmis:folder':
-            return AtomPubFolder(obj._cmisClient, obj._repository, obj.getObjectId(), obj.xmlDoc, **kwargs)
-        if baseType == 'cmis:document':
-            return AtomPubDocument(obj._cmisClient, obj._repository, obj.getObjectId(), obj.xmlDoc, **kwargs)
-        if baseType == 'cmis:relationship':
-            return AtomPubRelationship(obj._cmisClient, obj._repository, obj.getObjectId(), obj.xmlDoc, **kwargs)
-        if baseType == 'cmis:policy':
-            return AtomPubPolicy(obj._cmisClient, obj._repository, obj.getObjectId(), obj.xmlDoc, **kwargs)
-
-    # if the base type ID wasn't found in the props (this can happen when
-    # someone runs a query that doesn't select * or doesn't individually
-    # specify baseTypeId) or if the type isn't one of the known base
-    # types, give the object back
+    properties = obj.getProperties()
+    baseType = properties.get('cmis:baseTypeId')
+    if baseType == 'cmis:folder':
+        cls = AtomPubFolder
+    elif baseType == 'cmis:document':
+        cls = AtomPubDocument
+    elif baseType == 'cmis:relationship':
+        cls = AtomPubRelationship
+    elif baseType == 'cmis:policy':
+        cls = AtomPubPolicy
+    else:
+        # if the base type ID wasn't found in the props (this can happen when
+        # someone runs a query that doesn't select * or doesn't individually
+        # specify baseTypeId) or if the type isn't one of the known base
+        # types, give the object back
+        return obj
+
+    specialized = cls(obj._cmisClient, obj._repository, obj.getObjectId(), obj.xmlDoc, **kwargs)
+    # hand over what has been parsed already so that it isn't parsed twice
+    specialized._properties = properties
+    specialized._allowableActions = obj._allowableActions
+    return specialized
+
+
+def getResultSet(cmisClient, repository, url, **kwargs):
+
+    """
+    Returns an :class:`AtomPubResultSet` over the feed at url. The feed is
+    read with a :class:`FeedReader` unless the client was created with
+    minidomFeeds set, in which case it is parsed into a DOM.
+    """
+
+    if cmisClient.minidomFeeds:
+        result = cmisClient.binding.get(url.encode('utf-8'),
+                                        cmisClient.username,
+                                        cmisClient.password,
+                                        **kwargs)
+        return AtomPubResultSet(cmisClient, repository, result)
+    reader = cmisClient.binding.getFeed(url.encode('utf-8'),
+                                        cmisClient.username,
+                                        cmisClient.password,
+                                        **kwargs)
+    return AtomPubResultSet(cmisClient, repository, reader=reader)
+
+
+def getSpecializedObjectFromEntry(cmisClient, repository, entry, **kwargs):
+
+    """
+    Returns an instance of the appropriate :class:`CmisObject` class for an
+    entry dict produced by :class:`FeedReader`, or kept by a
+    :class:`cmislib.cache.ObjectCache`. The object starts out with
+    the entry's properties, allowable actions and links. Its Atom XML is
+    only fetched, with a reload, when a method needs more than that.
+    """
+
+    properties = entry['properties']
+    baseType = properties.get('cmis:baseTypeId')
+    if baseType == 'cmis:folder':
+        cls = AtomPubFolder
+    elif baseType == 'cmis:document':
+        cls = AtomPubDocument
+    elif baseType == 'cmis:relationship':
+        cls = AtomPubRelationship
+    elif baseType == 'cmis:policy':
+        cls = AtomPubPolicy
+    else:
+        cls = AtomPubCmisObject
+    objectId = properties.get('cmis:objectId')
+    if objectId is not None:
+        objectId = CmisId(objectId)
+    obj = cls(cmisClient, repository, objectId, None, **kwargs)
+    obj._properties = properties
+    if entry['allowableActions'] is not None:
+        obj._allowableActions = entry['allowableActions']
+    obj._links = entry.get('links')
     return obj
 
 
+def readEntryElement(entryElement):
+
+    """
+    Internal helper that turns a parsed atom:entry ElementTree element into
+    the dict described in :class:`FeedReader`.
+    """
+
+    entry = {'id': None, 'title': None, 'properties': {},
+             'allowableActions': None, 'links': [], 'content': None}
+    properties = entry['properties']
+    for child in entryElement:
+        tag = child.tag
+        if tag == _ATOM_LINK:
+            entry['links'].append(dict([(k, _text(v)) for k, v in child.items()]))
+        elif tag == _ATOM_ID:
+            entry['id'] = _text(child.text)
+        elif tag == _ATOM_TITLE:
+            entry['title'] = _text(child.text)
+        elif tag == _ATOM_CONTENT:
+            entry['content'] = _text(child.get('src'))
+        elif tag == _CMISRA_OBJECT:
+            for objChild in child:
+                if objChild.tag == _CMIS_PROPERTIES:
+                    for propElement in objChild:
+                        propertyName = propElement.get('propertyDefinitionId')
+                        if propertyName is None:
+                            continue
+                        properties[internName(_text(propertyName))] = \
+                            _readPropertyValue(propElement)
+                elif objChild.tag == _CMIS_ALLOWABLE_ACTIONS:
+                    actions = {}
+                    for actionElement in objChild:
+                        actionName = actionElement.tag[len(_CMIS_PREFIX):]
+                        actions[actionName] = parseBoolValue(_text(actionElement.text))
+                    entry['allowableActions'] = actions
+        elif tag.startswith(_CMISRA_PREFIX) and tag != _CMISRA_CHILDREN:
+            # cmisra:pathSegment and friends
+            properties['cmisra:' + tag[len(_CMISRA_PREFIX):]] = _text(child.text)
+    return entry
+
+
+def _readPropertyValue(propElement):
+
+    """
+    Returns the parsed value of a cmis:property* element: None when it has
+    no value, the value itself when it has one and a list otherwise.
+    """
+
+    nodeName = propElement.tag[len(_CMIS_PREFIX):]
+    values = [_text(v.text) for v in propElement.findall(_CMIS_VALUE)]
+    if not values or not values[0]:
+        return None
+    if len(values) == 1:
+        return parsePropValue(values[0], nodeName)
+    return [parsePropValue(v, nodeName) for v in values if v]
+
+
+def _text(value):
+
+    """
+    ElementTree hands back plain ASCII text as str. Turn it into unicode so
+    values look the same as the ones minidom produces.
+    """
+
+    if value is not None and not isinstance(value, unicode):
+        return unicode(value)
+    return value
+
+
 def getEntryXmlDoc(repo=None, objectTypeId=None, properties=None, contentFile=None,
-                   contentType=None, contentEncoding=None):
+                   contentType=None, contentEncoding=None, fileData=None):
 
     """
     Internal helper method that knows how to build an Atom entry based
     on the properties and, optionally, the contentFile provided.
+
+    If fileData is passed, it is used as the base64 text of the content
+    instead of the encoded contentFile, which isn't read.
     """
 
     moduleLogger.debug('Inside getEntryXmlDoc')
 
+    if objectTypeId is None and properties:
+        objectTypeId = properties.get('cmis:objectTypeId')
+
     entryXmlDoc = minidom.Document()
     entryElement = entryXmlDoc.createElementNS(ATOM_NS, "entry")
     entryElement.setAttribute('xmlns', ATOM_NS)
@@ -4003,7 +4819,8 @@ def getEntryXmlDoc(repo=None, objectTypeId=None, properties=None, contentFile=No
         # present, so it seems reasonable to use CMIS_RA content for now
         # and encode everything.
 
-        fileData = contentFile.read().encode("base64")
+        if fileData is None:
+            fileData = contentFile.read().encode("base64")
         mediaElement = entryXmlDoc.createElementNS(CMISRA_NS, 'cmisra:mediatype')
         mediaElementText = entryXmlDoc.createTextNode(mimetype)
         mediaElement.appendChild(mediaElementText)
@@ -4068,6 +4885,81 @@ def getEntryXmlDoc(repo=None, objectTypeId=None, properties=None, contentFile=No
     return entryXmlDoc
 
 
+class AtomEntryBody(object):
+
+    """
+    The Atom entry for a document with content, as a request body that
+    base64 encodes the content file a chunk at a time while it is sent,
+    instead of holding the file, its encoding and the serialized entry in
+    memory. Pass it as the payload of :meth:`AtomPubBinding.post` or
+    :meth:`AtomPubBinding.put`. The arguments are those of
+    :func:`getEntryXmlDoc`, and the bytes sent are the same as those of
+    the entry it builds.
+
+    The length of the content file, and so the Content-Length of the body,
+    is worked out up front by seeking to its end. A file that can't seek
+    is read into memory instead.
+
+    >>> body = AtomEntryBody(repo, None, props, open('big.iso', 'rb'))
+    >>> binding.post(url, 'admin', 'admin', body, ATOM_XML_ENTRY_TYPE)
+    """
+
+    # base64 puts 57 bytes on each line, so chunks of a multiple of 57
+    # bytes encode to the same text as the whole file. Bytes past the last
+    # full line of a short read are carried over to the next chunk.
+    chunkSize = 57 * 1024
+    _placeholder = 'cmislib-base64-content'
+
+    def __init__(self, repo=None, objectTypeId=None, properties=None, contentFile=None,
+                 contentType=None, contentEncoding=None):
+        """ Constructor """
+        self._file, self._start, self._size = getFileExtent(contentFile)
+        entryXmlDoc = getEntryXmlDoc(repo, objectTypeId, properties, contentFile,
+                                     contentType, contentEncoding, fileData=self._placeholder)
+        # the content comes before the properties, so the first placeholder
+        # is the one in the entry's cmisra:base64 element
+        self._head, self._tail = entryXmlDoc.toxml(encoding='utf-8').split(self._placeholder, 1)
+        lines = (self._size + 56) // 57
+        encodedSize = 4 * ((self._size + 2) // 3) + lines
+        self.contentLength = len(self._head) + encodedSize + len(self._tail)
+
+    def __iter__(self):
+        """ Iterates over the chunks of the body, from its start """
+        yield self._head
+        self._file.seek(self._start)
+        remaining = self._size
+        leftover = ''
+        while remaining > 0:
+            data = self._file.read(min(self.chunkSize, remaining))
+            if not data:
+                raise IOError('The content file ended before its expected length')
+            remaining -= len(data)
+            data = leftover + data
+            leftover = ''
+            if remaining > 0:
+                cut = len(data) - len(data) % 57
+                data, leftover = data[:cut], data[cut:]
+            if data:
+                yield data.encode('base64')
+        yield self._tail
+
+
+def getEntryBody(repo=None, objectTypeId=None, properties=None, contentFile=None,
+                 contentType=None, contentEncoding=None):
+
+    """
+    Returns the request body of the Atom entry :func:`getEntryXmlDoc`
+    builds: an :class:`AtomEntryBody` that streams the content if there
+    is a contentFile, the serialized entry otherwise.
+    """
+
+    if contentFile:
+        return AtomEntryBody(repo, objectTypeId, properties, contentFile,
+                             contentType, contentEncoding)
+    entryXmlDoc = getEntryXmlDoc(repo, objectTypeId, properties)
+    return entryXmlDoc.toxml(encoding='utf-8')
+
+
 def getElementNameAndValues(propType, propName, propValue, isList=False):
 
     """
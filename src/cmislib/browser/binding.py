@@ -21,13 +21,17 @@
 Module containing the browser binding-specific objects used to work with a CMIS
 provider.
 """
+from cmislib.bulk import getObjects, createDocuments
+from cmislib.crawl import walk
+from cmislib.download import downloadTo
+from cmislib.cache import LRUCache
 from cmislib.cmis_services import Binding, RepositoryServiceIfc
-from cmislib.domain import CmisId, CmisObject, ObjectType, ACL, ACE, ChangeEntry
+from cmislib.domain import CmisId, ObjectType, ACL, ACE, ChangeEntry
 from cmislib.exceptions import CmisException, InvalidArgumentException,\
                                NotSupportedException, ObjectNotFoundException
-from cmislib.net import RESTService as Rest
 from cmislib.util import parsePropValueByType, parseDateTimeValue, safe_quote,\
-                        safe_urlencode
+                        safe_urlencode, getRowFactory, internName, getFileExtent
+from cmislib.workers import parallelPages, readAhead
 from cmislib import messages
 import json
 import logging
@@ -70,17 +74,18 @@ class BrowserBinding(Binding):
         if len(self.extArgs) > 0:
             kwargs.update(self.extArgs)
 
-        resp, content = Rest().get(url,
-                                   username=username,
-                                   password=password,
-                                   **kwargs)
-        result = None
-        if resp['status'] != '200':
+        resp, result = self._conditionalGet(url, username, password, **kwargs)
+        if resp['status'] not in ('200', '304'):
             self._processCommonErrors(resp, url)
-        else:
-            result = json.loads(content)
+            result = None
         return result
 
+    def _parseResponse(self, content, url):
+
+        """ Parses a JSON response. """
+
+        return json.loads(content)
+
     def post(self, url, payload, contentType, username, password, **kwargs):
 
         """
@@ -97,12 +102,12 @@ class BrowserBinding(Binding):
             kwargs.update(self.extArgs)
 
         result = None
-        resp, content = Rest().post(url,
-                                    payload,
-                                    contentType,
-                                    username=username,
-                                    password=password,
-                                    **kwargs)
+        resp, content = self.getRestService().post(url,
+                                                   payload,
+                                                   contentType,
+                                                   username=username,
+                                                   password=password,
+                                                   **kwargs)
         if resp['status'] != '200' and resp['status'] != '201':
             self._processCommonErrors(resp, url)
         elif content is not None and content != "":
@@ -122,10 +127,9 @@ class RepositoryService(RepositoryServiceIfc):
         Gets the repository for the specified repository ID.
         """
 
-        result = client.binding.get(client.repositoryUrl, client.username, client.password, **client.extArgs)
-
-        if repositoryId in result:
-            return BrowserRepository(client, result[repositoryId])
+        for repository in self._getRepositories(client):
+            if repository.getRepositoryId() == repositoryId:
+                return repository
 
         raise ObjectNotFoundException(url=client.repositoryUrl)
 
@@ -135,12 +139,10 @@ class RepositoryService(RepositoryServiceIfc):
         Gets all of the repositories for this client.
         """
 
-        result = client.binding.get(client.repositoryUrl, client.username, client.password, **client.extArgs)
-
         repositories = []
-        for repo in result.itervalues():
-            repositories.append({'repositoryId': repo['repositoryId'],
-                                 'repositoryName': repo['repositoryName']})
+        for repository in self._getRepositories(client):
+            repositories.append({'repositoryId': repository.getRepositoryId(),
+                                 'repositoryName': repository.getRepositoryName()})
         return repositories
 
     def getDefaultRepository(self, client):
@@ -151,13 +153,26 @@ class RepositoryService(RepositoryServiceIfc):
         list.
         """
 
-        result = client.binding.get(client.repositoryUrl, client.username, client.password, **client.extArgs)
-        # instantiate a Repository object with the first workspace
-        # element we find
-        repository = None
-        for repo in result.itervalues():
-            repository = BrowserRepository(client, repo)
-        return repository
+        repositories = self._getRepositories(client)
+        if repositories:
+            return repositories[0]
+
+    def _getRepositories(self, client):
+
+        """
+        Returns a repository object for each repository in the client's
+        service document. They are only rebuilt when the service document
+        changes, so the repository info and capabilities they parse lazily
+        are parsed once.
+        """
+
+        result = client.binding.getServiceDocument(client)
+        cached = client._repositories
+        if cached is not None and cached[0] is result:
+            return cached[1]
+        repositories = [BrowserRepository(client, repo) for repo in result.itervalues()]
+        client._repositories = (result, repositories)
+        return repositories
 
 
 class BrowserCmisObject(object):
@@ -167,6 +182,10 @@ class BrowserCmisObject(object):
     :class:`Document` and :class:`Folder`.
     """
 
+    __slots__ = ('_cmisClient', '_repository', '_objectId', '_properties',
+                 '_allowableActions', 'data', '_extArgs', '__weakref__')
+    logger = logging.getLogger('cmislib.browser.binding.BrowserCmisObject')
+
     def __init__(self, cmisClient, repository, objectId=None, data=None, **kwargs):
         """ Constructor """
         self._cmisClient = cmisClient
@@ -176,7 +195,6 @@ class BrowserCmisObject(object):
         self._allowableActions = {}
         self.data = data
         self._extArgs = kwargs
-        self.logger = logging.getLogger('cmislib.browser.binding.BrowserCmisObject')
         self.logger.debug('Creating an instance of BrowserCmisObject')
 
     def __str__(self):
@@ -212,11 +230,16 @@ class BrowserCmisObject(object):
             self._extArgs = kwargs
 
         byObjectIdUrl = self._repository.getRootFolderUrl() + "?objectId=" + self.getObjectId() + "&cmisselector=object"
-        self.data = self._cmisClient.binding.get(byObjectIdUrl.encode('utf-8'),
-                                                 self._cmisClient.username,
-                                                 self._cmisClient.password,
-                                                 **self._extArgs)
-        self._initData()
+        data = self._cmisClient.binding.get(byObjectIdUrl.encode('utf-8'),
+                                            self._cmisClient.username,
+                                            self._cmisClient.password,
+                                            **self._extArgs)
+        # an unchanged object comes back as the data already parsed, so
+        # what was read from it is still good
+        if data is not self.data:
+            self.data = data
+            self._initData()
+            self._checkChangeToken()
 
         # if a returnVersion arg was passed in, it is possible we got back
         # a different object ID than the value we started with, so it needs
@@ -224,6 +247,28 @@ class BrowserCmisObject(object):
         if self._extArgs.has_key('returnVersion'):
             self._objectId = None
 
+    def _checkChangeToken(self):
+
+        """
+        Drops the cached copy of this object from the client's objectCache
+        if it has another cmis:changeToken than the one just fetched.
+        """
+
+        objectCache = self._cmisClient.objectCache
+        if objectCache is not None:
+            properties = self.getProperties()
+            objectCache.checkChangeToken(self._repository, properties['cmis:objectId'],
+                                         properties.get('cmis:changeToken'))
+
+    def _invalidateCache(self):
+
+        """
+        Drops this object from the client's objectCache, if it has one.
+        """
+
+        if self._cmisClient.objectCache is not None:
+            self._cmisClient.objectCache.invalidate(self._repository, self.getObjectId())
+
     def getObjectId(self):
 
         """
@@ -292,13 +337,15 @@ class BrowserCmisObject(object):
         canGetProperties:True
         """
 
-        if self._allowableActions == {}:
-            self.reload(includeAllowableActions=True)
+        allowableActions = self._allowableActions
+        if allowableActions == {}:
+            if self.data is None or not self.data.has_key('allowableActions'):
+                self.reload(includeAllowableActions=True)
             assert self.data.has_key('allowableActions'), "Expected object data to have an allowableActions key"
             allowableActions = self.data['allowableActions']
             self._allowableActions = allowableActions
 
-        return self._allowableActions
+        return allowableActions
 
     def getProperties(self):
 
@@ -322,20 +369,14 @@ class BrowserCmisObject(object):
         The optional filter argument is not yet implemented.
         """
 
-        if self._properties == {}:
+        properties = self._properties
+        if properties == {}:
             if self.data is None:
                 self.reload()
-            for prop in self.data['properties'].itervalues():
-                # property could be multi-valued
-                if type(prop['value']) is list:
-                    propVal = []
-                    for val in prop['value']:
-                        propVal.append(parsePropValueByType(val, prop['type']))
-                    self._properties[prop['id']] = propVal
-                else:
-                    self._properties[prop['id']] = parsePropValueByType(prop['value'], prop['type'])
+            properties = parseProperties(self.data['properties'])
+            self._properties = properties
 
-        return self._properties
+        return properties
 
     def getName(self):
 
@@ -374,12 +415,16 @@ class BrowserCmisObject(object):
 
         setProps(properties, props, initialIndex=0)
 
-        # invoke the URL
-        result = self._cmisClient.binding.post(updateUrl.encode('utf-8'),
-                                               safe_urlencode(props),
-                                               'application/x-www-form-urlencoded',
-                                               self._cmisClient.username,
-                                               self._cmisClient.password)
+        # invoke the URL, and forget any cached copy even if the update is
+        # refused for a stale change token
+        try:
+            result = self._cmisClient.binding.post(updateUrl.encode('utf-8'),
+                                                   safe_urlencode(props),
+                                                   'application/x-www-form-urlencoded',
+                                                   self._cmisClient.username,
+                                                   self._cmisClient.password)
+        finally:
+            self._invalidateCache()
 
         self.data = result
         self._initData()
@@ -409,6 +454,7 @@ class BrowserCmisObject(object):
                                       'application/x-www-form-urlencoded',
                                       self._cmisClient.username,
                                       self._cmisClient.password)
+        self._invalidateCache()
 
         return
 
@@ -438,6 +484,7 @@ class BrowserCmisObject(object):
                                       self._cmisClient.username,
                                       self._cmisClient.password,
                                       **kwargs)
+        self._invalidateCache()
 
         return
 
@@ -512,7 +559,8 @@ class BrowserCmisObject(object):
                                               self._cmisClient.password,
                                               **kwargs)
         # return the result set
-        return BrowserResultSet(self._cmisClient, self._repository, result, serializer=RelationShipsSerializer())
+        return BrowserResultSet(self._cmisClient, self._repository, result, serializer=RelationShipsSerializer(),
+                                pageUrl=byObjectIdUrl.encode('utf-8'), pageArgs=kwargs)
 
     def removePolicy(self, policyId):
 
@@ -636,6 +684,7 @@ class BrowserRepository(object):
         self._permMap = {}
         self._permissions = None
         self._propagation = None
+        self.typeCache = LRUCache(cmisClient.typeCacheSize, cmisClient.typeCacheTtl)
         self.logger = logging.getLogger('cmislib.browser.binding.BrowserRepository')
         self.logger.debug('Creating an instance of BrowserRepository')
 
@@ -659,11 +708,18 @@ class BrowserRepository(object):
 
     def reload(self):
         """
-        This method will re-fetch the repository's XML data from the CMIS
-        repository.
+        This method will re-fetch the repository's info from the CMIS
+        service, such as its latestChangeLogToken.
         """
 
-        pass
+        repositoryId = self.getRepositoryId()
+        result = self._cmisClient.binding.get(self._cmisClient.repositoryUrl.encode('utf-8'),
+                                              self._cmisClient.username,
+                                              self._cmisClient.password)
+        if repositoryId not in result:
+            raise ObjectNotFoundException(url=self._cmisClient.repositoryUrl)
+        self.data = result[repositoryId]
+        self._initData()
 
     def getRepositoryId(self):
 
@@ -719,7 +775,8 @@ class BrowserRepository(object):
         productName:Alfresco Repository (Community)
         """
 
-        if not self._repositoryInfo:
+        repoInfo = self._repositoryInfo
+        if not repoInfo:
             if self.data is None:
                 self.reload()
             repoInfo = {'repositoryId': self.data['repositoryId'], 'repositoryName': self.data['repositoryName'],
@@ -737,7 +794,7 @@ class BrowserRepository(object):
             if self.data.has_key('extendedFeatures'):
                 repoInfo['extendedFeatures'] = self.data['extendedFeatures']
             self._repositoryInfo = repoInfo
-        return self._repositoryInfo
+        return repoInfo
 
     def getRootFolderUrl(self):
 
@@ -767,8 +824,25 @@ class BrowserRepository(object):
         The following optional arguments are not currently supported:
          - filter
          - includeAllowableActions
+
+        Like :meth:`getObject`, it uses the client's objectCache when no
+        optional argument is passed.
         """
 
+        objectCache = self._cmisClient.objectCache
+        if objectCache is not None and not kwargs:
+            entry = objectCache.getByPath(self, path)
+            if entry is not None:
+                return getSpecializedObjectFromEntry(self._cmisClient, self, entry)
+            obj = self._getObjectByPath(path, includeAllowableActions='true')
+            objectCache.put(self, obj, path)
+            return obj
+        return self._getObjectByPath(path, **kwargs)
+
+    def _getObjectByPath(self, path, **kwargs):
+
+        """ Fetches the object at the specified path. """
+
         byPathUrl = self.getRootFolderUrl() + safe_quote(path) + "?cmisselector=object"
         result = self._cmisClient.binding.get(byPathUrl.encode('utf-8'),
                                               self._cmisClient.username,
@@ -911,7 +985,8 @@ class BrowserRepository(object):
         Changes:None
         """
 
-        if not self._capabilities:
+        caps = self._capabilities
+        if not caps:
             if self.data is None:
                 self.reload()
             caps = {}
@@ -920,7 +995,21 @@ class BrowserRepository(object):
                     key = cap.replace('capability', '')
                     caps[key] = self.data['capabilities'][cap]
                 self._capabilities = caps
-        return self._capabilities
+        return caps
+
+    def crawl(self, rootPath='/', maxWorkers=8, maxDepth=None, onError=None, **kwargs):
+
+        """
+        Walks the folder at rootPath, the root folder by default, with
+        :func:`cmislib.crawl.walk`.
+
+        >>> for path, obj in repo.crawl('/Sites', maxWorkers=16):
+        ...     index(path, obj)
+        """
+
+        folder = self.getObjectByPath(rootPath)
+        return walk(folder, rootPath, maxWorkers=maxWorkers, maxDepth=maxDepth,
+                    onError=onError, **kwargs)
 
     def getRootFolder(self):
         """
@@ -1043,7 +1132,6 @@ class BrowserRepository(object):
             typesUrl += "&typeId=%s" % (safe_quote(typeId))
         if depth is not None:
             typesUrl += "&depth=%s" % (depth)
-        print typesUrl
 
         result = self._cmisClient.binding.get(typesUrl,
                                               self._cmisClient.username,
@@ -1089,8 +1177,17 @@ class BrowserRepository(object):
         """
         Returns an :class:`ObjectType` object for the specified object type id.
 
+        Type definitions are kept in the repository's typeCache, a
+        :class:`cmislib.cache.LRUCache`, so asking for the same type again
+        does not go back to the server until the cached definition expires
+        or is invalidated.
+
         >>> folderType = repo.getTypeDefinition('cmis:folder')
         """
+        objectType = self.typeCache.get(typeId)
+        if objectType is not None:
+            return objectType
+
         # localhost:8080/chemistry/browser/A1?cmisselector=typeDefinition&typeId=cmis:folder
         typesUrl = self.getRepositoryUrl() + "?cmisselector=typeDefinition" + \
             "&typeId=" + typeId
@@ -1098,9 +1195,40 @@ class BrowserRepository(object):
                                               self._cmisClient.username,
                                               self._cmisClient.password)
 
-        return BrowserObjectType(self._cmisClient,
-                                 self,
-                                 data=result)
+        objectType = BrowserObjectType(self._cmisClient,
+                                       self,
+                                       data=result)
+        self.typeCache.put(typeId, objectType)
+        return objectType
+
+    def invalidateTypeCache(self, typeId=None):
+
+        """
+        Drops the cached definition of the specified type, or of every type
+        if no typeId is given, so that the next :meth:`getTypeDefinition`
+        fetches it from the server again. Call this after changing a type.
+
+        >>> repo.invalidateTypeCache('cmis:document')
+        """
+
+        self.typeCache.invalidate(typeId)
+
+    def warmTypeCache(self, typeId=None, depth=None):
+
+        """
+        Fills the type cache with the definitions of the descendants of the
+        specified type, or of every type in the repository if no typeId is
+        given, using a single :meth:`getTypeDescendants` call. Returns the
+        number of types cached.
+
+        >>> repo.warmTypeCache()
+        42
+        """
+
+        types = self.getTypeDescendants(typeId, depth, includePropertyDefinitions='true')
+        for objectType in types:
+            self.typeCache.put(objectType.getTypeId(), objectType)
+        return len(types)
 
     def getCheckedOutDocs(self, **kwargs):
 
@@ -1158,11 +1286,37 @@ class BrowserRepository(object):
          - renditionFilter
          - includeACL
          - includeAllowableActions
+
+        If the client has an objectCache, see
+        :class:`cmislib.cache.ObjectCache`, and no optional argument is
+        passed, the object comes from the cache when it is there, with its
+        properties and allowable actions. When it isn't, it is fetched with
+        includeAllowableActions, so that they can be cached too.
         """
 
-        return getSpecializedObject(BrowserCmisObject(self._cmisClient, self, CmisId(objectId), **kwargs), **kwargs)
+        objectCache = self._cmisClient.objectCache
+        if objectCache is None or kwargs:
+            return getSpecializedObject(BrowserCmisObject(self._cmisClient, self, CmisId(objectId), **kwargs), **kwargs)
+        entry = objectCache.get(self, objectId)
+        if entry is not None:
+            return getSpecializedObjectFromEntry(self._cmisClient, self, entry)
+        obj = getSpecializedObject(BrowserCmisObject(self._cmisClient, self, CmisId(objectId),
+                                                     includeAllowableActions='true'))
+        objectCache.put(self, obj)
+        return obj
 
-    def query(self, statement, **kwargs):
+    def getObjects(self, objectIds, chunkSize=100, maxWorkers=4, **kwargs):
+
+        """
+        Returns the objects with the specified object IDs, in order, fetched
+        in bulk by :func:`cmislib.bulk.getObjects`.
+
+        >>> docs = repo.getObjects(objectIds, filter='cmis:name')
+        """
+
+        return getObjects(self, objectIds, chunkSize, maxWorkers, **kwargs)
+
+    def query(self, statement, rowFormat=None, **kwargs):
 
         """
         Returns a list of :class:`CmisObject` objects based on the CMIS
@@ -1203,11 +1357,30 @@ class BrowserRepository(object):
         5
         >>> rs.hasNext()
         True
+
+        Reports that only need a few columns can ask for plain rows instead
+        of objects with rowFormat. 'dict' rows map property ids to values
+        and 'tuple' rows hold the values of the select list, in order. Only
+        the one page of results selected by maxItems and skipCount is
+        returned. The Browser binding can't produce the rows while the
+        response is read: the standard library has no incremental JSON
+        parser, so the whole page is parsed before the first row, and
+        memory use is bounded by maxItems, not by the size of a row. The
+        rows are made as they are taken, each dropping its result from the
+        page.
+
+        >>> q = 'select cmis:objectId, cmis:name from cmis:document'
+        >>> for objectId, name in repo.query(q, rowFormat='tuple'):
+        ...     print name
         """
 
         # build the CMIS query XML that we're going to POST
         queryUrl = self.getRepositoryUrl() + "?cmisaction=query&q=" + safe_quote(statement)
 
+        makeRow = None
+        if rowFormat is not None:
+            makeRow = getRowFactory(statement, rowFormat)
+
         # do the POST
         result = self._cmisClient.binding.post(queryUrl.encode('utf-8'),
                                                None,
@@ -1216,8 +1389,40 @@ class BrowserRepository(object):
                                                self._cmisClient.password,
                                                **kwargs)
 
+        if makeRow is not None:
+            return _iterRows(result.pop('results', []), makeRow)
+
         # return the result set
-        return BrowserResultSet(self._cmisClient, self, result, serializer=ResultsSerializer())
+        return BrowserResultSet(self._cmisClient, self, result, serializer=ResultsSerializer(),
+                                pageUrl=queryUrl.encode('utf-8'), pageMethod='post',
+                                pageArgs=kwargs)
+
+    def iterQuery(self, statement, pageSize=100, maxWorkers=4, **kwargs):
+
+        """
+        Returns a generator over every result of the query, in order, like
+        query(statement).iterAll() does. Instead of fetching one page after
+        the other it learns the total number of results from the first page
+        and then fetches the skipCount windows of pageSize results after it
+        on up to maxWorkers threads at once. Windows the server returns
+        short, because it caps maxItems for instance, are completed page by
+        page. See :func:`cmislib.workers.parallelPages`.
+
+        Results that are added or removed while the query runs can shift
+        the windows, so use an ORDER BY on a stable property for exports.
+        The optional arguments are those of :meth:`query`, except maxItems
+        and skipCount.
+
+        >>> q = "select * from cmis:document order by cmis:objectId"
+        >>> for doc in repo.iterQuery(q, pageSize=500, maxWorkers=8):
+        ...     export(doc)
+        """
+
+        def fetchPage(skipCount, maxItems):
+            return self.query(statement, maxItems=str(maxItems),
+                              skipCount=str(skipCount), **kwargs)
+
+        return parallelPages(fetchPage, pageSize, maxWorkers)
 
     def getContentChanges(self, **kwargs):
 
@@ -1277,7 +1482,8 @@ class BrowserRepository(object):
         return BrowserResultSet(self._cmisClient,
                                 self,
                                 data=result,
-                                serializer=ChangeEntrySerializer())
+                                serializer=ChangeEntrySerializer(),
+                                pageUrl=changesUrl, pageArgs=kwargs)
 
     def createDocumentFromString(self,
                                  name,
@@ -1372,7 +1578,8 @@ class BrowserRepository(object):
 
         setProps(properties, props, initialIndex=2)
 
-        contentType, body = encode_multipart_formdata(props, contentFile, contentType)
+        body = MultipartFormData(props, contentFile, contentType)
+        contentType = body.contentType
 
         # invoke the URL
         result = self._cmisClient.binding.post(createDocUrl.encode('utf-8'),
@@ -1384,6 +1591,19 @@ class BrowserRepository(object):
         # return the result set
         return BrowserDocument(self._cmisClient, self, data=result)
 
+    def createDocuments(self, items, parentFolder=None, maxWorkers=4, maxRetries=3,
+                        retryDelay=1.0, callback=None):
+
+        """
+        Creates a document for each item of items, as
+        :func:`cmislib.bulk.createDocuments` does.
+
+        >>> results = repo.createDocuments(items, folder, maxWorkers=16)
+        """
+
+        return createDocuments(self, items, parentFolder, maxWorkers, maxRetries,
+                               retryDelay, callback)
+
     def createDocumentFromSource(self,
                                  sourceId,
                                  properties={},
@@ -1465,14 +1685,23 @@ class BrowserResultSet(object):
 
     """
     Represents a paged result set.
+
+    The Browser binding has no next links, so a result set that knows the
+    URL, HTTP method and arguments of the request that produced it can fetch
+    the following pages itself by asking for them again with a larger
+    skipCount.
     """
 
-    def __init__(self, cmisClient, repository, data, serializer=None):
+    def __init__(self, cmisClient, repository, data, serializer=None,
+                 pageUrl=None, pageMethod='get', pageArgs=None):
         """ Constructor """
         self._cmisClient = cmisClient
         self._repository = repository
         self._data = data
         self._serializer = serializer
+        self._pageUrl = pageUrl
+        self._pageMethod = pageMethod
+        self._pageArgs = dict(pageArgs or {})
         self._results = []
         self.logger = logging.getLogger('cmislib.browser.binding.BrowserResultSet')
         self.logger.debug('Creating an instance of BrowserResultSet')
@@ -1535,12 +1764,132 @@ class BrowserResultSet(object):
                 return True
         return False
 
+    def iterPages(self, limit=None, prefetch=0):
+
+        """
+        Returns a generator that yields the results one page, a list, at a
+        time. It starts with the page this result set holds and keeps asking
+        for the next one, with a larger skipCount, until the server reports
+        no more items or until limit results have been returned. Pages are
+        not kept around once the generator moves on, so memory use is
+        bounded by the page size rather than by the total number of results.
+        The result set itself stays on its current page.
+
+        If prefetch is greater than zero, the pages are fetched by a
+        background thread that stays up to that many pages ahead of the
+        caller, so that the server round-trip for the next page overlaps
+        with the processing of the current one. See
+        :func:`cmislib.workers.readAhead`.
+
+        >>> rs = repo.query("select * from cmis:document", maxItems=200)
+        >>> for page in rs.iterPages():
+        ...     export(page)
+        >>> for page in rs.iterPages(prefetch=2):
+        ...     export(page)
+        """
+
+        if prefetch > 0:
+            return readAhead(self._iterPages(limit), prefetch)
+        return self._iterPages(limit)
+
+    def _iterPages(self, limit):
+
+        """ Generator behind :meth:`iterPages`. """
+
+        count = 0
+        resultSet = self
+        while resultSet is not None:
+            page = resultSet.getResults()
+            if limit is not None:
+                page = page[:max(limit - count, 0)]
+            if not page:
+                return
+            count += len(page)
+            yield page
+            if limit is not None and count >= limit:
+                return
+            resultSet = resultSet._getNextResultSet()
+
+    def iterAll(self, limit=None, prefetch=0):
+
+        """
+        Returns a generator over every result of every page, fetching the
+        pages lazily, and in the background if prefetch is set, as
+        :meth:`iterPages` does. Stops after limit results if a limit is
+        given.
+
+        >>> for doc in rs.iterAll(limit=100000):
+        ...     print doc.name
+        """
+
+        for page in self.iterPages(limit, prefetch):
+            for result in page:
+                yield result
+
+    def _getNextResultSet(self):
+
+        """
+        Returns a new result set for the page that follows this one, or None
+        if there is no such page or this result set does not know how to
+        fetch it.
+        """
+
+        if self._pageUrl is None or not self.hasNext():
+            return None
+        # content changes are paged with the token the server returns
+        changeLogToken = self._data.get('changeLogToken')
+        if changeLogToken is not None:
+            if changeLogToken == self._pageArgs.get('changeLogToken'):
+                return None
+            return self._fetchPage(None, changeLogToken)
+        skipCount = int(self._pageArgs.get('skipCount', 0)) + len(self.getResults())
+        return self._fetchPage(skipCount)
+
+    def _fetchPage(self, skipCount, changeLogToken=None):
+
+        """
+        Repeats the request that produced this result set with the specified
+        skipCount, or changeLogToken, and returns the page as a new result
+        set.
+        """
+
+        args = dict(self._pageArgs)
+        if changeLogToken is not None:
+            args['changeLogToken'] = changeLogToken
+        else:
+            args['skipCount'] = skipCount
+        if self._pageMethod == 'post':
+            data = self._cmisClient.binding.post(self._pageUrl,
+                                                 None,
+                                                 CMIS_FORM_TYPE,
+                                                 self._cmisClient.username,
+                                                 self._cmisClient.password,
+                                                 **args)
+        else:
+            data = self._cmisClient.binding.get(self._pageUrl,
+                                                self._cmisClient.username,
+                                                self._cmisClient.password,
+                                                **args)
+        return BrowserResultSet(self._cmisClient, self._repository, data,
+                                serializer=self._serializer,
+                                pageUrl=self._pageUrl,
+                                pageMethod=self._pageMethod,
+                                pageArgs=args)
+
+    def _moveTo(self, resultSet):
+
+        """ Makes this result set hold the page of the specified one. """
+
+        self._pageArgs = resultSet._pageArgs
+        self._results = resultSet.getResults()
+        self._data = resultSet._data
+
     def getFirst(self):
 
         """
         Returns the first page of results as a dictionary of
         :class:`CmisObject` objects or its appropriate sub-type. This only
-        works when the server returns a "first" link. Not all of them do.
+        works when the result set knows the request that produced it.
 
         >>> resultSet.hasFirst()
         True
@@ -1551,7 +1900,10 @@ class BrowserResultSet(object):
         <cmislib.model.Document object at 0x10480bc90>
         """
 
-        pass
+        if self._pageUrl is None:
+            return None
+        self._moveTo(self._fetchPage(0))
+        return self._results
 
     def getPrev(self):
 
@@ -1584,7 +1936,11 @@ class BrowserResultSet(object):
         <cmislib.model.Document object at 0x10480bc90>
         """
 
-        pass
+        resultSet = self._getNextResultSet()
+        if resultSet is None:
+            return None
+        self._moveTo(resultSet)
+        return self._results
 
     def getLast(self):
 
@@ -1616,6 +1972,21 @@ class BrowserResultSet(object):
         if self._data and 'hasMoreItems' in self._data:
             return self._data['hasMoreItems']
 
+    def getChangeLogToken(self):
+
+        """
+        Returns the change log token to pass to
+        :meth:`Repository.getContentChanges` for the changes that follow
+        the ones on this page, or None if the server didn't say.
+
+        >>> rs = repo.getContentChanges(changeLogToken='2692', maxItems=100)
+        >>> rs.getChangeLogToken()
+        u'2792'
+        """
+
+        if self._data:
+            return self._data.get('changeLogToken')
+
     def getNumItems(self):
 
         """
@@ -1625,7 +1996,7 @@ class BrowserResultSet(object):
         """
 
         if self._data:
-            return self._data['numItems']
+            return self._data.get('numItems')
 
     def hasPrev(self):
 
@@ -1670,6 +2041,8 @@ class BrowserDocument(BrowserCmisObject):
     An object typically associated with file content.
     """
 
+    __slots__ = ()
+
     def checkout(self):
 
         """
@@ -1823,7 +2196,8 @@ class BrowserDocument(BrowserCmisObject):
 
         ciUrl = self._repository.getRootFolderUrl() + "?objectId=" + self.id + "&cmisaction=checkin"
 
-        contentType, body = encode_multipart_formdata(props, contentFile, contentType)
+        body = MultipartFormData(props, contentFile, contentType)
+        contentType = body.contentType
 
         # invoke the URL
         result = self._cmisClient.binding.post(ciUrl.encode('utf-8'),
@@ -1903,22 +2277,33 @@ class BrowserDocument(BrowserCmisObject):
         # return the result set
         return BrowserResultSet(self._cmisClient, self._repository, data={'objects': result}, serializer=VersionsSerializer())
 
-    def getContentStream(self):
+    def getContentStream(self, offset=None, length=None):
 
         """
-        Returns the CMIS service response from invoking the 'enclosure' link.
+        Returns the CMIS service response from invoking the 'enclosure' link,
+        as a :class:`cmislib.net.ContentStream` that reads the content from
+        the connection as it is consumed rather than holding it in memory.
 
         >>> doc.getName()
         u'sample-b.pdf'
         >>> o = open('tmp.pdf', 'wb')
         >>> result = doc.getContentStream()
-        >>> o.write(result.read())
+        >>> result.copyTo(o)
+        117248
         >>> result.close()
         >>> o.close()
         >>> import os.path
         >>> os.path.getsize('tmp.pdf')
         117248
 
+        To get part of the content, pass the offset of its first byte and,
+        unless it runs to the end, its length. The part is asked for with
+        an HTTP Range request, see :meth:`cmislib.net.RESTService.getRange`.
+
+        >>> result = doc.getContentStream(offset=100000)
+        >>> len(result.read())
+        17248
+
         The optional streamId argument is not yet supported.
         """
 
@@ -1926,13 +2311,35 @@ class BrowserDocument(BrowserCmisObject):
             return None
 
         contentUrl = self._repository.getRootFolderUrl() + "?objectId=" + self.getObjectId() + "&selector=content"
-        result, content = Rest().get(contentUrl.encode('utf-8'),
-                                     self._cmisClient.username,
-                                     self._cmisClient.password,
-                                     **self._cmisClient.extArgs)
-        if result['status'] != '200':
-            raise CmisException(result['status'])
-        return StringIO.StringIO(content)
+        rest = self._cmisClient.binding.getRestService()
+        if offset is None and length is None:
+            stream = rest.getStream(contentUrl.encode('utf-8'),
+                                    self._cmisClient.username,
+                                    self._cmisClient.password,
+                                    **self._cmisClient.extArgs)
+        else:
+            stream = rest.getRange(contentUrl.encode('utf-8'),
+                                   offset or 0,
+                                   length,
+                                   self._cmisClient.username,
+                                   self._cmisClient.password,
+                                   **self._cmisClient.extArgs)
+        if stream.status not in (200, 206):
+            stream.close()
+            raise CmisException(str(stream.status))
+        return stream
+
+    def downloadTo(self, path, resume=True, maxRetries=3, retryDelay=1.0, **kwargs):
+
+        """
+        Writes the content of this document to the file at path, resuming an
+        interrupted download, with :func:`cmislib.download.downloadTo`.
+
+        >>> doc.downloadTo('/tmp/big.iso')
+        4294967296L
+        """
+
+        return downloadTo(self, path, resume, maxRetries, retryDelay, **kwargs)
 
     def setContentStream(self, contentFile, contentType=None):
 
@@ -1946,7 +2353,8 @@ class BrowserDocument(BrowserCmisObject):
         # get the root folder URL
         createDocUrl = self._repository.getRootFolderUrl() + "?objectId=" + self.id + "&cmisaction=setContent"
 
-        contentType, body = encode_multipart_formdata(None, contentFile, contentType)
+        body = MultipartFormData(None, contentFile, contentType)
+        contentType = body.contentType
 
         # invoke the URL
         result = self._cmisClient.binding.post(createDocUrl.encode('utf-8'),
@@ -2005,10 +2413,11 @@ class BrowserDocument(BrowserCmisObject):
         renditions = []
 
         contentUrl = self._repository.getRootFolderUrl() + "?objectId=" + self.getObjectId() + "&cmisselector=renditions&renditionFilter=*"
-        result, content = Rest().get(contentUrl.encode('utf-8'),
-                                     self._cmisClient.username,
-                                     self._cmisClient.password,
-                                     **self._cmisClient.extArgs)
+        rest = self._cmisClient.binding.getRestService()
+        result, content = rest.get(contentUrl.encode('utf-8'),
+                                   self._cmisClient.username,
+                                   self._cmisClient.password,
+                                   **self._cmisClient.extArgs)
         if result['status'] != '200':
             raise CmisException(result['status'])
 
@@ -2052,6 +2461,8 @@ class BrowserFolder(BrowserCmisObject):
     A container object that can hold other :class:`CmisObject` objects
     """
 
+    __slots__ = ()
+
     def createFolder(self, name, properties={}, **kwargs):
 
         """
@@ -2177,6 +2588,19 @@ class BrowserFolder(BrowserCmisObject):
                                                contentType,
                                                contentEncoding)
 
+    def createDocuments(self, items, maxWorkers=4, maxRetries=3, retryDelay=1.0,
+                        callback=None):
+
+        """
+        Creates a document in this folder for each item of items, as
+        :func:`cmislib.bulk.createDocuments` does.
+
+        >>> results = folder.createDocuments(items, maxWorkers=16)
+        """
+
+        return self._repository.createDocuments(items, self, maxWorkers, maxRetries,
+                                                retryDelay, callback)
+
     def getChildren(self, **kwargs):
 
         """
@@ -2206,7 +2630,8 @@ class BrowserFolder(BrowserCmisObject):
                                               self._cmisClient.password,
                                               **kwargs)
         # return the result set
-        return BrowserResultSet(self._cmisClient, self._repository, result, serializer=ChildrenSerializer())
+        return BrowserResultSet(self._cmisClient, self._repository, result, serializer=ChildrenSerializer(),
+                                pageUrl=byObjectIdUrl.encode('utf-8'), pageArgs=kwargs)
 
     def getDescendants(self, **kwargs):
 
@@ -2282,6 +2707,17 @@ class BrowserFolder(BrowserCmisObject):
         # return the result set
         return BrowserResultSet(self._cmisClient, self._repository, result, serializer=TreeSerializer())
 
+    def walk(self, maxWorkers=8, maxDepth=None, onError=None, **kwargs):
+
+        """
+        Walks the descendants of this folder with :func:`cmislib.crawl.walk`.
+
+        >>> for path, obj in folder.walk(filter='cmis:name', maxItems=500):
+        ...     print path
+        """
+
+        return walk(self, maxWorkers=maxWorkers, maxDepth=maxDepth, onError=onError, **kwargs)
+
     def getParent(self):
 
         """
@@ -2399,6 +2835,8 @@ class BrowserRelationship(BrowserCmisObject):
     Defines a relationship object between two :class:`CmisObjects` objects
     """
 
+    __slots__ = ()
+
     def getSourceId(self):
 
         """
@@ -2441,14 +2879,14 @@ class BrowserRelationship(BrowserCmisObject):
     target = property(getTarget)
 
 
-class BrowserPolicy(CmisObject):
+class BrowserPolicy(BrowserCmisObject):
 
     """
     An arbirary object that can 'applied' to objects that the
     repository identifies as being 'controllable'.
     """
 
-    pass
+    __slots__ = ()
 
 
 class BrowserObjectType(ObjectType):
@@ -2644,10 +3082,12 @@ class BrowserProperty(object):
     type.
     """
 
+    __slots__ = ('data',)
+    logger = logging.getLogger('cmislib.browser.binding.BrowserProperty')
+
     def __init__(self, data):
         """Constructor"""
         self.data = data
-        self.logger = logging.getLogger('cmislib.browser.binding.BrowserProperty')
         self.logger.debug('Creating an instance of BrowserProperty')
 
     def __str__(self):
@@ -2943,7 +3383,7 @@ class BrowserACE(ACE):
     Represents an ACE retrieved with the Browser Binding.
     """
 
-    pass
+    __slots__ = ()
 
 
 class BrowserChangeEntry(ChangeEntry):
@@ -2971,6 +3411,10 @@ class BrowserChangeEntry(ChangeEntry):
     u'updated'
     """
 
+    __slots__ = ('_cmisClient', '_repository', '_data', '_properties', '_objectId',
+                 '_changeEntryId', '_changeType', '_changeTime')
+    logger = logging.getLogger('cmislib.browser.binding.BrowserChangeEntry')
+
     def __init__(self, cmisClient, repository, data):
         """Constructor"""
         self._cmisClient = cmisClient
@@ -2981,7 +3425,6 @@ class BrowserChangeEntry(ChangeEntry):
         self._changeEntryId = None
         self._changeType = None
         self._changeTime = None
-        self.logger = logging.getLogger('cmislib.browser.binding.BrowserChangeEntry')
         self.logger.debug('Creating an instance of BrowserChangeEntry')
 
     def getId(self):
@@ -3046,19 +3489,22 @@ class BrowserChangeEntry(ChangeEntry):
         capabilities of the repository ("capabilityChanges") the list may not
         include the actual property values that changed.
         """
-        if not self._properties:
+        properties = self._properties
+        if not properties:
             props = self._data.get('properties')
+            properties = {}
             for prop in props.itervalues():
                 # property could be multi-valued
                 if type(prop['value']) is list:
                     propVal = []
                     for val in prop['value']:
                         propVal.append(parsePropValueByType(val, prop['type']))
-                    self._properties[prop['id']] = propVal
+                    properties[prop['id']] = propVal
                 else:
-                    self._properties[prop['id']] = parsePropValueByType(prop['value'], prop['type'])
+                    properties[prop['id']] = parsePropValueByType(prop['value'], prop['type'])
+            self._properties = properties
 
-        return self._properties
+        return properties
 
     id = property(getId)
     objectId = property(getObjectId)
@@ -3124,10 +3570,12 @@ class BrowserRendition(object):
     This class represents a Rendition.
     """
 
+    __slots__ = ('data',)
+    logger = logging.getLogger('cmislib.browser.binding.BrowserRendition')
+
     def __init__(self, data):
         """Constructor"""
         self.data = data
-        self.logger = logging.getLogger('cmislib.browser.binding.BrowserRendition')
         self.logger.debug('Creating an instance of BrowserRendition')
 
     def __str__(self):
@@ -3213,30 +3661,102 @@ def setProps(properties, props, initialIndex=0):
         i += 1
 
 
+def parseProperties(propertiesData):
+
+    """
+    Returns a dict of property ids and parsed values for the properties
+    object of a JSON object or query result.
+    """
+
+    properties = {}
+    for prop in propertiesData.itervalues():
+        # property could be multi-valued
+        if type(prop['value']) is list:
+            propVal = []
+            for val in prop['value']:
+                propVal.append(parsePropValueByType(val, prop['type']))
+            properties[internName(prop['id'])] = propVal
+        else:
+            properties[internName(prop['id'])] = parsePropValueByType(prop['value'], prop['type'])
+    return properties
+
+
+def _iterRows(results, makeRow):
+
+    """
+    Returns a generator over a row for each of the query results, that
+    lets go of each result once its row is made.
+    """
+
+    results.reverse()
+    while results:
+        yield makeRow(parseProperties(results.pop()['properties']))
+
+
 def getSpecializedObject(obj, **kwargs):
 
     """
     Returns an instance of the appropriate :class:`CmisObject` class or one
-    of its child types depending on the specified baseType.
+    of its child types depending on the specified baseType. The returned
+    object starts out with the properties and allowable actions obj has
+    already parsed.
     """
 
     moduleLogger.debug('Inside getSpecializedObject')
 
-    if 'cmis:baseTypeId' in obj.getProperties():
-        baseType = obj.getProperties()['cmis:baseTypeId']
-        if baseType == 'cmis:folder':
-            return BrowserFolder(obj._cmisClient, obj._repository, obj.getObjectId(), obj.data, **kwargs)
-        if baseType == 'cmis:document':
-            return BrowserDocument(obj._cmisClient, obj._repository, obj.getObjectId(), obj.data, **kwargs)
-        if baseType == 'cmis:relationship':
-            return BrowserRelationship(obj._cmisClient, obj._repository, obj.getObjectId(), obj.data, **kwargs)
-        if baseType == 'cmis:policy':
-            return BrowserPolicy(obj._cmisClient, obj._repository, obj.getObjectId(), obj.data, **kwargs)
-
-    # if the base type ID wasn't found in the props (this can happen when
-    # someone runs a query that doesn't select * or doesn't individually
-    # specify baseTypeId) or if the type isn't one of the known base
-    # types, give the object back
+    properties = obj.getProperties()
+    baseType = properties.get('cmis:baseTypeId')
+    if baseType == 'cmis:folder':
+        cls = BrowserFolder
+    elif baseType == 'cmis:document':
+        cls = BrowserDocument
+    elif baseType == 'cmis:relationship':
+        cls = BrowserRelationship
+    elif baseType == 'cmis:policy':
+        cls = BrowserPolicy
+    else:
+        # if the base type ID wasn't found in the props (this can happen when
+        # someone runs a query that doesn't select * or doesn't individually
+        # specify baseTypeId) or if the type isn't one of the known base
+        # types, give the object back
+        return obj
+
+    specialized = cls(obj._cmisClient, obj._repository, obj.getObjectId(), obj.data, **kwargs)
+    # hand over what has been parsed already so that it isn't parsed twice
+    specialized._properties = properties
+    specialized._allowableActions = obj._allowableActions
+    return specialized
+
+
+def getSpecializedObjectFromEntry(cmisClient, repository, entry, **kwargs):
+
+    """
+    Returns an instance of the appropriate :class:`CmisObject` class for an
+    entry dict holding the 'properties' and 'allowableActions' of an
+    object, such as those a :class:`cmislib.cache.ObjectCache` keeps. The
+    object's JSON is only fetched, with a reload, when a method needs more
+    than that.
+    """
+
+    properties = entry['properties']
+    baseType = properties.get('cmis:baseTypeId')
+    if baseType == 'cmis:folder':
+        cls = BrowserFolder
+    elif baseType == 'cmis:document':
+        cls = BrowserDocument
+    elif baseType == 'cmis:relationship':
+        cls = BrowserRelationship
+    elif baseType == 'cmis:policy':
+        cls = BrowserPolicy
+    else:
+        cls = BrowserCmisObject
+    objectId = properties.get('cmis:objectId')
+    if objectId is not None:
+        objectId = CmisId(objectId)
+    obj = cls(cmisClient, repository, objectId, None, **kwargs)
+    obj._properties = properties
+    if entry['allowableActions'] is not None:
+        obj._allowableActions = entry['allowableActions']
     return obj
 
 
@@ -3246,35 +3766,83 @@ def encode_multipart_formdata(fields, contentFile, contentType):
     fields is a sequence of (name, value) elements for regular form fields.
     files is a sequence of (name, filename, value) elements for data to be uploaded as files
     Return (content_type, body) ready for httplib.HTTP instance
+
+    The body is built in memory. Use :class:`MultipartFormData` to stream
+    it instead.
+    """
+
+    body = MultipartFormData(fields, contentFile, contentType)
+    return body.contentType, ''.join(body)
+
+
+class MultipartFormData(object):
+
     """
+    A multipart/form-data request body, with the regular form fields and
+    the content of contentFile, that is sent in chunks rather than built in
+    memory. Pass it as the payload of :meth:`BrowserBinding.post`.
+
+    The content file is read chunkSize bytes at a time while the body is
+    sent. Its length, and so the Content-Length of the body, is worked out
+    up front by seeking to its end. A file that can't seek is read into
+    memory instead.
+
+    >>> body = MultipartFormData(props, open('big.iso', 'rb'), 'application/octet-stream')
+    >>> binding.post(url, body, body.contentType, 'admin', 'admin')
+    """
+
+    chunkSize = 65536
 
-    boundary = 'aPacHeCheMIStrycMisLIb%s' % (int(time.time()))
-    crlf = '\r\n'
-    L = []
-    fileName = None
-    if fields:
-        for (key, value) in fields.iteritems():
-            if key == 'cmis:name':
-                fileName = value
+    def __init__(self, fields, contentFile, contentType):
+        """ Constructor """
+        boundary = 'aPacHeCheMIStrycMisLIb%s' % (int(time.time()))
+        crlf = '\r\n'
+        L = []
+        fileName = None
+        if fields:
+            for (key, value) in fields.iteritems():
+                if key == 'cmis:name':
+                    fileName = value.encode('utf-8')
+                L.append('--' + boundary)
+                L.append('Content-Disposition: form-data; name="%s"' % key)
+                L.append('Content-Type: text/plain; charset=utf-8')
+                L.append('')
+                L.append(value.encode('utf-8'))
+
+        self._file = None
+        self._start = 0
+        self._size = 0
+        self._tail = ''
+        if contentFile:
             L.append('--' + boundary)
-            L.append('Content-Disposition: form-data; name="%s"' % key)
-            L.append('Content-Type: text/plain; charset=utf-8')
+            L.append('Content-Disposition: form-data; name="%s"; filename=%s' % ('content', fileName))
+            L.append('Content-Type: %s' % contentType)
+            L.append('Content-Transfer-Encoding: binary')
+            L.append('')
+            L.append('')
+            self._file, self._start, self._size = getFileExtent(contentFile)
+            self._head = crlf.join(L)
+            self._tail = crlf + '--' + boundary + '--' + crlf
+        else:
+            L.append('--' + boundary + '--')
             L.append('')
-            L.append(value.encode('utf-8'))
-
-    if contentFile:
-        L.append('--' + boundary)
-        L.append('Content-Disposition: form-data; name="%s"; filename=%s' % ('content', fileName))
-        L.append('Content-Type: %s' % contentType)
-        L.append('Content-Transfer-Encoding: binary')
-        L.append('')
-        L.append(contentFile.read())
-
-    L.append('--' + boundary + '--')
-    L.append('')
-    body = crlf.join(L)
-    content_type = 'multipart/form-data; boundary=%s' % boundary
-    return content_type, body
+            self._head = crlf.join(L)
+        self.contentType = 'multipart/form-data; boundary=%s' % boundary
+        self.contentLength = len(self._head) + self._size + len(self._tail)
+
+    def __iter__(self):
+        """ Iterates over the chunks of the body, from its start """
+        yield self._head
+        if self._file is not None:
+            self._file.seek(self._start)
+            remaining = self._size
+            while remaining > 0:
+                data = self._file.read(min(self.chunkSize, remaining))
+                if not data:
+                    raise IOError('The content file ended before its expected length')
+                remaining -= len(data)
+                yield data
+        yield self._tail
 
 
 class ResultsSerializer(object):
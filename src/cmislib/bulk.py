@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+#
+#      Licensed to the Apache Software Foundation (ASF) under one
+#      or more contributor license agreements.  See the NOTICE file
+#      distributed with this work for additional information
+#      regarding copyright ownership.  The ASF licenses this file
+#      to you under the Apache License, Version 2.0 (the
+#      "License"); you may not use this file except in compliance
+#      with the License.  You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#      Unless required by applicable law or agreed to in writing,
+#      software distributed under the License is distributed on an
+#      "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#      KIND, either express or implied.  See the License for the
+#      specific language governing permissions and limitations
+#      under the License.
+#
+"""
+Module containing the bulk operations the repository classes of both
+bindings build on, such as fetching or creating many objects at once.
+They only use the public :class:`cmislib.domain.Repository` API.
+"""
+
+import errno
+import httplib
+import logging
+import socket
+import time
+from cmislib.exceptions import CmisException, ObjectNotFoundException
+from cmislib.workers import WorkerPool
+
+moduleLogger = logging.getLogger('cmislib.bulk')
+
+# the base types whose objects getObjects looks for with queries
+QUERY_BASE_TYPES = ('cmis:document', 'cmis:folder')
+# the getObject arguments the getObjects queries can honour
+QUERY_ARGS = ('filter',)
+# HTTP statuses worth trying again
+TRANSIENT_STATUSES = ('500', '502', '503', '504')
+# HTTP statuses with which the server says it didn't act on the request
+REFUSED_STATUSES = ('503',)
+# socket errors that mean the request never reached the server
+REFUSED_ERRNOS = (errno.ECONNREFUSED, errno.EHOSTUNREACH, errno.ENETUNREACH)
+
+
+class _NotFound(object):
+
+    """ Type of the :data:`NOT_FOUND` marker. """
+
+    def __repr__(self):
+        return 'NOT_FOUND'
+
+    def __nonzero__(self):
+        return False
+
+
+#: Stands in for the objects :func:`getObjects` could not find.
+NOT_FOUND = _NotFound()
+# what _getChild returns when it can't tell whether the child exists
+_UNKNOWN = object()
+
+
+def getObjects(repository, objectIds, chunkSize=100, maxWorkers=4, **kwargs):
+
+    """
+    Returns a list holding the object of repository for each of the
+    specified object IDs, in the same order, with :data:`NOT_FOUND` in
+    place of the objects that don't exist.
+
+    If the repository supports queries, the objects are looked for
+    chunkSize at a time with "cmis:objectId IN (...)" queries on the
+    :data:`QUERY_BASE_TYPES`, instead of one request per object. The
+    objects a query returns carry the properties of their base type, or
+    only those named in the filter argument, plus cmis:objectId,
+    cmis:baseTypeId and cmis:objectTypeId. Objects the queries don't
+    return, such as relationships or older versions, and every object of a
+    repository that can't run the queries, are fetched one by one with
+    :meth:`cmislib.domain.Repository.getObject`, which gets the keyword
+    arguments. As the queries can't honour any keyword argument but filter,
+    such as includeACL or renditionFilter, every object is fetched one by
+    one when one of those is given. Queries and single fetches run on up to
+    maxWorkers threads.
+
+    >>> docs = getObjects(repo, objectIds, filter='cmis:name,cmis:contentStreamLength')
+    >>> missing = [i for i, doc in zip(objectIds, docs) if doc is NOT_FOUND]
+    """
+
+    objectIds = list(objectIds)
+    found = {}
+    pool = WorkerPool(maxWorkers)
+    try:
+        if _canQuery(repository) and not [k for k in kwargs if k not in QUERY_ARGS]:
+            uniqueIds = list(set(objectIds))
+            chunks = [uniqueIds[i:i + chunkSize] for i in xrange(0, len(uniqueIds), chunkSize)]
+            select = _getSelectList(kwargs.get('filter'))
+            statements = [_getInStatement(select, baseType, chunk)
+                          for chunk in chunks for baseType in QUERY_BASE_TYPES]
+            for results in pool.map(lambda statement: _queryObjects(repository, statement),
+                                    statements):
+                for obj in results:
+                    found[obj.getObjectId()] = obj
+
+        missing = [objectId for objectId in set(objectIds) if objectId not in found]
+        if missing:
+            moduleLogger.debug('Fetching %d objects one by one', len(missing))
+            for objectId, obj in zip(missing,
+                                     pool.map(lambda objectId: _getObject(repository, objectId, kwargs),
+                                              missing)):
+                found[objectId] = obj
+    finally:
+        pool.shutdown(wait=False)
+
+    return [found[objectId] for objectId in objectIds]
+
+
+def _canQuery(repository):
+
+    """ Returns True if the repository supports queries on metadata. """
+
+    return repository.getCapabilities().get('Query') not in (None, 'none', 'fulltextonly')
+
+
+def _getSelectList(propertyFilter):
+
+    """
+    Returns the select list of the queries run for a getObjects filter.
+    """
+
+    if not propertyFilter or propertyFilter.strip() == '*':
+        return '*'
+    columns = ['cmis:objectId', 'cmis:baseTypeId', 'cmis:objectTypeId']
+    for column in propertyFilter.split(','):
+        column = column.strip()
+        if column and column not in columns:
+            columns.append(column)
+    return ', '.join(columns)
+
+
+def _getInStatement(select, baseType, objectIds):
+
+    """
+    Returns a statement that selects the objects of baseType with the
+    specified IDs.
+    """
+
+    quoted = ["'%s'" % objectId.replace('\\', '\\\\').replace("'", "\\'")
+              for objectId in objectIds]
+    return 'SELECT %s FROM %s WHERE cmis:objectId IN (%s)' % (select, baseType, ', '.join(quoted))
+
+
+def _queryObjects(repository, statement):
+
+    """
+    Returns the objects a getObjects query selects, or no objects at all if
+    the repository refuses the query, so that they get fetched one by one.
+    """
+
+    try:
+        return list(repository.query(statement).iterAll())
+    except CmisException, e:
+        moduleLogger.debug('Query failed, falling back to getObject: %s', e)
+        return []
+
+
+def _getObject(repository, objectId, kwargs):
+
+    """
+    Returns the object with the specified ID, or :data:`NOT_FOUND`.
+    """
+
+    try:
+        return repository.getObject(objectId, **kwargs)
+    except ObjectNotFoundException:
+        return NOT_FOUND
+
+
+def createDocuments(repository, items, parentFolder=None, maxWorkers=4,
+                    maxRetries=3, retryDelay=1.0, callback=None):
+
+    """
+    Creates a document for each item of items in parentFolder, running up
+    to maxWorkers creates at once, and returns a generator over a
+    :class:`CreateResult` per item, in the order of the items. The
+    documents are only created as the generator is consumed. Items are
+    (name, properties, content) or (name, properties, content,
+    contentType) tuples, where content is None, a file-like object or the
+    path of a file. Files given by path are only opened when their document
+    is created, and items are read from the iterable as workers become
+    free, so items can be a generator over millions of files.
+
+    A create that fails before the server acted on it, because the
+    connection was refused or with a 503 response, is tried again up to
+    maxRetries times, waiting retryDelay seconds before the first retry and
+    twice as long before each next one. A file-like content must be
+    seekable for that. A create that may have failed after the server
+    created the document, because the connection was lost or with a 500,
+    502 or 504 response, is only tried again when parentFolder is given
+    and has no child of that name yet; if it has, that child is the
+    result. So a retry never leaves a duplicate behind. Other failures
+    aren't retried: the result holds the exception and the remaining items
+    go on.
+
+    If a callback is passed, it is called with each result, on the worker
+    thread, as soon as that item is done, and createDocuments creates every
+    document before it returns None instead of a generator. The results are
+    then only handed to the callback, so they aren't kept in memory.
+
+    >>> items = ((os.path.basename(path), {}, path) for path in paths)
+    >>> for result in createDocuments(repo, items, folder, maxWorkers=16):
+    ...     if result.error is not None:
+    ...         print result.name, result.error
+    >>> createDocuments(repo, items, folder, maxWorkers=16, callback=progress.update)
+    """
+
+    def create(indexedItem):
+        result = _createDocument(repository, parentFolder, indexedItem[0], indexedItem[1],
+                                 maxRetries, retryDelay)
+        if callback is not None:
+            callback(result)
+        return result
+
+    results = _createDocuments(create, items, maxWorkers)
+    if callback is None:
+        return results
+    for result in results:
+        pass
+
+
+def _createDocuments(create, items, maxWorkers):
+
+    """ Generator behind :func:`createDocuments`. """
+
+    pool = WorkerPool(maxWorkers)
+    try:
+        for result in pool.map(create, enumerate(items)):
+            yield result
+    finally:
+        pool.shutdown(wait=False)
+
+
+class CreateResult(object):
+
+    """
+    The outcome of creating one item with :func:`createDocuments`: its
+    index in the items and its name, the new document or, if it could not
+    be created, the error, and the number of attempts it took.
+    """
+
+    __slots__ = ('index', 'name', 'document', 'error', 'attempts')
+
+    def __init__(self, index, name, document=None, error=None, attempts=1):
+        """ Constructor """
+        self.index = index
+        self.name = name
+        self.document = document
+        self.error = error
+        self.attempts = attempts
+
+    def __repr__(self):
+        if self.error is not None:
+            return '<CreateResult %s failed: %s>' % (self.name, self.error)
+        return '<CreateResult %s>' % self.name
+
+
+def _createDocument(repository, parentFolder, index, item, maxRetries, retryDelay):
+
+    """
+    Creates the document for one :func:`createDocuments` item, retrying
+    transient failures, and returns its :class:`CreateResult`.
+    """
+
+    name, properties, content = item[:3]
+    contentType = None
+    if len(item) > 3:
+        contentType = item[3]
+    start = None
+    if hasattr(content, 'seek'):
+        start = content.tell()
+    attempts = 0
+    while True:
+        attempts += 1
+        contentFile = content
+        if isinstance(content, basestring):
+            contentFile = open(content, 'rb')
+        elif start is not None:
+            content.seek(start)
+        try:
+            # createDocument changes the properties it is given
+            document = repository.createDocument(name, dict(properties or {}), parentFolder,
+                                                 contentFile, contentType)
+            return CreateResult(index, name, document, None, attempts)
+        except Exception, e:
+            retryable = content is None or start is not None or isinstance(content, basestring)
+            if attempts > maxRetries or not retryable or not _isTransient(e):
+                return CreateResult(index, name, None, e, attempts)
+            if not _isRefused(e):
+                # the server may have created the document before failing
+                try:
+                    document = _getChild(repository, parentFolder, name)
+                except Exception:
+                    document = _UNKNOWN
+                if document is _UNKNOWN:
+                    # no telling, so don't risk a duplicate
+                    return CreateResult(index, name, None, e, attempts)
+                if document is not None:
+                    return CreateResult(index, name, document, None, attempts)
+            moduleLogger.debug('Creating %s failed, trying again: %s', name, e)
+        finally:
+            if contentFile is not content:
+                contentFile.close()
+        time.sleep(retryDelay * 2 ** (attempts - 1))
+
+
+def _isTransient(error):
+
+    """ Returns True if error is worth trying again. """
+
+    if isinstance(error, (socket.error, httplib.HTTPException)):
+        return True
+    return isinstance(error, CmisException) and str(error.status) in TRANSIENT_STATUSES
+
+
+def _isRefused(error):
+
+    """
+    Returns True if error says the server didn't act on the request.
+    """
+
+    if isinstance(error, socket.error):
+        return error.errno in REFUSED_ERRNOS
+    return isinstance(error, CmisException) and str(error.status) in REFUSED_STATUSES
+
+
+def _getChild(repository, parentFolder, name):
+
+    """
+    Returns the object named name in parentFolder, None if there is no such
+    object, or _UNKNOWN if that can't be told.
+    """
+
+    if parentFolder is None:
+        return _UNKNOWN
+    path = parentFolder.getProperties().get('cmis:path')
+    if not path:
+        return _UNKNOWN
+    try:
+        return repository.getObjectByPath(path.rstrip('/') + '/' + name)
+    except ObjectNotFoundException:
+        return None
@@ -0,0 +1,533 @@
+# -*- coding: utf-8 -*-
+#
+#      Licensed to the Apache Software Foundation (ASF) under one
+#      or more contributor license agreements.  See the NOTICE file
+#      distributed with this work for additional information
+#      regarding copyright ownership.  The ASF licenses this file
+#      to you under the Apache License, Version 2.0 (the
+#      "License"); you may not use this file except in compliance
+#      with the License.  You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#      Unless required by applicable law or agreed to in writing,
+#      software distributed under the License is distributed on an
+#      "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#      KIND, either express or implied.  See the License for the
+#      specific language governing permissions and limitations
+#      under the License.
+#
+"""
+Module containing the in-memory caches cmislib keeps of things that rarely
+change on the server, such as type definitions, and the
+:class:`ObjectCache` of hot objects.
+"""
+from collections import OrderedDict
+import datetime
+import hashlib
+import iso8601
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+
+class LRUCache(object):
+
+    """
+    A size-bounded mapping whose entries expire after a time-to-live. When
+    the cache is full, the least recently used entry is evicted to make
+    room. It can safely be used from several threads.
+    """
+
+    def __init__(self, maxSize=1000, ttl=None, maxBytes=None):
+
+        """
+        :param maxSize: The maximum number of entries to keep. 0 turns the
+         cache off.
+        :param ttl: The number of seconds an entry stays valid after it was
+         put in the cache, or None to keep entries until they are evicted.
+        :param maxBytes: The maximum total size of the values kept, or
+         None for no limit. The size of a value is its length, unless
+         :meth:`put` is told otherwise.
+
+        >>> cache = LRUCache(maxSize=500, ttl=300)
+        """
+
+        self.maxSize = maxSize
+        self.ttl = ttl
+        self.maxBytes = maxBytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key, default=None):
+
+        """
+        Returns the value cached for key, or default if there is none or it
+        has expired.
+        """
+
+        self._lock.acquire()
+        try:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires, size = entry
+            if expires is not None and expires < time.time():
+                self._bytes -= size
+                self.misses += 1
+                self.evictions += 1
+                return default
+            # re-inserting moves the entry to the most recently used end
+            self._entries[key] = entry
+            self.hits += 1
+            return value
+        finally:
+            self._lock.release()
+
+    def put(self, key, value, size=None):
+
+        """
+        Caches value under key, replacing any previous value. If the cache
+        has a maxBytes, the value counts for size bytes against it, or for
+        its length if size is None.
+        """
+
+        if self.maxSize <= 0:
+            return
+        if self.maxBytes is None:
+            size = 0
+        elif size is None:
+            size = len(value)
+        expires = None
+        if self.ttl is not None:
+            expires = time.time() + self.ttl
+        self._lock.acquire()
+        try:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            if self.maxBytes is not None and size > self.maxBytes:
+                return
+            self._entries[key] = (value, expires, size)
+            self._bytes += size
+            while len(self._entries) > self.maxSize or \
+                    (self.maxBytes is not None and self._bytes > self.maxBytes):
+                self._bytes -= self._entries.popitem(last=False)[1][2]
+                self.evictions += 1
+        finally:
+            self._lock.release()
+
+    def invalidate(self, key=None):
+
+        """
+        Forgets the value cached for key, or every value if key is None.
+        """
+
+        self._lock.acquire()
+        try:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._bytes -= entry[2]
+        finally:
+            self._lock.release()
+
+    def getStats(self):
+
+        """
+        Returns a dict of counters describing how well the cache is doing:
+        'hits' and 'misses' count lookups that did and did not find a valid
+        entry, 'evictions' counts entries dropped because they expired or
+        the cache was full, and 'size' is the number of entries cached.
+        When the cache has a maxBytes, 'bytes' is the total size of the
+        values cached.
+
+        >>> repo.typeCache.getStats()
+        {'hits': 99999, 'misses': 1, 'evictions': 0, 'size': 1}
+        """
+
+        self._lock.acquire()
+        try:
+            stats = {'hits': self.hits,
+                     'misses': self.misses,
+                     'evictions': self.evictions,
+                     'size': len(self._entries)}
+            if self.maxBytes is not None:
+                stats['bytes'] = self._bytes
+            return stats
+        finally:
+            self._lock.release()
+
+
+class FileCache(object):
+
+    """
+    Keeps string values in files below a directory, one file per key, so
+    that they outlive the process that stored them. Used as a
+    :class:`cmislib.model.CmisClient` serviceDocumentCache, it lets a new
+    process start without downloading the service document. Files are
+    replaced atomically, so several processes can share a directory.
+
+    If maxEntries or maxBytes is set, the least recently used files are
+    removed once the directory holds more files, or more bytes, than that.
+    The directory is only checked every :attr:`pruneInterval` puts, so it
+    can briefly go over the limits.
+    """
+
+    #: The number of puts between two checks of the limits.
+    pruneInterval = 100
+
+    def __init__(self, directory, maxEntries=None, maxBytes=None):
+
+        """
+        >>> cache = FileCache(os.path.expanduser('~/.cmislib'))
+        >>> objects = FileCache('/var/cache/cmislib/objects', maxEntries=100000,
+        ...                     maxBytes=256 * 1024 * 1024)
+        """
+
+        self.directory = directory
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self._puts = 0
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # another process may have just created it
+                if not os.path.isdir(directory):
+                    raise
+
+    def get(self, key):
+
+        """
+        Returns the value stored for key, or None.
+        """
+
+        path = self._getPath(key)
+        try:
+            f = open(path, 'rb')
+        except IOError:
+            return None
+        try:
+            value = f.read()
+        finally:
+            f.close()
+        if self.maxEntries is not None or self.maxBytes is not None:
+            # the modification time tells the pruning which files were used last
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+        return value
+
+    def put(self, key, value):
+
+        """
+        Stores value, a string, for key.
+        """
+
+        fd, tmpPath = tempfile.mkstemp(dir=self.directory)
+        f = os.fdopen(fd, 'wb')
+        try:
+            f.write(value)
+        finally:
+            f.close()
+        path = self._getPath(key)
+        if os.name == 'nt' and os.path.exists(path):
+            os.remove(path)
+        os.rename(tmpPath, path)
+        if self.maxEntries is not None or self.maxBytes is not None:
+            self._puts += 1
+            if self._puts % self.pruneInterval == 0:
+                self.prune()
+
+    def prune(self):
+
+        """
+        Removes the least recently used files until the directory is within
+        maxEntries and maxBytes.
+        """
+
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.cache'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # another process removed it
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        count = len(files)
+        size = sum([fileSize for mtime, fileSize, path in files])
+        for mtime, fileSize, path in files:
+            if (self.maxEntries is None or count <= self.maxEntries) and \
+                    (self.maxBytes is None or size <= self.maxBytes):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            count -= 1
+            size -= fileSize
+
+    def invalidate(self, key=None):
+
+        """
+        Removes the value stored for key, or every value if key is None.
+        """
+
+        if key is None:
+            paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                     if name.endswith('.cache')]
+        else:
+            paths = [self._getPath(key)]
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _getPath(self, key):
+
+        """ Returns the path of the file that stores key. """
+
+        if isinstance(key, unicode):
+            key = key.encode('utf-8')
+        return os.path.join(self.directory, hashlib.sha1(key).hexdigest() + '.cache')
+
+
+class ObjectCache(object):
+
+    """
+    A read-through cache of the objects a repository's getObject and
+    getObjectByPath return, keyed by object ID and by path, so that hot
+    objects such as templates and shared folders are not fetched from the
+    server each time they are asked for. Passed to a
+    :class:`cmislib.model.CmisClient` as its objectCache, it is used by
+    every repository of the client.
+
+    What is cached is the parsed properties and allowable actions of each
+    object, as a JSON string, in a store with the get, put and invalidate
+    methods of :class:`LRUCache`. By default that is an :class:`LRUCache`
+    of up to maxSize objects and maxBytes bytes. A :class:`FileCache`,
+    best given a maxEntries or maxBytes, shares the objects between the
+    processes using the same directory. Entries are keyed by the client's
+    service URL and username as well, so clients that log in as different
+    users never see each other's objects.
+
+    To have the allowable actions to cache, getObject and getObjectByPath
+    ask for them, with includeAllowableActions, whenever they fetch an
+    object for the cache.
+
+    Cached objects are used for up to ttl seconds. Sooner than that they are
+    dropped when the client notices they changed: when it updates, moves or
+    deletes them, when a reload returns a cmis:changeToken other than the
+    cached one, or when the changes of the repository's change log are
+    handed to :meth:`invalidateChanges`, for instance by a
+    :class:`cmislib.changelog.ChangeLogFollower`.
+
+    >>> cache = ObjectCache(maxSize=5000, ttl=600)
+    >>> client = CmisClient(url, 'admin', 'admin', objectCache=cache)
+    >>> follower = ChangeLogFollower(repo, lambda changes: cache.invalidateChanges(repo, changes),
+    ...                              '/var/lib/myapp/cache-changes.json')
+    """
+
+    logger = logging.getLogger('cmislib.cache.ObjectCache')
+
+    def __init__(self, store=None, maxSize=1000, ttl=300, maxBytes=32 * 1024 * 1024):
+
+        """
+        :param store: The store to keep the objects in, an in-memory
+         :class:`LRUCache` by default.
+        :param maxSize: The maximum number of objects and paths the default
+         store keeps.
+        :param ttl: The number of seconds a cached object is used for, or
+         None to use it until it is invalidated or evicted.
+        :param maxBytes: The maximum size of the objects the default store
+         keeps, in bytes of JSON.
+
+        >>> cache = ObjectCache(FileCache('/var/cache/cmislib/objects', maxEntries=100000),
+        ...                     ttl=3600)
+        """
+
+        if store is None:
+            store = LRUCache(maxSize, ttl, maxBytes)
+        self.store = store
+        self.ttl = ttl
+
+    def get(self, repository, objectId):
+
+        """
+        Returns the cached entry of the object with the specified ID, a dict
+        holding its 'properties' and 'allowableActions', or None.
+        """
+
+        entry = self._load(self._getKey(repository, 'id', objectId))
+        if entry is None:
+            return None
+        if self.ttl is not None and entry['cached'] + self.ttl < time.time():
+            self.invalidate(repository, objectId)
+            return None
+        # reading the mark after the entry keeps it the more recently used
+        # of the two, so the store evicts the entries it hides first
+        cleared = self._load(self._getKey(repository, 'cleared', ''))
+        if cleared is not None and entry['cached'] <= cleared:
+            self.invalidate(repository, objectId)
+            return None
+        return entry
+
+    def getByPath(self, repository, path):
+
+        """
+        Returns the cached entry of the object at the specified path, or
+        None.
+        """
+
+        pathEntry = self._load(self._getKey(repository, 'path', path))
+        if pathEntry is None:
+            return None
+        entry = self.get(repository, pathEntry['objectId'])
+        # the object may have moved, or another one taken its place
+        if entry is None or entry['path'] != path:
+            return None
+        return entry
+
+    def put(self, repository, obj, path=None):
+
+        """
+        Caches the properties and allowable actions of obj, which must have
+        been fetched with them, and if a path is passed, the path it was
+        fetched by.
+        """
+
+        properties = obj.getProperties()
+        objectId = properties['cmis:objectId']
+        if path is None:
+            path = properties.get('cmis:path')
+        entry = {'properties': properties,
+                 'allowableActions': obj.getAllowableActions(),
+                 'path': path,
+                 'cached': time.time()}
+        self.store.put(self._getKey(repository, 'id', objectId),
+                       json.dumps(entry, default=_encodeValue))
+        if path is not None:
+            self.store.put(self._getKey(repository, 'path', path),
+                           json.dumps({'objectId': objectId}))
+
+    def invalidate(self, repository, objectId=None):
+
+        """
+        Drops the object of repository with the specified ID, or every
+        object of repository if objectId is None. The path the object was
+        cached by is dropped with it. The objects of other repositories,
+        and of other users, stay cached.
+
+        >>> cache.invalidate(repo, doc.getObjectId())
+        >>> cache.invalidate(repo)
+        """
+
+        if objectId is None:
+            # the store can't list the keys of a repository, a FileCache
+            # only knows their hashes, so mark the time instead: get ignores
+            # and drops the objects cached before it
+            self.store.put(self._getKey(repository, 'cleared', ''), json.dumps(time.time()))
+            return
+        key = self._getKey(repository, 'id', objectId)
+        entry = self._load(key)
+        self.store.invalidate(key)
+        if entry is not None and entry['path'] is not None:
+            self.store.invalidate(self._getKey(repository, 'path', entry['path']))
+
+    def checkChangeToken(self, repository, objectId, changeToken):
+
+        """
+        Drops the cached object with the specified ID if its
+        cmis:changeToken is not changeToken, and returns True if the cached
+        object, if any, is still current.
+        """
+
+        entry = self.get(repository, objectId)
+        if entry is None or entry['properties'].get('cmis:changeToken') == changeToken:
+            return True
+        self.logger.debug('Change token of %s changed, dropping it', objectId)
+        self.invalidate(repository, objectId)
+        return False
+
+    def invalidateChanges(self, repository, changes):
+
+        """
+        Drops the objects that the specified change entries of repository,
+        such as those :meth:`cmislib.domain.Repository.getContentChanges`
+        returns, are about.
+
+        >>> cache.invalidateChanges(repo, repo.getContentChanges(changeLogToken=token))
+        """
+
+        for change in changes:
+            self.invalidate(repository, change.getObjectId())
+
+    def _getKey(self, repository, kind, value):
+
+        """
+        Returns the store key of an object ID or a path, which holds the
+        service URL and username of the repository's client, so that users
+        don't share entries.
+        """
+
+        client = repository._cmisClient
+        return u'%s %s %s %s %s' % (client.repositoryUrl, client.username,
+                                    repository.getRepositoryId(), kind, value)
+
+    def _load(self, key):
+
+        """ Returns the entry stored for key, or None. """
+
+        stored = self.store.get(key)
+        if stored is None:
+            return None
+        try:
+            return json.loads(stored, object_hook=_decodeValue)
+        except ValueError:
+            self.store.invalidate(key)
+            return None
+
+
+def _encodeValue(value):
+
+    """
+    Turns the property values JSON can't hold into dicts that
+    :func:`_decodeValue` turns back.
+    """
+
+    if isinstance(value, datetime.datetime):
+        return {'__datetime__': value.isoformat()}
+    raise TypeError('%r is not JSON serializable' % (value,))
+
+
+def _decodeValue(value):
+
+    """ Turns a dict made by :func:`_encodeValue` back into its value. """
+
+    if '__datetime__' in value:
+        return iso8601.parse_date(value['__datetime__'], default_timezone=None)
+    return value
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+#
+#      Licensed to the Apache Software Foundation (ASF) under one
+#      or more contributor license agreements.  See the NOTICE file
+#      distributed with this work for additional information
+#      regarding copyright ownership.  The ASF licenses this file
+#      to you under the Apache License, Version 2.0 (the
+#      "License"); you may not use this file except in compliance
+#      with the License.  You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#      Unless required by applicable law or agreed to in writing,
+#      software distributed under the License is distributed on an
+#      "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#      KIND, either express or implied.  See the License for the
+#      specific language governing permissions and limitations
+#      under the License.
+#
+"""
+Module containing :class:`ChangeLogFollower`, which keeps up with the
+change log of a repository, and the checkpoint stores it saves its place
+in. It works with the repositories of both bindings.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class FileCheckpoint(object):
+
+    """
+    Keeps a change log token in a file. The file is replaced in one go,
+    by renaming a file written next to it, so that it holds either the old
+    or the new token even if the process dies while saving.
+
+    >>> checkpoint = FileCheckpoint('/var/lib/indexer/changes.json')
+    >>> checkpoint.save(u'2692')
+    >>> checkpoint.load()
+    u'2692'
+    """
+
+    logger = logging.getLogger('cmislib.changelog.FileCheckpoint')
+
+    def __init__(self, path):
+        """ Constructor """
+        self.path = path
+
+    def load(self):
+
+        """
+        Returns the saved token, or None if no token has been saved yet.
+        """
+
+        if not os.path.exists(self.path):
+            return None
+        f = open(self.path, 'rb')
+        try:
+            return json.load(f).get('changeLogToken')
+        finally:
+            f.close()
+
+    def save(self, token):
+
+        """ Saves token in place of the one saved before. """
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmpPath = tempfile.mkstemp(prefix='.changelog', dir=directory)
+        try:
+            f = os.fdopen(fd, 'wb')
+            try:
+                json.dump({'changeLogToken': token, 'saved': time.time()}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                f.close()
+            if os.name == 'nt' and os.path.exists(self.path):
+                os.remove(self.path)
+            os.rename(tmpPath, self.path)
+        except Exception:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+            raise
+        self.logger.debug('Saved change log token %s', token)
+
+
+class ChangeLogFollower(object):
+
+    """
+    Delivers the changes of a repository to a handler, in batches, starting
+    from where the previous run stopped.
+
+    Each :meth:`poll` reads the repository's latestChangeLogToken, pages
+    through :meth:`cmislib.domain.Repository.getContentChanges` from the
+    saved token, pageSize changes at a time, and passes the changes to the
+    handler as lists of up to batchSize :class:`cmislib.domain.ChangeEntry`
+    objects. Within a batch the changes are coalesced per object id: an
+    object that changed several times is in the batch once, with its last
+    change, in the place of that change. Whole pages are collected until
+    they hold at least batchSize changes; once those have been handled, the
+    token the server returned with the last of the pages is saved in the
+    checkpoint, a :class:`FileCheckpoint` or any object with the same load
+    and save methods. So a long backlog is worked off in steps that each
+    survive a restart, and at most batchSize + pageSize changes are held
+    at a time. At the end of the poll the token of the last page, or the
+    latestChangeLogToken read at the start of the poll if the server
+    returned none, is saved. A server that pages the change log by link
+    only, without tokens, is checkpointed at the end of the poll only.
+
+    Delivery is at least once: if the handler or the process fails during
+    a poll, the next poll starts again from the last saved token, and
+    changes made while a poll runs may be delivered by the next one too. A
+    handler should treat a change as "look at this object again". The
+    first run, without a saved token, starts with the changes made after
+    it unless fromStart is True, in which case it goes through the whole
+    change log. The other keyword arguments, such as includeProperties,
+    go to getContentChanges.
+
+    >>> def index(changes):
+    ...     for change in changes:
+    ...         if change.changeType == 'deleted':
+    ...             searchIndex.remove(change.objectId)
+    ...         else:
+    ...             searchIndex.update(repo.getObject(change.objectId))
+    >>> follower = ChangeLogFollower(repo, index, '/var/lib/indexer/changes.json')
+    >>> follower.run(pollInterval=60)
+    """
+
+    logger = logging.getLogger('cmislib.changelog.ChangeLogFollower')
+
+    def __init__(self, repository, handler, checkpoint, batchSize=500, pageSize=100,
+                 fromStart=False, **kwargs):
+        """ Constructor """
+        if isinstance(checkpoint, basestring):
+            checkpoint = FileCheckpoint(checkpoint)
+        self.repository = repository
+        self.handler = handler
+        self.checkpoint = checkpoint
+        self.batchSize = batchSize
+        self.pageSize = pageSize
+        self.fromStart = fromStart
+        self.extArgs = kwargs
+        self._stop = threading.Event()
+
+    def poll(self):
+
+        """
+        Delivers the changes made since the saved token, saves the new
+        token and returns the number of changes read.
+
+        >>> follower.poll()
+        42
+        """
+
+        token = self.checkpoint.load()
+        self.repository.reload()
+        latestToken = self.repository.getRepositoryInfo().get('latestChangeLogToken')
+        if token is None and not self.fromStart:
+            self.logger.debug('Starting from change log token %s', latestToken)
+            self.checkpoint.save(latestToken)
+            return 0
+        if token is not None and token == latestToken:
+            return 0
+
+        kwargs = dict(self.extArgs)
+        kwargs['maxItems'] = self.pageSize
+        if token is not None:
+            kwargs['changeLogToken'] = token
+        count = 0
+        batch = OrderedDict()
+        pageToken = None
+        for page, pageToken in self._iterPages(kwargs):
+            for change in page:
+                count += 1
+                # the last change of an object replaces the earlier ones
+                batch.pop(change.objectId, None)
+                batch[change.objectId] = change
+            if pageToken is not None and len(batch) >= self.batchSize:
+                self._deliver(batch)
+                batch = OrderedDict()
+                self.checkpoint.save(pageToken)
+        if batch:
+            self._deliver(batch)
+        if pageToken is None:
+            pageToken = latestToken
+        if pageToken is not None:
+            self.checkpoint.save(pageToken)
+        self.logger.debug('Read %d changes up to token %s', count, pageToken)
+        return count
+
+    def run(self, pollInterval=60):
+
+        """
+        Polls every pollInterval seconds until :meth:`stop` is called. An
+        exception raised by a poll, including one from the handler, stops
+        the run with the token of the last handled batch saved.
+        """
+
+        self._stop.clear()
+        while not self._stop.isSet():
+            self.poll()
+            self._stop.wait(pollInterval)
+
+    def stop(self):
+
+        """ Makes :meth:`run` return once the current poll is done. """
+
+        self._stop.set()
+
+    def _iterPages(self, kwargs):
+
+        """
+        Yields each page of changes with the token that the changes after
+        it are read from, or with None where there is no such token.
+        """
+
+        while True:
+            resultSet = self.repository.getContentChanges(**kwargs)
+            nextToken = resultSet.getChangeLogToken()
+            if not resultSet.hasNext():
+                yield resultSet.getResults(), nextToken
+                return
+            if nextToken is None or nextToken == kwargs.get('changeLogToken'):
+                # the server only gives next links, so follow those
+                for page in resultSet.iterPages():
+                    yield page, None
+                return
+            yield resultSet.getResults(), nextToken
+            kwargs['changeLogToken'] = nextToken
+
+    def _deliver(self, batch):
+
+        """
+        Passes the coalesced changes of a batch to the handler, batchSize
+        changes at a time.
+        """
+
+        changes = batch.values()
+        for i in range(0, len(changes), self.batchSize):
+            chunk = changes[i:i + self.batchSize]
+            self.logger.debug('Delivering %d changes', len(chunk))
+            self.handler(chunk)
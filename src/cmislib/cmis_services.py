@@ -25,6 +25,14 @@ from cmislib.exceptions import CmisException, RuntimeException, \
     ObjectNotFoundException, InvalidArgumentException, \
     PermissionDeniedException, NotSupportedException, \
     UpdateConflictException
+from cmislib.cache import LRUCache
+from cmislib.net import RESTService, buildUrl
+import json
+import time
+
+# the default total size, in bytes of response body, of the parsed
+# responses a binding keeps for conditional GETs
+RESPONSE_CACHE_MAX_BYTES = 8 * 1024 * 1024
 
 
 class Binding(object):
@@ -41,6 +49,212 @@ class Binding(object):
 
         pass
 
+    def getRestService(self):
+
+        """
+        Returns the :class:`cmislib.net.RESTService` this binding uses to make
+        HTTP requests.
+        """
+
+        if getattr(self, '_restService', None) is None:
+            self._restService = RESTService()
+        return self._restService
+
+    def getResponseCache(self):
+
+        """
+        Returns the :class:`cmislib.cache.LRUCache` of parsed responses,
+        keyed by user and URL, which names the repository, that lets :meth:`_conditionalGet` answer a 304 Not
+        Modified without parsing anything. The
+        :class:`cmislib.model.CmisClient` that owns the binding sizes it
+        with its responseCacheSize and responseCacheMaxBytes. Each
+        response counts against the maxBytes with the size of its body, so
+        that a few large feeds don't crowd out the objects.
+        """
+
+        if getattr(self, '_responseCache', None) is None:
+            self._responseCache = LRUCache(500,
+                                           maxBytes=RESPONSE_CACHE_MAX_BYTES)
+        return self._responseCache
+
+    def setResponseCacheSize(self, size, maxBytes=RESPONSE_CACHE_MAX_BYTES):
+
+        """
+        Replaces the cache of parsed responses with one that keeps up to
+        size of them, whose bodies add up to at most maxBytes. 0 turns
+        conditional GETs off.
+        """
+
+        self._responseCache = LRUCache(size, maxBytes=maxBytes)
+
+    def setConnectionPool(self, connectionPool):
+
+        """
+        Makes this binding send its requests over connections taken from the
+        specified :class:`cmislib.net.ConnectionPool`. The
+        :class:`cmislib.model.CmisClient` that owns the binding calls this
+        with its own pool.
+        """
+
+        self._restService = RESTService(connectionPool)
+
+    def getServiceDocument(self, client):
+
+        """
+        Returns the parsed service document of the specified client's CMIS
+        service, the same thing :meth:`get` would return for the client's
+        repositoryUrl.
+
+        The document is cached on the client. A copy younger than the
+        client's serviceDocumentMaxAge is returned as is. An older one is
+        revalidated with a conditional GET, using the ETag and Last-Modified
+        validators the server sent with it, so an unchanged document is
+        neither downloaded nor parsed again. If the client has a
+        serviceDocumentCache, such as a :class:`cmislib.cache.FileCache`,
+        the document is kept there as well so that a new process can start
+        from it.
+        """
+
+        url = client.repositoryUrl
+        entry = client._serviceDocument
+        if entry is None and client.serviceDocumentCache is not None:
+            entry = self._loadServiceDocument(client)
+        if entry is not None and time.time() - entry['fetched'] < client.serviceDocumentMaxAge:
+            return self._getParsedServiceDocument(entry, url)
+
+        headers = {}
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['lastModified']:
+                headers['If-Modified-Since'] = entry['lastModified']
+        kwargs = dict(client.extArgs)
+        kwargs.update(getattr(self, 'extArgs', {}))
+        resp, content = self.getRestService().get(url,
+                                                  client.username,
+                                                  client.password,
+                                                  headers=headers,
+                                                  **kwargs)
+        if resp['status'] == '304' and entry is not None:
+            entry = dict(entry, fetched=time.time())
+        elif resp['status'] != '200':
+            self._processCommonErrors(resp, url)
+        else:
+            entry = {'content': content,
+                     'etag': resp.get('etag'),
+                     'lastModified': resp.get('last-modified'),
+                     'fetched': time.time(),
+                     'document': self._parseResponse(content, url)}
+        client._serviceDocument = entry
+        if client.serviceDocumentCache is not None:
+            self._storeServiceDocument(client, entry)
+        return self._getParsedServiceDocument(entry, url)
+
+    def _conditionalGet(self, url, username, password, **kwargs):
+
+        """
+        Does a conditional GET and returns the response and the parsed
+        result. The :class:`cmislib.net.RESTService` sends the validators
+        of the last response for the URL to the same user; when the server
+        answers 304 Not Modified the result parsed from that response is
+        returned again, as the very same object. Clients that share the
+        binding with other credentials never see each other's results. Validators are only sent while that result
+        is in the response cache, so that a 304 never has to be followed by
+        a second, unconditional GET. For responses other than 200 and 304
+        the result is the raw content.
+        """
+
+        responseCache = self.getResponseCache()
+        headers = kwargs.pop('headers', {})
+        url = buildUrl(url, kwargs)
+        conditional = responseCache.maxSize > 0
+        key = (username, url)
+        cached = None
+        if conditional:
+            cached = responseCache.get(key)
+        if conditional and cached is None:
+            # a 304 would be of no use without the parsed result
+            self.getRestService().validators.invalidate(key)
+        resp, content = self.getRestService().get(url, username, password,
+                                                  conditional=conditional,
+                                                  headers=headers)
+        if resp['status'] == '304':
+            if cached is not None:
+                return resp, cached
+            # the server answered 304 anyway, so ask for the whole response
+            headers = dict(headers)
+            headers['Cache-Control'] = 'no-cache'
+            resp, content = self.getRestService().get(url, username, password,
+                                                      conditional=conditional,
+                                                      headers=headers)
+        if resp['status'] != '200':
+            return resp, content
+        result = self._parseResponse(content, url)
+        if conditional:
+            if resp.get('etag') or resp.get('last-modified'):
+                responseCache.put(key, result, len(content))
+            else:
+                responseCache.invalidate(key)
+        return resp, result
+
+    def _parseResponse(self, content, url):
+
+        """
+        Turns the body of a successful response into what :meth:`get`
+        returns. Bindings override this.
+        """
+
+        return content
+
+    def _getParsedServiceDocument(self, entry, url):
+
+        """
+        Returns the parsed document of a service document cache entry,
+        parsing it first if it was loaded from the serviceDocumentCache.
+        """
+
+        if entry['document'] is None:
+            entry['document'] = self._parseResponse(entry['content'], url)
+        return entry['document']
+
+    def _getServiceDocumentKey(self, client):
+
+        """ Returns the serviceDocumentCache key for the client. """
+
+        return '%s %s %s' % (self.__class__.__name__, client.repositoryUrl, client.username)
+
+    def _loadServiceDocument(self, client):
+
+        """
+        Returns the service document cache entry kept in the client's
+        serviceDocumentCache, or None.
+        """
+
+        stored = client.serviceDocumentCache.get(self._getServiceDocumentKey(client))
+        if stored is None:
+            return None
+        try:
+            entry = json.loads(stored)
+            # the content is kept as latin-1 so that any byte survives JSON
+            entry['content'] = entry['content'].encode('latin-1')
+        except (ValueError, KeyError, AttributeError):
+            return None
+        entry['document'] = None
+        return entry
+
+    def _storeServiceDocument(self, client, entry):
+
+        """
+        Saves a service document cache entry in the client's
+        serviceDocumentCache.
+        """
+
+        stored = json.dumps({'content': entry['content'].decode('latin-1'),
+                             'etag': entry['etag'],
+                             'lastModified': entry['lastModified'],
+                             'fetched': entry['fetched']})
+        client.serviceDocumentCache.put(self._getServiceDocumentKey(client), stored)
+
     def _processCommonErrors(self, error, url):
 
         """
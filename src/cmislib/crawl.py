@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+#
+#      Licensed to the Apache Software Foundation (ASF) under one
+#      or more contributor license agreements.  See the NOTICE file
+#      distributed with this work for additional information
+#      regarding copyright ownership.  The ASF licenses this file
+#      to you under the Apache License, Version 2.0 (the
+#      "License"); you may not use this file except in compliance
+#      with the License.  You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#      Unless required by applicable law or agreed to in writing,
+#      software distributed under the License is distributed on an
+#      "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#      KIND, either express or implied.  See the License for the
+#      specific language governing permissions and limitations
+#      under the License.
+#
+"""
+Module containing the folder tree crawler the folder and repository
+classes of both bindings build on. It only uses the public
+:class:`cmislib.domain.Folder` API.
+"""
+
+from collections import deque
+import logging
+import sys
+import threading
+import Queue
+from cmislib.workers import WorkerPool
+
+moduleLogger = logging.getLogger('cmislib.crawl')
+
+# the properties a crawl needs, whatever the filter
+CRAWL_PROPERTIES = ('cmis:objectId', 'cmis:name', 'cmis:baseTypeId', 'cmis:objectTypeId')
+
+
+def walk(folder, path=None, maxWorkers=8, maxDepth=None, prefetch=4, onError=None,
+         maxPending=10000, **kwargs):
+
+    """
+    Returns a generator over a (path, object) pair for each descendant of
+    folder, found by listing the children of folders on up to maxWorkers
+    threads at once, breadth first. Each folder's children are fetched a
+    page at a time, with :meth:`cmislib.domain.ResultSet.iterPages`, and
+    pairs are yielded as soon as their page arrives, so the order of the
+    pairs depends on which requests come back first and nothing is
+    collected up front. Up to prefetch pages wait for the caller to take
+    them before the threads stop fetching more.
+
+    The folders found wait in a queue until a thread is free to list
+    them. Once more than maxPending folders wait, the most recently found
+    are listed first, depth first, so that on very wide trees the queue
+    stays near maxPending instead of growing with the width of the tree.
+
+    The path of an object is that of its folder and its cmis:name. The
+    path of folder itself is path or its cmis:path. Folders deeper than
+    maxDepth, 1 being the children of folder, are not listed. The keyword
+    arguments, such as filter, includeAllowableActions or maxItems, the
+    size of the pages, go to :meth:`cmislib.domain.Folder.getChildren`.
+    A filter always gets the properties in :data:`CRAWL_PROPERTIES`.
+
+    A folder that can't be listed stops the crawl with its error, unless
+    onError is passed. It is then called with the folder's path and the
+    exception, and the crawl goes on without that folder.
+
+    >>> for path, obj in walk(folder, maxWorkers=16, filter='cmis:name,cmis:lastModificationDate'):
+    ...     index(path, obj)
+
+    Closing the generator, or dropping it, stops the crawl.
+    """
+
+    if kwargs.get('filter'):
+        kwargs['filter'] = _getFilter(kwargs['filter'])
+    if path is None:
+        path = folder.getProperties().get('cmis:path') or '/'
+    results = Queue.Queue(max(prefetch, 1))
+    stop = threading.Event()
+    pool = WorkerPool(maxWorkers)
+    # folders waiting for a thread, handed to the pool as threads free up
+    # so that the pool's own queue stays empty
+    waiting = deque([(path, folder, 1)])
+    running = 0
+
+    def put(item):
+        # give up on the caller once the crawl is stopped
+        while not stop.isSet():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except Queue.Full:
+                pass
+        return False
+
+    def listFolder(folderPath, parent, depth):
+        try:
+            for page in parent.getChildren(**kwargs).iterPages():
+                if not put(('page', folderPath, depth, page)):
+                    return
+        except:
+            put(('error', folderPath, depth, sys.exc_info()))
+        finally:
+            # sent however the listing ended, so that the crawl never waits
+            # for a folder that won't come
+            put(('done', folderPath, depth, None))
+
+    try:
+        while waiting or running:
+            while waiting and running < maxWorkers:
+                if len(waiting) > maxPending:
+                    pool.submit(listFolder, *waiting.pop())
+                else:
+                    pool.submit(listFolder, *waiting.popleft())
+                running += 1
+            # Queue.get() without a timeout can't be interrupted on Python 2
+            try:
+                kind, folderPath, depth, value = results.get(True, 1)
+            except Queue.Empty:
+                continue
+            if kind == 'done':
+                running -= 1
+            elif kind == 'error':
+                if onError is None:
+                    raise value[0], value[1], value[2]
+                moduleLogger.debug('Could not list %s: %s', folderPath, value[1])
+                onError(folderPath, value[1])
+            else:
+                for obj in value:
+                    objPath = _joinPath(folderPath, obj.getProperties().get('cmis:name'))
+                    if _isFolder(obj) and (maxDepth is None or depth < maxDepth):
+                        waiting.append((objPath, obj, depth + 1))
+                    yield objPath, obj
+    finally:
+        stop.set()
+        pool.shutdown(wait=False)
+
+
+def _getFilter(propertyFilter):
+
+    """ Returns propertyFilter with the :data:`CRAWL_PROPERTIES` added. """
+
+    if propertyFilter.strip() == '*':
+        return propertyFilter
+    properties = [p.strip() for p in propertyFilter.split(',') if p.strip()]
+    for name in CRAWL_PROPERTIES:
+        if name not in properties:
+            properties.append(name)
+    return ','.join(properties)
+
+
+def _joinPath(folderPath, name):
+
+    """ Returns the path of the child called name of folderPath. """
+
+    return folderPath.rstrip('/') + '/' + (name or '')
+
+
+def _isFolder(obj):
+
+    """ Returns True if obj is a folder. """
+
+    return obj.getProperties().get('cmis:baseTypeId') == 'cmis:folder'
@@ -30,8 +30,14 @@ class CmisObject(object):
     """
     Common ancestor class for other CMIS domain objects such as
     :class:`Document` and :class:`Folder`.
+
+    The binding classes store their state in __slots__ rather than in a
+    per-instance __dict__ to keep large result sets small. Subclasses that
+    don't declare __slots__ themselves get a __dict__ as usual.
     """
 
+    __slots__ = ()
+
     def __str__(self):
         """To string"""
         return self.getObjectId()
@@ -419,6 +425,9 @@ class Repository(object):
         The following optional arguments are not currently supported:
          - filter
          - includeAllowableActions
+
+        Like :meth:`getObject`, it uses the client's objectCache when no
+        optional argument is passed.
         """
 
         pass
@@ -535,6 +544,18 @@ class Repository(object):
 
         pass
 
+    def crawl(self, rootPath='/', maxWorkers=8, maxDepth=None, onError=None, **kwargs):
+
+        """
+        Walks the folder at rootPath, the root folder by default, with
+        :func:`cmislib.crawl.walk`.
+
+        >>> for path, obj in repo.crawl('/Sites', maxWorkers=16):
+        ...     index(path, obj)
+        """
+
+        pass
+
     def getRootFolder(self):
         """
         Returns the root folder of the repository
@@ -651,11 +672,42 @@ class Repository(object):
         """
         Returns an :class:`ObjectType` object for the specified object type id.
 
+        Type definitions are kept in the repository's typeCache, a
+        :class:`cmislib.cache.LRUCache`, so asking for the same type again
+        does not go back to the server until the cached definition expires
+        or is invalidated.
+
         >>> folderType = repo.getTypeDefinition('cmis:folder')
         """
 
         pass
 
+    def invalidateTypeCache(self, typeId=None):
+
+        """
+        Drops the cached definition of the specified type, or of every type
+        if no typeId is given, so that the next :meth:`getTypeDefinition`
+        fetches it from the server again. Call this after changing a type.
+
+        >>> repo.invalidateTypeCache('cmis:document')
+        """
+
+        pass
+
+    def warmTypeCache(self, typeId=None, depth=None):
+
+        """
+        Fills the type cache with the definitions of the descendants of the
+        specified type, or of every type in the repository if no typeId is
+        given, using a single :meth:`getTypeDescendants` call. Returns the
+        number of types cached.
+
+        >>> repo.warmTypeCache()
+        42
+        """
+
+        pass
+
     def getLink(self, rel):
         """
         Returns the HREF attribute of an Atom link element for the
@@ -739,11 +791,28 @@ class Repository(object):
          - renditionFilter
          - includeACL
          - includeAllowableActions
+
+        If the client has an objectCache, see
+        :class:`cmislib.cache.ObjectCache`, and no optional argument is
+        passed, the object comes from the cache when it is there, with its
+        properties and allowable actions. When it isn't, it is fetched with
+        includeAllowableActions, so that they can be cached too.
+        """
+
+        pass
+
+    def getObjects(self, objectIds, chunkSize=100, maxWorkers=4, **kwargs):
+
+        """
+        Returns the objects with the specified object IDs, in order, fetched
+        in bulk by :func:`cmislib.bulk.getObjects`.
+
+        >>> docs = repo.getObjects(objectIds, filter='cmis:name')
         """
 
         pass
 
-    def query(self, statement, **kwargs):
+    def query(self, statement, rowFormat=None, **kwargs):
 
         """
         Returns a list of :class:`CmisObject` objects based on the CMIS
@@ -784,6 +853,40 @@ class Repository(object):
         5
         >>> rs.hasNext()
         True
+
+        Reports that only need a few columns can ask for plain rows instead
+        of objects with rowFormat. 'dict' rows map property ids to values
+        and 'tuple' rows hold the values of the select list, in order. Only
+        the one page of results selected by maxItems and skipCount is
+        returned. The AtomPub binding parses the rows as they are read; the
+        Browser binding parses the whole page of JSON before the first row.
+
+        >>> q = 'select cmis:objectId, cmis:name from cmis:document'
+        >>> for objectId, name in repo.query(q, rowFormat='tuple'):
+        ...     print name
+        """
+
+        pass
+
+    def iterQuery(self, statement, pageSize=100, maxWorkers=4, **kwargs):
+
+        """
+        Returns a generator over every result of the query, in order, like
+        query(statement).iterAll() does. Instead of fetching one page after
+        the other it learns the total number of results from the first page
+        and then fetches the skipCount windows of pageSize results after it
+        on up to maxWorkers threads at once. Windows the server returns
+        short, because it caps maxItems for instance, are completed page by
+        page. See :func:`cmislib.workers.parallelPages`.
+
+        Results that are added or removed while the query runs can shift
+        the windows, so use an ORDER BY on a stable property for exports.
+        The optional arguments are those of :meth:`query`, except maxItems
+        and skipCount.
+
+        >>> q = "select * from cmis:document order by cmis:objectId"
+        >>> for doc in repo.iterQuery(q, pageSize=500, maxWorkers=8):
+        ...     export(doc)
         """
 
         pass
@@ -892,6 +995,18 @@ class Repository(object):
 
         pass
 
+    def createDocuments(self, items, parentFolder=None, maxWorkers=4, maxRetries=3,
+                        retryDelay=1.0, callback=None):
+
+        """
+        Creates a document for each item of items, as
+        :func:`cmislib.bulk.createDocuments` does.
+
+        >>> results = repo.createDocuments(items, folder, maxWorkers=16)
+        """
+
+        pass
+
     def createDocumentFromSource(self,
                                  sourceId,
                                  properties={},
@@ -1051,6 +1166,46 @@ class ResultSet(object):
 
         pass
 
+    def iterPages(self, limit=None, prefetch=0):
+
+        """
+        Returns a generator that yields the results one page, a list, at a
+        time. It starts with the page this result set holds and keeps
+        fetching the next page until there are no more or until limit
+        results have been returned. Pages are not kept around once the
+        generator moves on, so memory use is bounded by the page size rather
+        than by the total number of results. The result set itself stays on
+        its current page.
+
+        If prefetch is greater than zero, the pages are fetched by a
+        background thread that stays up to that many pages ahead of the
+        caller, so that the server round-trip for the next page overlaps
+        with the processing of the current one. See
+        :func:`cmislib.workers.readAhead`.
+
+        >>> rs = repo.query("select * from cmis:document", maxItems=200)
+        >>> for page in rs.iterPages():
+        ...     export(page)
+        >>> for page in rs.iterPages(prefetch=2):
+        ...     export(page)
+        """
+
+        pass
+
+    def iterAll(self, limit=None, prefetch=0):
+
+        """
+        Returns a generator over every result of every page, fetching the
+        pages lazily, and in the background if prefetch is set, as
+        :meth:`iterPages` does. Stops after limit results if a limit is
+        given.
+
+        >>> for doc in rs.iterAll(limit=100000):
+        ...     print doc.name
+        """
+
+        pass
+
     def getFirst(self):
 
         """
@@ -1133,6 +1288,32 @@ class ResultSet(object):
 
         pass
 
+    def getChangeLogToken(self):
+
+        """
+        Returns the change log token to pass to
+        :meth:`Repository.getContentChanges` for the changes that follow
+        the ones on this page, or None if the server didn't say.
+
+        >>> rs = repo.getContentChanges(changeLogToken='2692', maxItems=100)
+        >>> rs.getChangeLogToken()
+        u'2792'
+        """
+
+        pass
+
+    def getNumItems(self):
+
+        """
+        Returns the total number of results the server reported for the
+        query or listing behind this result set, or None if it didn't.
+
+        >>> resultSet.getNumItems()
+        3
+        """
+
+        pass
+
     def hasPrev(self):
 
         """
@@ -1328,27 +1509,50 @@ class Document(CmisObject):
 
         pass
 
-    def getContentStream(self):
+    def getContentStream(self, offset=None, length=None):
 
         """
-        Returns the CMIS service response from invoking the 'enclosure' link.
+        Returns the CMIS service response from invoking the 'enclosure' link,
+        as a :class:`cmislib.net.ContentStream` that reads the content from
+        the connection as it is consumed rather than holding it in memory.
 
         >>> doc.getName()
         u'sample-b.pdf'
         >>> o = open('tmp.pdf', 'wb')
         >>> result = doc.getContentStream()
-        >>> o.write(result.read())
+        >>> result.copyTo(o)
+        117248
         >>> result.close()
         >>> o.close()
         >>> import os.path
         >>> os.path.getsize('tmp.pdf')
         117248
 
+        To get part of the content, pass the offset of its first byte and,
+        unless it runs to the end, its length. The part is asked for with
+        an HTTP Range request, see :meth:`cmislib.net.RESTService.getRange`.
+
+        >>> result = doc.getContentStream(offset=100000)
+        >>> len(result.read())
+        17248
+
         The optional streamId argument is not yet supported.
         """
 
         pass
 
+    def downloadTo(self, path, resume=True, maxRetries=3, retryDelay=1.0, **kwargs):
+
+        """
+        Writes the content of this document to the file at path, resuming an
+        interrupted download, with :func:`cmislib.download.downloadTo`.
+
+        >>> doc.downloadTo('/tmp/big.iso')
+        4294967296L
+        """
+
+        pass
+
     def setContentStream(self, contentFile, contentType=None):
 
         """
@@ -1489,6 +1693,18 @@ class Folder(CmisObject):
 
         pass
 
+    def createDocuments(self, items, maxWorkers=4, maxRetries=3, retryDelay=1.0,
+                        callback=None):
+
+        """
+        Creates a document in this folder for each item of items, as
+        :func:`cmislib.bulk.createDocuments` does.
+
+        >>> results = folder.createDocuments(items, maxWorkers=16)
+        """
+
+        pass
+
     def getChildren(self, **kwargs):
 
         """
@@ -1576,6 +1792,17 @@ class Folder(CmisObject):
 
         pass
 
+    def walk(self, maxWorkers=8, maxDepth=None, onError=None, **kwargs):
+
+        """
+        Walks the descendants of this folder with :func:`cmislib.crawl.walk`.
+
+        >>> for path, obj in folder.walk(filter='cmis:name', maxItems=500):
+        ...     print path
+        """
+
+        pass
+
     def getParent(self):
 
         """
@@ -1841,6 +2068,8 @@ class Property(object):
     type.
     """
 
+    __slots__ = ()
+
     def getId(self):
         """Getter for cmis:id"""
         pass
@@ -1998,6 +2227,9 @@ class ACE(object):
     Represents an individual Access Control Entry.
     """
 
+    __slots__ = ('_principalId', '_permissions', '_direct')
+    logger = logging.getLogger('cmislib.domain.ACE')
+
     def __init__(self, principalId=None, permissions=None, direct=None):
         """Constructor"""
         self._principalId = principalId
@@ -2007,8 +2239,6 @@ class ACE(object):
             else:
                 self._permissions = permissions
         self._direct = direct
-
-        self.logger = logging.getLogger('cmislib.domain.ACE')
         self.logger.debug('Creating an instance of ACE for %s' % principalId)
 
     @property
@@ -2069,6 +2299,8 @@ class ChangeEntry(object):
     u'updated'
     """
 
+    __slots__ = ()
+
     def getId(self):
         """
         Returns the unique ID of the change entry.
@@ -2174,6 +2406,8 @@ class Rendition(object):
     This class represents a Rendition.
     """
 
+    __slots__ = ()
+
     def __str__(self):
         """To string"""
         return self.getStreamId()
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+#
+#      Licensed to the Apache Software Foundation (ASF) under one
+#      or more contributor license agreements.  See the NOTICE file
+#      distributed with this work for additional information
+#      regarding copyright ownership.  The ASF licenses this file
+#      to you under the Apache License, Version 2.0 (the
+#      "License"); you may not use this file except in compliance
+#      with the License.  You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#      Unless required by applicable law or agreed to in writing,
+#      software distributed under the License is distributed on an
+#      "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#      KIND, either express or implied.  See the License for the
+#      specific language governing permissions and limitations
+#      under the License.
+#
+"""
+Module containing the content downloads the document classes of both
+bindings build on. They only use the public :class:`cmislib.domain.Document`
+API.
+"""
+
+import httplib
+import logging
+import mmap
+import os
+import socket
+import threading
+import time
+from cmislib.exceptions import CmisException
+from cmislib.workers import WorkerPool
+
+moduleLogger = logging.getLogger('cmislib.download')
+
+# the content length above which downloadTo fetches ranges in parallel
+PARALLEL_THRESHOLD = 64 * 1024 * 1024
+# the size of the ranges fetched in parallel
+PART_SIZE = 8 * 1024 * 1024
+
+
+def downloadTo(document, path, resume=True, maxRetries=3, retryDelay=1.0,
+               maxWorkers=4, parallelThreshold=PARALLEL_THRESHOLD, **kwargs):
+
+    """
+    Writes the content of document to the file at path and returns the
+    length of the content.
+
+    If the file already exists and resume is True, it is taken to be the
+    start of the content left by an interrupted download, and only the
+    rest is fetched, with an HTTP Range request, and appended to it. A
+    file as long as the cmis:contentStreamLength of the document is taken
+    to be complete and isn't downloaded again, and one that is longer is
+    downloaded again from the start. Without a cmis:contentStreamLength,
+    the file is complete when the server answers the request for the rest
+    with an empty range, see :meth:`cmislib.net.RESTService.getRange`.
+    The file must have been written from the same document: use the ID of
+    a version, not of its version series, if the content may change in
+    between.
+
+    A transfer that fails because of a network error is resumed from where
+    it stopped, up to maxRetries times, waiting retryDelay seconds before
+    the first retry and twice as long before each next one.
+
+    Content longer than parallelThreshold bytes that is downloaded from
+    the start is fetched with :func:`downloadParallel`, on up to
+    maxWorkers threads, which also gets the other keyword arguments. Pass
+    maxWorkers=1 to always download in one go.
+
+    >>> downloadTo(doc, '/tmp/big.iso')
+    4294967296L
+    """
+
+    total = document.getProperties().get('cmis:contentStreamLength')
+    if total is not None:
+        total = long(total)
+    attempts = 0
+    while True:
+        attempts += 1
+        offset = 0
+        if resume and os.path.exists(path):
+            offset = os.path.getsize(path)
+            if total is not None and offset == total:
+                return total
+            if total is not None and offset > total:
+                moduleLogger.debug('%s is longer than the content, downloading it again', path)
+                offset = 0
+        if offset == 0 and attempts == 1 and maxWorkers > 1 and \
+                total is not None and total > parallelThreshold:
+            return downloadParallel(document, path, maxWorkers=maxWorkers,
+                                    maxRetries=maxRetries, retryDelay=retryDelay, **kwargs)
+        try:
+            return _download(document, path, offset, total)
+        except (socket.error, httplib.HTTPException), e:
+            if attempts > maxRetries:
+                raise
+            moduleLogger.debug('Downloading to %s failed, resuming: %s', path, e)
+            # what is in the file now was written by this call
+            resume = True
+        time.sleep(retryDelay * 2 ** (attempts - 1))
+
+
+def _download(document, path, offset, total):
+
+    """
+    Writes the content of document from offset on to the file at path,
+    which already holds the bytes before offset, and returns the length of
+    the file.
+    """
+
+    if offset:
+        stream = document.getContentStream(offset=offset)
+    else:
+        stream = document.getContentStream()
+    if stream is None:
+        raise CmisException('No content stream', path)
+    f = open(path, offset and 'ab' or 'wb')
+    try:
+        if isinstance(stream, basestring):
+            f.write(stream)
+        else:
+            try:
+                if stream.offset != offset:
+                    # the server stopped short of the start of the rest
+                    raise httplib.HTTPException('Could not resume at byte %d' % offset)
+                stream.copyTo(f)
+            finally:
+                stream.close()
+    finally:
+        f.close()
+    length = os.path.getsize(path)
+    if total is not None and length != total:
+        raise httplib.HTTPException('Got %d of %d bytes' % (length, total))
+    return length
+
+
+def downloadParallel(document, path, maxWorkers=4, partSize=PART_SIZE, useMmap=False,
+                     maxRetries=3, retryDelay=1.0):
+
+    """
+    Writes the content of document to the file at path, fetching it in
+    ranges of partSize bytes on up to maxWorkers threads at once, and
+    returns the length of the content. Each thread has its own pooled
+    connection, so the transfer isn't limited by what one connection gets
+    through.
+
+    The content goes to a file named path + '.part', created with its
+    final length, that is renamed to path once every range is in. With
+    useMmap the ranges are written into a memory map of that file rather
+    than through a file object per thread. A range that fails because of a
+    network error is resumed up to maxRetries times. If one still fails,
+    the others stop, and the file at path is left with the ranges that
+    were complete from the start on, so that :func:`downloadTo` can carry
+    on from there.
+
+    A server that doesn't support ranges, or a document whose
+    cmis:contentStreamLength isn't known, is downloaded in one go with
+    :func:`downloadTo`.
+
+    >>> downloadParallel(doc, '/tmp/big.iso', maxWorkers=8, useMmap=True)
+    4294967296L
+    """
+
+    total = document.getProperties().get('cmis:contentStreamLength')
+    if not total:
+        return downloadTo(document, path, False, maxRetries, retryDelay, maxWorkers=1)
+    total = long(total)
+    # the first range shows whether the server supports ranges at all
+    first = document.getContentStream(offset=0, length=min(partSize, total))
+    if getattr(first, 'status', None) != 206:
+        if hasattr(first, 'close'):
+            first.close()
+        moduleLogger.debug('No ranges for %s, downloading it in one go', path)
+        return downloadTo(document, path, False, maxRetries, retryDelay, maxWorkers=1)
+
+    partPath = path + '.part'
+    parts = [(offset, min(partSize, total - offset)) for offset in xrange(0, total, partSize)]
+    stop = threading.Event()
+    f = open(partPath, 'w+b')
+    try:
+        f.truncate(total)
+        target = None
+        if useMmap:
+            target = mmap.mmap(f.fileno(), total)
+        pool = WorkerPool(maxWorkers)
+        try:
+            futures = [pool.submit(_downloadPart, document, partPath, target, offset, length,
+                                   i == 0 and first or None, stop, maxRetries, retryDelay)
+                       for i, (offset, length) in enumerate(parts)]
+            error = None
+            # the length of the ranges that are complete from the start on
+            complete = 0
+            for future, (offset, length) in zip(futures, parts):
+                try:
+                    if future.result() and complete == offset:
+                        complete = offset + length
+                except Exception, e:
+                    if error is None:
+                        error = e
+        finally:
+            pool.shutdown(wait=False)
+        if target is not None:
+            target.flush()
+            target.close()
+        if error is not None:
+            f.truncate(complete)
+    finally:
+        f.close()
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(partPath, path)
+    if error is not None:
+        raise error
+    return total
+
+
+def _downloadPart(document, partPath, target, offset, length, stream, stop,
+                  maxRetries, retryDelay):
+
+    """
+    Writes length bytes of the content of document, starting at offset,
+    at the same place of the file at partPath, or of its memory map
+    target, and nothing past them even if the server sends a longer
+    range. Returns True once they are all in, or False if the download
+    was stopped because another range failed.
+    """
+
+    f = None
+    if target is None:
+        f = open(partPath, 'r+b')
+    try:
+        position = offset
+        end = offset + length
+        attempts = 0
+        while position < end:
+            if stop.isSet():
+                return False
+            try:
+                if stream is None:
+                    stream = document.getContentStream(offset=position, length=end - position)
+                try:
+                    if stream.offset != position:
+                        raise httplib.HTTPException('Asked for a range from %d, got one from %d'
+                                                    % (position, stream.offset))
+                    if f is not None:
+                        f.seek(position)
+                    for data in stream.iterChunks():
+                        # a server may send more than the range asked for
+                        data = data[:end - position]
+                        if f is not None:
+                            f.write(data)
+                        else:
+                            target[position:position + len(data)] = data
+                        position += len(data)
+                        if position >= end:
+                            break
+                        if stop.isSet():
+                            return False
+                finally:
+                    stream.close()
+                    stream = None
+                if position < end:
+                    raise httplib.HTTPException('The range ended %d bytes early' % (end - position))
+            except (socket.error, httplib.HTTPException), e:
+                attempts += 1
+                if attempts > maxRetries:
+                    stop.set()
+                    raise
+                moduleLogger.debug('Range at %d failed, resuming: %s', position, e)
+                time.sleep(retryDelay * 2 ** (attempts - 1))
+            except Exception:
+                stop.set()
+                raise
+        return True
+    finally:
+        if f is not None:
+            f.close()
@@ -25,7 +25,9 @@ really appropriate, but it is kept for backwards compatibility.
 import logging
 
 from cmislib.atompub.binding import AtomPubBinding
-from cmislib.cmis_services import Binding
+from cmislib.cmis_services import Binding, RESPONSE_CACHE_MAX_BYTES
+from cmislib.net import ConnectionPool
+from cmislib.workers import WorkerPool
 
 
 moduleLogger = logging.getLogger('cmislib.model')
@@ -35,6 +37,21 @@ class CmisClient(object):
 
     """
     Handles all communication with the CMIS provider.
+
+    The service document is cached, see
+    :meth:`cmislib.cmis_services.Binding.getServiceDocument`, and so are
+    the repository objects built from it: asking for the same repository
+    again returns the same object for as long as the service document does
+    not change.
+
+    A client can be shared by several threads. Requests take their
+    connection from the client's :class:`cmislib.net.ConnectionPool`, and
+    the lazily built caches of repositories and objects (repository info,
+    capabilities, URI templates, properties, allowable actions) are only
+    ever replaced by complete values, never filled in place, so readers in
+    other threads see either the old or the new value. Calls that modify the
+    same object, such as two threads checking out one document, still need
+    to be coordinated by the caller.
     """
 
     def __init__(self, repositoryUrl, username, password, **kwargs):
@@ -44,18 +61,92 @@ class CmisClient(object):
         :param repositoryUrl: The service URL of the CMIS provider
         :param username: Username
         :param password: Password
+        :param connectionPool: Optional :class:`cmislib.net.ConnectionPool`
+         to take HTTP connections from. By default the client creates its own
+         pool, which is shared by every request made through this client, or
+         uses that of the binding passed in.
+        :param typeCacheSize: The number of type definitions each repository
+         keeps in its type cache, 1000 by default. 0 turns the cache off.
+        :param typeCacheTtl: The number of seconds a cached type definition
+         stays valid, 300 by default. None keeps them until evicted.
+        :param serviceDocumentMaxAge: The number of seconds the cached
+         service document is used without asking the server whether it
+         changed, 0 by default. Older copies are revalidated with a
+         conditional GET.
+        :param serviceDocumentCache: Optional store, such as a
+         :class:`cmislib.cache.FileCache`, that keeps the service document
+         across processes.
+        :param responseCacheSize: The number of parsed responses kept so
+         that a GET answered with 304 Not Modified, such as the reload of an
+         unchanged object, is not parsed again. 500 by default. 0 turns
+         conditional GETs off. A binding passed in keeps its own response
+         cache unless this or responseCacheMaxBytes is given.
+        :param responseCacheMaxBytes: The total size, in bytes of response
+         body, of the parsed responses kept. A response larger than that,
+         such as a big feed, is not kept at all. 8 MiB by default.
+        :param mediaUploadThreshold: The content size, in bytes, above which
+         the AtomPub binding creates a document in two steps: the entry with
+         the properties only, then the content sent as is to the document's
+         edit-media link, rather than base64 encoded in the entry. 16 MiB by
+         default. None always sends the content in the entry.
+        :param objectCache: Optional :class:`cmislib.cache.ObjectCache` that
+         getObject and getObjectByPath read through, so that objects asked
+         for again are not fetched from the server. The objects they fetch
+         for the cache come with their allowable actions.
+        :param minidomFeeds: The AtomPub binding reads the feeds behind
+         children, parents, relationships, versions, collections and query
+         results with a streaming :class:`cmislib.atompub.binding.FeedReader`
+         rather than parsing them into a DOM. Set this to True to go back to
+         minidom, False by default. Descendants and trees always use minidom.
 
         >>> client = CmisClient('http://localhost:8080/alfresco/s/cmis', 'admin', 'admin')
+        >>> client = CmisClient(url, 'admin', 'admin', serviceDocumentMaxAge=600,
+        ...                     serviceDocumentCache=FileCache('/var/cache/cmislib'))
         """
 
         self.repositoryUrl = repositoryUrl
         self.username = username
         self.password = password
+        self.connectionPool = kwargs.pop('connectionPool', None)
+        self.typeCacheSize = kwargs.pop('typeCacheSize', 1000)
+        self.typeCacheTtl = kwargs.pop('typeCacheTtl', 300)
+        self.serviceDocumentMaxAge = kwargs.pop('serviceDocumentMaxAge', 0)
+        self.serviceDocumentCache = kwargs.pop('serviceDocumentCache', None)
+        responseCacheSize = kwargs.pop('responseCacheSize', None)
+        responseCacheMaxBytes = kwargs.pop('responseCacheMaxBytes', None)
+        self.mediaUploadThreshold = kwargs.pop('mediaUploadThreshold', 16 * 1024 * 1024)
+        self.objectCache = kwargs.pop('objectCache', None)
+        self.minidomFeeds = kwargs.pop('minidomFeeds', False)
+        self._serviceDocument = None
+        self._repositories = None
         self.extArgs = kwargs
         if kwargs.has_key('binding') and (isinstance(kwargs['binding'], Binding)):
+            # a binding passed in may be shared with other clients, so its
+            # pool and response cache are only replaced when asked for
             self.binding = kwargs['binding']
+            if self.connectionPool is None:
+                self.connectionPool = self.binding.getRestService().connectionPool
+            else:
+                self.binding.setConnectionPool(self.connectionPool)
+            if responseCacheSize is not None or responseCacheMaxBytes is not None:
+                responseCache = self.binding.getResponseCache()
+                if responseCacheSize is None:
+                    responseCacheSize = responseCache.maxSize
+                if responseCacheMaxBytes is None:
+                    responseCacheMaxBytes = responseCache.maxBytes
+                self.binding.setResponseCacheSize(responseCacheSize,
+                                                  responseCacheMaxBytes)
         else:
             self.binding = AtomPubBinding(**kwargs)
+            if self.connectionPool is None:
+                self.connectionPool = ConnectionPool()
+            self.binding.setConnectionPool(self.connectionPool)
+            if responseCacheSize is None:
+                responseCacheSize = 500
+            if responseCacheMaxBytes is None:
+                responseCacheMaxBytes = RESPONSE_CACHE_MAX_BYTES
+            self.binding.setResponseCacheSize(responseCacheSize,
+                                              responseCacheMaxBytes)
         self.logger = logging.getLogger('cmislib.model.CmisClient')
         self.logger.debug('Creating an instance of CmisClient')
 
@@ -101,5 +192,196 @@ class CmisClient(object):
 
         return self.binding.getRepositoryService().getDefaultRepository(self)
 
+    def invalidateServiceDocument(self):
+
+        """
+        Forgets the cached service document, and the repository objects
+        built from it, so that the next call fetches it from the server.
+
+        >>> client.invalidateServiceDocument()
+        """
+
+        self._serviceDocument = None
+        self._repositories = None
+        if self.serviceDocumentCache is not None:
+            self.serviceDocumentCache.invalidate(
+                self.binding._getServiceDocumentKey(self))
+
     defaultRepository = property(getDefaultRepository)
     repositories = property(getRepositories)
+
+
+class AsyncCmisClient(object):
+
+    """
+    Thread-pool wrapper around :class:`CmisClient`. Each call is handed to a
+    bounded pool of worker threads and immediately returns a
+    :class:`cmislib.workers.Future`, so a caller can keep many CMIS requests
+    in flight and collect the results with :meth:`Future.result` or
+    :meth:`Future.addCallback`. It works the same way with the AtomPub and
+    the Browser binding.
+
+    Despite its name, this client doesn't use asyncio, its methods aren't
+    coroutines and the futures they return can't be awaited: cmislib
+    supports Python 2, which has neither. It is not asynchronous I/O
+    either. Every request blocks one worker thread on its socket for as
+    long as it runs, and no more than maxWorkers requests are in flight at
+    a time. The name only says that the calls don't block the caller.
+
+    The methods take the repository, folder or document to operate on as
+    their first argument and otherwise mirror the blocking API.
+    """
+
+    def __init__(self, repositoryUrl, username, password, maxWorkers=10, **kwargs):
+
+        """
+        Takes the same arguments as :class:`CmisClient`, plus the maximum
+        number of requests to run at once. Unless a connectionPool or a
+        binding is passed in, the client's pool keeps one idle connection per
+        worker.
+
+        >>> client = AsyncCmisClient('http://localhost:8080/alfresco/s/cmis', 'admin', 'admin', maxWorkers=20)
+        >>> repo = client.getDefaultRepository().result()
+        >>> futures = [client.getObject(repo, objectId) for objectId in ids]
+        >>> docs = [f.result() for f in futures]
+        """
+
+        if kwargs.get('connectionPool') is None and kwargs.get('binding') is None:
+            kwargs['connectionPool'] = ConnectionPool(maxPerHost=maxWorkers)
+        self.client = CmisClient(repositoryUrl, username, password, **kwargs)
+        self.workers = WorkerPool(maxWorkers)
+        self.logger = logging.getLogger('cmislib.model.AsyncCmisClient')
+        self.logger.debug('Creating an instance of AsyncCmisClient')
+
+    def __str__(self):
+        """To string"""
+        return 'Threaded CMIS client connection to %s' % self.client.repositoryUrl
+
+    def submit(self, func, *args, **kwargs):
+
+        """
+        Runs any blocking cmislib call on the client's workers and returns a
+        :class:`cmislib.workers.Future` for its result.
+
+        >>> future = client.submit(doc.checkout)
+        """
+
+        return self.workers.submit(func, *args, **kwargs)
+
+    def getRepositories(self):
+
+        """
+        Returns a future for :meth:`CmisClient.getRepositories`.
+        """
+
+        return self.submit(self.client.getRepositories)
+
+    def getRepository(self, repositoryId):
+
+        """
+        Returns a future for :meth:`CmisClient.getRepository`.
+
+        >>> repo = client.getRepository('83beb297-a6fa-4ac5-844b-98c871c0eea9').result()
+        """
+
+        return self.submit(self.client.getRepository, repositoryId)
+
+    def getDefaultRepository(self):
+
+        """
+        Returns a future for :meth:`CmisClient.getDefaultRepository`.
+        """
+
+        return self.submit(self.client.getDefaultRepository)
+
+    def getObject(self, repository, objectId, **kwargs):
+
+        """
+        Returns a future for :meth:`Repository.getObject`.
+
+        >>> doc = client.getObject(repo, 'workspace://SpacesStore/f0c8b90f-bec0-4405-8b9c-2ab570589808').result()
+        """
+
+        return self.submit(repository.getObject, objectId, **kwargs)
+
+    def getObjectByPath(self, repository, path, **kwargs):
+
+        """
+        Returns a future for :meth:`Repository.getObjectByPath`.
+
+        >>> doc = client.getObjectByPath(repo, '/Sites/sample.pdf').result()
+        """
+
+        return self.submit(repository.getObjectByPath, path, **kwargs)
+
+    def query(self, repository, statement, **kwargs):
+
+        """
+        Returns a future for :meth:`Repository.query`. The result set's first
+        page has already been fetched when the future completes.
+
+        >>> rs = client.query(repo, "select * from cmis:document").result()
+
+        With a rowFormat the future's result is the list of rows.
+        """
+
+        def runQuery():
+            if kwargs.get('rowFormat') is not None:
+                return list(repository.query(statement, **kwargs))
+            resultSet = repository.query(statement, **kwargs)
+            resultSet.getResults()
+            return resultSet
+
+        return self.submit(runQuery)
+
+    def getChildren(self, folder, **kwargs):
+
+        """
+        Returns a future for :meth:`Folder.getChildren`. The result set's
+        first page has already been fetched when the future completes.
+        """
+
+        def runGetChildren():
+            resultSet = folder.getChildren(**kwargs)
+            resultSet.getResults()
+            return resultSet
+
+        return self.submit(runGetChildren)
+
+    def getContentStream(self, document, **kwargs):
+
+        """
+        Returns a future for :meth:`Document.getContentStream`.
+
+        >>> stream = client.getContentStream(doc).result()
+        >>> data = stream.read()
+        """
+
+        return self.submit(document.getContentStream, **kwargs)
+
+    def createDocument(self, repository, name, properties={}, parentFolder=None,
+                       contentFile=None, contentType=None, contentEncoding=None):
+
+        """
+        Returns a future for :meth:`Repository.createDocument`.
+
+        >>> f = open('sample.pdf', 'rb')
+        >>> doc = client.createDocument(repo, 'sample.pdf', parentFolder=folder, contentFile=f).result()
+        """
+
+        return self.submit(repository.createDocument, name,
+                           properties=properties,
+                           parentFolder=parentFolder,
+                           contentFile=contentFile,
+                           contentType=contentType,
+                           contentEncoding=contentEncoding)
+
+    def close(self):
+
+        """
+        Waits for the calls already submitted to finish, then stops the
+        worker threads and closes the pooled connections.
+        """
+
+        self.workers.shutdown()
+        self.client.connectionPool.clear()
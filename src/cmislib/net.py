@@ -24,70 +24,545 @@ response it receives.
 """
 
 from urllib import urlencode
+from urlparse import urlparse, urljoin
+import base64
+import re
+import httplib
 import logging
+import socket
+import ssl
+import threading
+import time
 import httplib2
+from cmislib.cache import LRUCache
+from cmislib.util import getFileExtent
+
+CONDITIONAL_HEADERS = ('if-none-match', 'if-modified-since', 'cache-control')
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+# methods whose requests can be sent again when the response is lost
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS')
+_CONTENT_RANGE = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)')
+# the Content-Range of a 416 Range Not Satisfiable
+_UNSATISFIED_RANGE = re.compile(r'bytes\s+\*/(\d+)')
+# the HTTP proxy types of httplib2.socks, the ones raw connections can use
+_PROXY_TYPE_HTTP = 3
+_PROXY_TYPE_HTTP_NO_TUNNEL = 4
+
+
+def buildUrl(url, params):
+
+    """
+    Returns url with the specified dict of params appended as query string
+    parameters.
+
+    >>> buildUrl('http://localhost/cmis?objectId=1', {'filter': '*'})
+    'http://localhost/cmis?objectId=1&filter=%2A'
+    """
+
+    if not params:
+        return url
+    if url.find('?') >= 0:
+        return url + '&' + urlencode(params)
+    return url + '?' + urlencode(params)
+
+
+def _getPath(url):
+
+    """ Returns the path and query string of url, for an HTTP request line. """
+
+    parts = urlparse(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    return path
+
+
+def getRangeHeader(offset, length=None):
+
+    """
+    Returns the value of the Range header that asks for length bytes
+    starting at offset, or for everything from offset on if length is None.
+
+    >>> getRangeHeader(100, 50)
+    'bytes=100-149'
+    >>> getRangeHeader(100)
+    'bytes=100-'
+    """
+
+    if length is None:
+        return 'bytes=%d-' % offset
+    return 'bytes=%d-%d' % (offset, offset + length - 1)
+
+
+def parseContentRange(value):
+
+    """
+    Returns the first and last byte and the total length a Content-Range
+    header names, the total being None when the server doesn't know it, or
+    None if the header is missing or can't be parsed.
+
+    >>> parseContentRange('bytes 100-149/1000')
+    (100, 149, 1000)
+    """
+
+    match = value and _CONTENT_RANGE.match(value)
+    if not match:
+        return None
+    total = None
+    if match.group(3) != '*':
+        total = int(match.group(3))
+    return int(match.group(1)), int(match.group(2)), total
+
+
+def getBasicAuthorization(username, password):
+
+    """
+    Returns the value of the Authorization header that sends the specified
+    credentials with Basic authentication.
+
+    >>> getBasicAuthorization('admin', 'admin')
+    'Basic YWRtaW46YWRtaW4='
+    """
+
+    if isinstance(username, unicode):
+        username = username.encode('utf-8')
+    if isinstance(password, unicode):
+        password = password.encode('utf-8')
+    return 'Basic ' + base64.b64encode('%s:%s' % (username, password or ''))
+
+
+def _isBasicChallenge(value):
+
+    """
+    Returns True if the WWW-Authenticate header value offers Basic
+    authentication, or is missing.
+    """
+
+    if not value:
+        return True
+    return 'basic' in [part.strip().split(' ')[0].lower() for part in value.split(',')]
+
+
+class ConnectionPool(object):
+
+    """
+    Keeps idle :class:`httplib2.Http` instances around, keyed by scheme and
+    host, so that the persistent (keep-alive) connections they hold get
+    reused by later requests to the same server instead of paying for a new
+    TCP and TLS handshake on every call.
+
+    A pool is created by :class:`cmislib.model.CmisClient` and shared by the
+    binding the client uses. Connections are handed out to one caller at a
+    time, so a pool can safely be used from several threads.
+
+    Next to the :class:`httplib2.Http` instances, the pool keeps plain
+    :class:`httplib.HTTPConnection` objects for the responses that are
+    streamed rather than read at once, see :meth:`acquireRaw`. They go
+    through the same proxy as httplib2 would, the proxy_info the pool was
+    created with or the one http_proxy and https_proxy name.
+    """
+
+    def __init__(self, maxPerHost=10, idleTimeout=60, **kwargs):
+
+        """
+        :param maxPerHost: The maximum number of idle connections kept per
+         host. Connections released beyond that number are closed.
+        :param idleTimeout: The number of seconds a connection may sit idle in
+         the pool before it is closed and evicted.
+
+        Any other keyword arguments, such as timeout or ca_certs, are passed
+        to :class:`httplib2.Http` when a new connection has to be created.
+
+        >>> pool = ConnectionPool(maxPerHost=4, idleTimeout=30, timeout=20)
+        >>> client = CmisClient(url, 'admin', 'admin', connectionPool=pool)
+        """
+
+        self.maxPerHost = maxPerHost
+        self.idleTimeout = idleTimeout
+        self._httpArgs = kwargs
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.logger = logging.getLogger('cmislib.net.ConnectionPool')
+
+    def acquire(self, url):
+
+        """
+        Returns an :class:`httplib2.Http` instance for the host in the
+        specified URL, reusing an idle one when the pool has one. The caller
+        owns the instance until it hands it back with :meth:`release`.
+        """
+
+        key = self._getKey(url)
+        http = self._takeIdle(key)
+        if http is None:
+            self.logger.debug('No idle connection for %s, creating one', key)
+            http = httplib2.Http(**self._httpArgs)
+        return http
+
+    def acquireRaw(self, url):
+
+        """
+        Returns an :class:`httplib.HTTPConnection`, or an
+        :class:`httplib.HTTPSConnection`, to the host in the specified URL,
+        reusing an idle one when the pool has one, and True if it was
+        reused. The timeout, ca_certs and
+        disable_ssl_certificate_validation arguments the pool was created
+        with apply to it as well, and so does its proxy, see
+        :meth:`canUseRaw`. The caller owns the connection until it hands it
+        back with :meth:`releaseRaw`.
+        """
+
+        key = self._getKey(url)
+        conn = self._takeIdle('raw ' + key)
+        if conn is not None:
+            return conn, True
+        self.logger.debug('No idle raw connection for %s, creating one', key)
+        parts = urlparse(url)
+        timeout = self._httpArgs.get('timeout')
+        proxyInfo = self.getProxyInfo(url)
+        host = parts.netloc
+        if proxyInfo is not None:
+            proxyHeaders = dict(proxyInfo.proxy_headers or {})
+            if proxyInfo.proxy_user is not None:
+                proxyHeaders['Proxy-Authorization'] = getBasicAuthorization(proxyInfo.proxy_user,
+                                                                            proxyInfo.proxy_pass)
+            host = '%s:%s' % (proxyInfo.proxy_host, proxyInfo.proxy_port)
+            if proxyInfo.proxy_type == _PROXY_TYPE_HTTP_NO_TUNNEL and parts.scheme.lower() == 'http':
+                target = '%s://%s' % (parts.scheme, parts.netloc)
+                return _ProxyConnection(host, target, proxyHeaders, timeout=timeout), False
+        if parts.scheme.lower() == 'https':
+            if self._httpArgs.get('disable_ssl_certificate_validation'):
+                context = ssl._create_unverified_context()
+            else:
+                context = ssl.create_default_context(cafile=self._httpArgs.get('ca_certs'))
+            conn = httplib.HTTPSConnection(host, timeout=timeout, context=context)
+        else:
+            conn = httplib.HTTPConnection(host, timeout=timeout)
+        if proxyInfo is not None:
+            conn.set_tunnel(parts.hostname, parts.port, proxyHeaders)
+        return conn, False
+
+    def getProxyInfo(self, url):
+
+        """
+        Returns the :class:`httplib2.ProxyInfo` of the proxy that requests
+        to url go through, or None. Like httplib2, the pool uses its
+        proxy_info argument, which can be a function of the scheme, or by
+        default the http_proxy, https_proxy and no_proxy environment
+        variables.
+        """
+
+        parts = urlparse(url)
+        proxyInfo = self._httpArgs.get('proxy_info', httplib2.proxy_info_from_environment)
+        if callable(proxyInfo):
+            proxyInfo = proxyInfo(parts.scheme.lower())
+        if proxyInfo is None or not proxyInfo.isgood() or not proxyInfo.applies_to(parts.hostname):
+            return None
+        return proxyInfo
+
+    def canUseRaw(self, url):
+
+        """
+        Returns True if :meth:`acquireRaw` can reach url, which is the case
+        unless the requests go through a SOCKS proxy. Only httplib2 can
+        talk to those.
+        """
+
+        proxyInfo = self.getProxyInfo(url)
+        return proxyInfo is None or proxyInfo.proxy_type in (_PROXY_TYPE_HTTP, _PROXY_TYPE_HTTP_NO_TUNNEL)
+
+    def release(self, url, http):
+
+        """
+        Hands an :class:`httplib2.Http` instance obtained from
+        :meth:`acquire` back to the pool so that its connections can be
+        reused.
+        """
+
+        self._putIdle(self._getKey(url), http)
+
+    def releaseRaw(self, url, conn):
+
+        """
+        Hands a connection obtained from :meth:`acquireRaw` back to the pool
+        so that it can be reused. Only connections whose last response has
+        been read completely may be handed back.
+        """
+
+        self._putIdle('raw ' + self._getKey(url), conn)
+
+    def discard(self, http):
+
+        """
+        Closes an :class:`httplib2.Http` instance obtained from
+        :meth:`acquire` that should not be reused, typically because a
+        request made with it failed.
+        """
+
+        self._close([http])
+
+    def clear(self):
+
+        """
+        Closes and forgets every idle connection in the pool.
+        """
+
+        self._lock.acquire()
+        try:
+            idle, self._idle = self._idle, {}
+        finally:
+            self._lock.release()
+        for entries in idle.values():
+            self._close([http for http, released in entries])
+
+    def getStats(self):
+
+        """
+        Returns a dict of counters describing how well the pool is doing:
+        'hits' and 'misses' count calls to :meth:`acquire` that did and did
+        not find an idle connection, 'evictions' counts connections closed
+        because they idled too long or the pool was full, and 'idle' is the
+        number of connections currently waiting to be reused.
+
+        >>> client.connectionPool.getStats()
+        {'hits': 41, 'misses': 1, 'evictions': 0, 'idle': 1}
+        """
+
+        self._lock.acquire()
+        try:
+            idleCount = sum([len(entries) for entries in self._idle.values()])
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'idle': idleCount}
+        finally:
+            self._lock.release()
+
+    def _takeIdle(self, key):
+
+        """
+        Returns an idle connection kept under the specified key, or None.
+        """
+
+        stale = []
+        conn = None
+        self._lock.acquire()
+        try:
+            stale = self._evictIdle(time.time())
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()[0]
+                self.hits += 1
+            else:
+                self.misses += 1
+        finally:
+            self._lock.release()
+        self._close(stale)
+        return conn
+
+    def _putIdle(self, key, conn):
+
+        """
+        Keeps a connection under the specified key, or closes it if there
+        are enough idle ones already.
+        """
+
+        self._lock.acquire()
+        try:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.maxPerHost:
+                idle.append((conn, time.time()))
+                return
+            self.evictions += 1
+        finally:
+            self._lock.release()
+        self._close([conn])
+
+    def _evictIdle(self, now):
+
+        """
+        Removes the connections that have been idle longer than the idle
+        timeout and returns them so they can be closed outside of the lock.
+        """
+
+        stale = []
+        for key, entries in self._idle.items():
+            while entries and now - entries[0][1] > self.idleTimeout:
+                stale.append(entries.pop(0)[0])
+                self.evictions += 1
+            if not entries:
+                del self._idle[key]
+        return stale
+
+    def _close(self, https):
+
+        """ Closes the connections held by the specified Http instances. """
+
+        for http in https:
+            try:
+                http.close()
+            except Exception:
+                self.logger.debug('Ignoring error while closing a connection', exc_info=True)
+
+    def _getKey(self, url):
+
+        """ Returns the pool key, scheme and host, for the specified URL. """
+
+        parts = urlparse(url)
+        return '%s://%s' % (parts.scheme.lower(), parts.netloc.lower())
 
 
 class RESTService(object):
 
     """
     Generic service for interacting with an HTTP end point. Sets headers
-    such as the USER_AGENT and builds the basic auth handler.
+    such as the USER_AGENT and builds the basic auth handler. Connections
+    come from, and go back to, a :class:`ConnectionPool`.
+
+    For conditional GETs the service remembers the ETag and Last-Modified
+    validators of the last response for each user and URL, in an
+    :class:`cmislib.cache.LRUCache` of validatorCacheSize entries, so that
+    clients sharing the service never send each other's validators.
     """
 
-    def __init__(self):
+    def __init__(self, connectionPool=None, validatorCacheSize=10000):
         self.user_agent = 'cmislib/%s +http://chemistry.apache.org/'
         self.logger = logging.getLogger('cmislib.net.RESTService')
+        if connectionPool is None:
+            connectionPool = ConnectionPool()
+        self.connectionPool = connectionPool
+        self.validators = LRUCache(validatorCacheSize)
+        # the pool keys of the servers that asked for another
+        # authentication scheme than Basic
+        self._httplib2Hosts = set()
 
     def get(self,
             url,
             username=None,
             password=None,
+            conditional=False,
             **kwargs):
 
-        """ Makes a get request to the URL specified."""
+        """
+        Makes a get request to the URL specified.
 
-        headers = {}
-        if kwargs:
-            if 'headers' in kwargs:
-                headers = kwargs['headers']
-                del kwargs['headers']
-                self.logger.debug('Headers passed in: %s', headers)
-            if url.find('?') >= 0:
-                url = url + '&' + urlencode(kwargs)
-            else:
-                url = url + '?' + urlencode(kwargs)
+        If conditional is True, the request carries the If-None-Match and
+        If-Modified-Since validators of the last conditional GET of the same
+        URL by the same user, so the server can answer 304 Not Modified instead of sending
+        the same response again. Callers asking for that have to be ready to
+        handle a 304. Validators are not added if the caller passed its own
+        If-None-Match, If-Modified-Since or Cache-Control header.
+        """
 
-        self.logger.debug('About to do a GET on:' + url)
+        return self._request('GET', url, username, password,
+                             conditional=conditional, **kwargs)
 
-        h = httplib2.Http()
-        h.add_credentials(username, password)
-        headers['User-Agent'] = self.user_agent
+    def getStream(self, url, username=None, password=None, headers=None, **kwargs):
 
-        return h.request(url, method='GET', headers=headers)
+        """
+        Makes a get request to the URL specified and returns a
+        :class:`ContentStream` over the response, whose body is read from
+        the connection as the caller reads the stream instead of being held
+        in memory.
 
-    def delete(self, url, username=None, password=None, **kwargs):
+        Streams are fetched over plain httplib connections rather than with
+        httplib2, so the credentials are sent with the first request, using
+        Basic authentication, instead of after the server asked for them.
+        Redirects are followed, and the credentials are only sent to the
+        host of the original URL. Any kwargs are appended to the URL as
+        query string parameters. The caller checks the status of the
+        stream.
 
-        """ Makes a delete request to the URL specified. """
+        A server that asks for another authentication scheme, such as
+        Digest, and a SOCKS proxy are left to httplib2. The content is then
+        read into memory before the stream is returned.
+        """
 
-        headers = {}
-        if kwargs:
-            if 'headers' in kwargs:
-                headers = kwargs['headers']
-                del kwargs['headers']
-                self.logger.debug('Headers passed in: %s', headers)
-            if url.find('?') >= 0:
-                url = url + '&' + urlencode(kwargs)
-            else:
-                url = url + '?' + urlencode(kwargs)
+        url = buildUrl(url, kwargs)
+        requestHeaders = dict(headers or {})
+        requestHeaders['User-Agent'] = self.user_agent
+        if not self._canStream(url):
+            return self._getBufferedStream(url, username, password, requestHeaders)
+        authorization = None
+        if username is not None:
+            authorization = getBasicAuthorization(username, password)
+        host = urlparse(url).netloc.lower()
+        for i in range(MAX_REDIRECTS + 1):
+            self.logger.debug('About to stream a GET on:%s', url)
+            sendHeaders = dict(requestHeaders)
+            if authorization is not None and urlparse(url).netloc.lower() == host:
+                sendHeaders['Authorization'] = authorization
+            stream = self._openStream(url, sendHeaders)
+            if stream.status == 401 and not _isBasicChallenge(stream.headers.get('www-authenticate')):
+                stream.read()
+                stream.close()
+                self._useHttplib2(url)
+                return self._getBufferedStream(url, username, password, requestHeaders)
+            location = stream.headers.get('location')
+            if stream.status not in REDIRECT_STATUSES or not location:
+                return stream
+            # redirect bodies are small, reading them lets the connection
+            # go back to the pool
+            stream.read()
+            stream.close()
+            url = urljoin(url, location)
+        raise httplib.HTTPException('Too many redirects, last one to %s' % url)
 
-        self.logger.debug('About to do a DELETE on:' + url)
+    def getRange(self, url, offset, length=None, username=None, password=None,
+                 headers=None, **kwargs):
 
-        h = httplib2.Http()
-        h.add_credentials(username, password)
-        headers['User-Agent'] = self.user_agent
+        """
+        Works like :meth:`getStream`, but asks the server with a Range
+        header for length bytes of the content starting at offset, or for
+        everything from offset on if length is None. The stream's offset
+        attribute is where its content starts, and its totalLength the
+        length of the whole content, if the server told.
 
-        return h.request(url, method='DELETE', headers=headers)
+        A server that doesn't support ranges answers 200 with the whole
+        content. The bytes before offset are then read and dropped, and the
+        stream ends after length bytes, so that either way the stream only
+        holds the range asked for.
+
+        A range that starts right at the end of the content, such as the
+        rest of a download that is already complete, is answered with a
+        416 whose Content-Range gives offset as the total length. That is
+        returned as an empty 206 range rather than as an error.
+
+        >>> stream = rest.getRange(url, 1024 * 1024, username='admin', password='admin')
+        >>> stream.status, stream.offset, stream.totalLength
+        (206, 1048576, 4194304)
+        """
+
+        requestHeaders = dict(headers or {})
+        requestHeaders['Range'] = getRangeHeader(offset, length)
+        stream = self.getStream(url, username, password, headers=requestHeaders, **kwargs)
+        if stream.status == 206 and stream.offset != offset:
+            stream.close()
+            raise httplib.HTTPException('Asked for a range from %d, got one from %d'
+                                        % (offset, stream.offset))
+        elif stream.status == 200:
+            self.logger.debug('%s does not support ranges, skipping %d bytes', url, offset)
+            stream._selectRange(offset, length)
+        elif stream.status == 416:
+            match = _UNSATISFIED_RANGE.match(stream.headers.get('content-range') or '')
+            if match and int(match.group(1)) == offset:
+                # there is nothing from offset on
+                stream.read()
+                stream.status = 206
+                stream.offset = offset
+                stream.totalLength = offset
+                stream.contentLength = 0
+        return stream
+
+    def delete(self, url, username=None, password=None, **kwargs):
+
+        """ Makes a delete request to the URL specified. """
+
+        return self._request('DELETE', url, username, password, **kwargs)
 
     def put(self,
             url,
@@ -100,28 +575,13 @@ class RESTService(object):
         """
         Makes a PUT request to the URL specified and includes the payload
         that gets passed in. The content type header gets set to the
-        specified content type.
+        specified content type. The payload is a string or a streaming body,
+        see :meth:`post`.
         """
 
-        headers = {}
-        if kwargs:
-            if 'headers' in kwargs:
-                headers = kwargs['headers']
-                del kwargs['headers']
-                self.logger.debug('Headers passed in: %s', headers)
-            if url.find('?') >= 0:
-                url = url + '&' + urlencode(kwargs)
-            else:
-                url = url + '?' + urlencode(kwargs)
-
-        self.logger.debug('About to do a PUT on:' + url)
-
-        h = httplib2.Http()
-        h.add_credentials(username, password)
-        headers['User-Agent'] = self.user_agent
-        if contentType is not None:
-            headers['Content-Type'] = contentType
-        return h.request(url, body=payload, method='PUT', headers=headers)
+        return self._request('PUT', url, username, password,
+                             payload=payload, contentType=contentType,
+                             **kwargs)
 
     def post(self,
              url,
@@ -135,24 +595,463 @@ class RESTService(object):
         Makes a POST request to the URL specified and posts the payload
         that gets passed in. The content type header gets set to the
         specified content type.
+
+        Instead of a string, the payload can be a streaming body: an object
+        with a contentLength attribute that can be iterated over, more than
+        once, to get the chunks of the body. Such a body is sent chunk by
+        chunk over a plain httplib connection, with the credentials sent
+        up front using Basic authentication, so it is never held in memory
+        as a whole. A server that asks for another authentication scheme,
+        such as Digest, and a SOCKS proxy are left to httplib2, which gets
+        the whole body at once.
+        """
+
+        return self._request('POST', url, username, password,
+                             payload=payload, contentType=contentType,
+                             **kwargs)
+
+    def _request(self, method, url, username, password,
+                 payload=None, contentType=None, conditional=False, **kwargs):
+
+        """
+        Does the actual request using a pooled connection. Any kwargs other
+        than 'headers' are appended to the URL as query string parameters.
         """
 
+        if payload is not None and not isinstance(payload, basestring):
+            if self._canStream(url):
+                resp, content = self._sendStream(method, url, username, password,
+                                                 payload, contentType, **kwargs)
+                # a 401 means the server didn't act on the request, so it
+                # can be sent again
+                if resp.status != 401 or _isBasicChallenge(resp.get('www-authenticate')):
+                    return resp, content
+                self._useHttplib2(url)
+            payload = ''.join(payload)
+
         headers = {}
         if kwargs:
             if 'headers' in kwargs:
-                headers = kwargs['headers']
+                headers = dict(kwargs['headers'])
                 del kwargs['headers']
                 self.logger.debug('Headers passed in: %s', headers)
-            if url.find('?') >= 0:
-                url = url + '&' + urlencode(kwargs)
-            else:
-                url = url + '?' + urlencode(kwargs)
+            url = buildUrl(url, kwargs)
+
+        self.logger.debug('About to do a %s on:%s', method, url)
+
+        headers['User-Agent'] = self.user_agent
+        if contentType is not None:
+            headers['Content-Type'] = contentType
+        if conditional and not [h for h in headers if h.lower() in CONDITIONAL_HEADERS]:
+            validators = self.validators.get((username, url))
+            if validators:
+                headers.update(validators)
+
+        h = self.connectionPool.acquire(url)
+        try:
+            h.add_credentials(username, password)
+            result = h.request(url, method=method, headers=headers, body=payload)
+        except Exception:
+            self.connectionPool.discard(h)
+            raise
+        # credentials accumulate on an Http instance, so don't let them
+        # follow it back into the pool
+        h.clear_credentials()
+        self.connectionPool.release(url, h)
+        if conditional and result[0].status == 200:
+            self._saveValidators(username, url, result[0])
+        return result
+
+    def _sendStream(self, method, url, username, password, payload, contentType, **kwargs):
 
-        self.logger.debug('About to do a POST on:' + url)
+        """
+        Sends a request with a streaming body over a pooled raw connection
+        and returns the response, as an :class:`httplib2.Response`, and its
+        content, the same way :meth:`_request` does.
+
+        An idle connection the server has closed is replaced by a new one
+        and the request sent again, unless the whole request had already
+        been written and the method is not idempotent: a POST that the
+        server may have acted on isn't repeated, so that documents or
+        versions are not created twice.
+        """
 
-        h = httplib2.Http()
-        h.add_credentials(username, password)
+        headers = dict(kwargs.pop('headers', {}))
+        url = buildUrl(url, kwargs)
+        self.logger.debug('About to stream a %s to:%s', method, url)
         headers['User-Agent'] = self.user_agent
+        headers['Content-Length'] = str(payload.contentLength)
         if contentType is not None:
             headers['Content-Type'] = contentType
-        return h.request(url, body=payload, method='POST', headers=headers)
+        if username is not None:
+            headers['Authorization'] = getBasicAuthorization(username, password)
+        path = _getPath(url)
+        while True:
+            conn, reused = self.connectionPool.acquireRaw(url)
+            sent = False
+            try:
+                conn.request(method, path, headers=headers)
+                for chunk in payload:
+                    conn.send(chunk)
+                sent = True
+                response = conn.getresponse()
+                content = response.read()
+            except (socket.error, httplib.HTTPException):
+                self.connectionPool.discard(conn)
+                if not reused or (sent and method not in IDEMPOTENT_METHODS):
+                    raise
+                self.logger.debug('Idle connection to %s went away, retrying', url)
+                continue
+            if response.will_close:
+                self.connectionPool.discard(conn)
+            else:
+                self.connectionPool.releaseRaw(url, conn)
+            return httplib2.Response(response), content
+
+    def _canStream(self, url):
+
+        """
+        Returns True if requests to url can go over raw httplib connections
+        with Basic authentication.
+        """
+
+        return self.connectionPool._getKey(url) not in self._httplib2Hosts and \
+            self.connectionPool.canUseRaw(url)
+
+    def _useHttplib2(self, url):
+
+        """
+        Makes the requests to the server of url go through httplib2, which
+        knows the authentication scheme the server asked for.
+        """
+
+        self.logger.debug('%s does not take Basic authentication, using httplib2', url)
+        self._httplib2Hosts.add(self.connectionPool._getKey(url))
+
+    def _getBufferedStream(self, url, username, password, headers):
+
+        """
+        Returns a :class:`ContentStream` over the response to a GET made
+        with httplib2, whose content is held in memory.
+        """
+
+        resp, content = self._request('GET', url, username, password, headers=headers)
+        response = _BufferedResponse(resp, content)
+        return ContentStream(response, response, url, self.connectionPool)
+
+    def _openStream(self, url, headers):
+
+        """
+        Sends a GET for url over a pooled raw connection and returns a
+        :class:`ContentStream` over the response. An idle connection the
+        server has closed in the meantime is replaced by a new one.
+        """
+
+        path = _getPath(url)
+        while True:
+            conn, reused = self.connectionPool.acquireRaw(url)
+            try:
+                conn.request('GET', path, headers=headers)
+                return ContentStream(conn.getresponse(), conn, url, self.connectionPool)
+            except (socket.error, httplib.HTTPException):
+                self.connectionPool.discard(conn)
+                if not reused:
+                    raise
+                self.logger.debug('Idle connection to %s went away, retrying', url)
+
+    def _saveValidators(self, username, url, resp):
+
+        """
+        Remembers the validators of a response for the next conditional GET
+        of the same URL by the same user.
+        """
+
+        validators = {}
+        if resp.get('etag'):
+            validators['If-None-Match'] = resp['etag']
+        if resp.get('last-modified'):
+            validators['If-Modified-Since'] = resp['last-modified']
+        if validators:
+            self.validators.put((username, url), validators)
+        else:
+            self.validators.invalidate((username, url))
+
+
+class ContentStream(object):
+
+    """
+    File-like object over the body of an HTTP response that is read from
+    the connection as it is consumed, so that memory use stays the same
+    however large the content is. Returned by :meth:`RESTService.getStream`
+    and by the getContentStream methods of documents.
+
+    Besides read and readinto, a stream can be iterated over in chunks of
+    chunkSize bytes and copied to a file with :meth:`copyTo`. Its
+    connection goes back to the pool once the body has been read to the
+    end. Closing a stream before that closes the connection. A connection
+    that is lost before contentLength bytes have been read raises
+    :class:`httplib.IncompleteRead`, so that a cut transfer is never
+    mistaken for the end of the content.
+
+    The stream of a range, see :meth:`RESTService.getRange`, holds the
+    content from its offset on, and its totalLength is the length of the
+    whole content if the server told.
+
+    >>> stream = doc.getContentStream()
+    >>> stream.contentType
+    'application/pdf'
+    >>> f = open('sample.pdf', 'wb')
+    >>> stream.copyTo(f)
+    117248
+    >>> stream.close()
+    """
+
+    chunkSize = 65536
+
+    def __init__(self, response, connection, url, connectionPool):
+        """ Constructor """
+        self._response = response
+        self._connection = connection
+        self._url = url
+        self._connectionPool = connectionPool
+        self.status = response.status
+        self.headers = dict(response.getheaders())
+        self.contentType = self.headers.get('content-type')
+        self.contentLength = None
+        if self.headers.get('content-length'):
+            self.contentLength = int(self.headers['content-length'])
+        self.offset = 0
+        self.totalLength = None
+        contentRange = parseContentRange(self.headers.get('content-range'))
+        if self.status == 206 and contentRange is not None:
+            self.offset = contentRange[0]
+            self.totalLength = contentRange[2]
+        elif self.status == 200:
+            self.totalLength = self.contentLength
+        self.closed = False
+        self._position = 0
+        # True when the stream ends before the body of the response does
+        self._cut = False
+
+    def __iter__(self):
+        """ Iterates over the content in chunks of chunkSize bytes """
+        return self.iterChunks()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def read(self, size=-1):
+
+        """
+        Reads up to size bytes, or everything that is left if size is
+        negative. Returns an empty string at the end of the content.
+        """
+
+        if self.closed:
+            raise ValueError('I/O operation on closed stream')
+        if self._connection is None:
+            return ''
+        left = None
+        if self.contentLength is not None:
+            left = self.contentLength - self._position
+            if size is None or size < 0 or size > left:
+                size = left
+        if size is None or size < 0:
+            data = self._response.read()
+        else:
+            data = self._response.read(size)
+        self._position += len(data)
+        if size and not data and left:
+            self._dropConnection()
+            raise httplib.IncompleteRead('', left)
+        if self._response.isclosed():
+            self._releaseConnection()
+        elif self._cut and self._position >= self.contentLength:
+            self._dropConnection()
+        return data
+
+    def readinto(self, buf):
+
+        """
+        Reads up to len(buf) bytes into the writable buffer buf, such as a
+        bytearray, and returns the number of bytes read.
+        """
+
+        data = self.read(len(buf))
+        buf[:len(data)] = data
+        return len(data)
+
+    def iterChunks(self, chunkSize=None):
+
+        """
+        Returns a generator over the rest of the content in chunks of up to
+        chunkSize bytes, the stream's chunkSize by default.
+        """
+
+        chunkSize = chunkSize or self.chunkSize
+        while True:
+            data = self.read(chunkSize)
+            if not data:
+                break
+            yield data
+
+    def copyTo(self, fileobj, chunkSize=None):
+
+        """
+        Writes the rest of the content to fileobj, chunkSize bytes at a time,
+        and returns the number of bytes written.
+        """
+
+        written = 0
+        for data in self.iterChunks(chunkSize):
+            fileobj.write(data)
+            written += len(data)
+        return written
+
+    def close(self):
+
+        """
+        Closes the stream. Unless the content has been read to the end,
+        this closes the connection as well.
+        """
+
+        if self.closed:
+            return
+        self.closed = True
+        if self._connection is not None:
+            self._dropConnection()
+
+    def _selectRange(self, offset, length):
+
+        """
+        Makes the stream of a whole content hold only length bytes of it
+        starting at offset, or everything from offset on, by reading and
+        dropping the bytes before offset.
+        """
+
+        skipped = 0
+        while skipped < offset:
+            data = self.read(min(self.chunkSize, offset - skipped))
+            if not data:
+                break
+            skipped += len(data)
+        self.offset = skipped
+        left = None
+        if self.contentLength is not None:
+            left = self.contentLength - self._position
+        self._position = 0
+        if length is not None and (left is None or length < left):
+            self.contentLength = length
+            self._cut = True
+        else:
+            self.contentLength = left
+
+    def _dropConnection(self):
+
+        """ Closes the connection, leaving the rest of the body unread. """
+
+        self._response.close()
+        self._connectionPool.discard(self._connection)
+        self._connection = None
+
+    def _releaseConnection(self):
+
+        """
+        Hands the connection back to the pool once the whole body has been
+        read, unless the server is going to close it.
+        """
+
+        if self._response.will_close:
+            self._connectionPool.discard(self._connection)
+        else:
+            self._connectionPool.releaseRaw(self._url, self._connection)
+        self._connection = None
+
+
+class _ProxyConnection(httplib.HTTPConnection):
+
+    """
+    An :class:`httplib.HTTPConnection` to an HTTP proxy that doesn't tunnel,
+    which sends each request on with the absolute URI of the target host.
+    """
+
+    def __init__(self, host, target, proxyHeaders, timeout=None):
+        httplib.HTTPConnection.__init__(self, host, timeout=timeout)
+        self._target = target
+        self._proxyHeaders = proxyHeaders
+
+    def putrequest(self, method, url, skip_host=0, skip_accept_encoding=0):
+        httplib.HTTPConnection.putrequest(self, method, self._target + url,
+                                          skip_host, skip_accept_encoding)
+        for name, value in self._proxyHeaders.items():
+            self.putheader(name, value)
+
+
+class _BufferedResponse(object):
+
+    """
+    Stands in for both the response and the connection of a
+    :class:`ContentStream` over a response httplib2 has read already.
+    """
+
+    will_close = True
+
+    def __init__(self, resp, content):
+        self.status = resp.status
+        self._headers = [(name, value) for name, value in resp.items() if name != 'status']
+        if resp.status in (200, 206):
+            # httplib2 has decoded the content
+            self._headers = [(name, value) for name, value in self._headers
+                             if name not in ('content-length', 'content-encoding')]
+            self._headers.append(('content-length', str(len(content))))
+        self._content = content
+        self._position = 0
+
+    def getheaders(self):
+        return self._headers
+
+    def read(self, size=None):
+        end = len(self._content)
+        if size is not None:
+            end = min(end, self._position + size)
+        data = self._content[self._position:end]
+        self._position = end
+        return data
+
+    def isclosed(self):
+        return self._position >= len(self._content)
+
+    def close(self):
+        pass
+
+
+class FileBody(object):
+
+    """
+    A request body holding the content of a file, from its current
+    position to its end, that is read chunkSize bytes at a time while it is
+    sent. Pass it as the payload of :meth:`RESTService.put` or
+    :meth:`RESTService.post`. A file that can't seek is read into memory.
+
+    >>> rest.put(url, FileBody(open('big.iso', 'rb')), 'application/octet-stream', 'admin', 'admin')
+    """
+
+    chunkSize = 65536
+
+    def __init__(self, contentFile):
+        """ Constructor """
+        self._file, self._start, self.contentLength = getFileExtent(contentFile)
+
+    def __iter__(self):
+        """ Iterates over the chunks of the file, from where it started """
+        self._file.seek(self._start)
+        remaining = self.contentLength
+        while remaining > 0:
+            data = self._file.read(min(self.chunkSize, remaining))
+            if not data:
+                raise IOError('The content file ended before its expected length')
+            remaining -= len(data)
+            yield data
@@ -24,11 +24,17 @@ import re
 import iso8601
 import logging
 import datetime
+import StringIO
 from cmislib.domain import CmisId
+from cmislib.exceptions import InvalidArgumentException
 from urllib import urlencode, quote
 
 moduleLogger = logging.getLogger('cmislib.util')
 
+_SELECT_LIST = re.compile(r'^\s*select\s+(.*?)\s+from\s', re.IGNORECASE | re.DOTALL)
+_COLUMN_ALIAS = re.compile(r'\s+(?:as\s+)?[^\s]+$', re.IGNORECASE)
+_names = {}
+
 
 def to_utf8(value):
 
@@ -200,3 +206,78 @@ def toCMISValue(value):
         return 'none'
     else:
         return value
+
+
+def internName(name):
+
+    """
+    Returns the one shared copy of the specified property name, so that the
+    property dicts of thousands of objects don't each hold their own copy
+    of the same key. Property names are few, so the shared copies are kept
+    for good.
+    """
+
+    return _names.setdefault(name, name)
+
+
+def getFileExtent(contentFile):
+
+    """
+    Returns a seekable file with the content of contentFile, the position
+    the content starts at and its length, for request bodies that are sent
+    in chunks but need their length up front. A file that can't seek is
+    read into memory.
+    """
+
+    try:
+        start = contentFile.tell()
+        contentFile.seek(0, 2)
+        end = contentFile.tell()
+        contentFile.seek(start)
+        return contentFile, start, end - start
+    except (AttributeError, IOError, ValueError):
+        data = contentFile.read()
+        return StringIO.StringIO(data), 0, len(data)
+
+
+def getSelectColumns(statement):
+
+    """
+    Returns the list of property ids selected by a CMIS query statement, in
+    select list order, with table qualifiers and column aliases removed.
+    Returns None if the select list contains a \*.
+
+    >>> getSelectColumns('SELECT d.cmis:objectId AS id, cmis:name FROM cmis:document d')
+    ['cmis:objectId', 'cmis:name']
+    """
+
+    match = _SELECT_LIST.match(statement)
+    if match is None:
+        raise InvalidArgumentException('Could not find the select list of: %s' % statement)
+    columns = []
+    for column in match.group(1).split(','):
+        column = _COLUMN_ALIAS.sub('', column.strip())
+        column = column[column.rfind('.') + 1:]
+        if column == '*':
+            return None
+        columns.append(column)
+    return columns
+
+
+def getRowFactory(statement, rowFormat):
+
+    """
+    Returns a function that turns the dict of property values of a query
+    result into a row of the specified format: 'dict' rows are the dict
+    itself, keyed by property id, 'tuple' rows hold the values of the
+    statement's select list, in order.
+    """
+
+    if rowFormat == 'dict':
+        return lambda properties: properties
+    elif rowFormat == 'tuple':
+        columns = getSelectColumns(statement)
+        if columns is None:
+            raise InvalidArgumentException('Tuple rows need an explicit select list, not *')
+        return lambda properties: tuple([properties.get(column) for column in columns])
+    raise InvalidArgumentException('Unknown row format: %s' % rowFormat)
@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+#
+#      Licensed to the Apache Software Foundation (ASF) under one
+#      or more contributor license agreements.  See the NOTICE file
+#      distributed with this work for additional information
+#      regarding copyright ownership.  The ASF licenses this file
+#      to you under the Apache License, Version 2.0 (the
+#      "License"); you may not use this file except in compliance
+#      with the License.  You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#      Unless required by applicable law or agreed to in writing,
+#      software distributed under the License is distributed on an
+#      "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#      KIND, either express or implied.  See the License for the
+#      specific language governing permissions and limitations
+#      under the License.
+#
+"""
+Module containing the small thread pool cmislib uses to run CMIS calls
+concurrently. It sticks to the standard library so that it works on every
+Python the rest of cmislib supports.
+"""
+from collections import deque
+import logging
+import sys
+import threading
+import Queue
+from cmislib.exceptions import CmisException
+
+moduleLogger = logging.getLogger('cmislib.workers')
+
+
+class Future(object):
+
+    """
+    The pending result of a call handed to a :class:`WorkerPool`.
+    """
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._result = None
+        self._excInfo = None
+        self._callbacks = []
+
+    def done(self):
+
+        """
+        Returns True once the call has either returned or raised.
+        """
+
+        return self._done.isSet()
+
+    def result(self, timeout=None):
+
+        """
+        Waits for the call to finish and returns its result. If the call
+        raised an exception, the same exception is raised here, with its
+        original traceback. A :class:`cmislib.exceptions.CmisException`
+        is raised if the call is still running after timeout seconds.
+
+        >>> future = asyncClient.getObject(repo, objectId)
+        >>> doc = future.result()
+        """
+
+        self._wait(timeout)
+        if self._excInfo is not None:
+            raise self._excInfo[0], self._excInfo[1], self._excInfo[2]
+        return self._result
+
+    def exception(self, timeout=None):
+
+        """
+        Waits for the call to finish and returns the exception it raised, or
+        None if it returned normally.
+        """
+
+        self._wait(timeout)
+        if self._excInfo is not None:
+            return self._excInfo[1]
+
+    def addCallback(self, callback):
+
+        """
+        Arranges for callback to be called with this future as its only
+        argument once the call finishes. If the call is already finished the
+        callback runs right away in the calling thread, otherwise it runs in
+        the worker thread that finished the call.
+
+        >>> def printName(future):
+        ...     print future.result().name
+        >>> asyncClient.getObjectByPath(repo, '/sample.pdf').addCallback(printName)
+        """
+
+        self._lock.acquire()
+        try:
+            if not self._done.isSet():
+                self._callbacks.append(callback)
+                return
+        finally:
+            self._lock.release()
+        self._runCallback(callback)
+
+    def _setResult(self, result):
+        self._result = result
+        self._finish()
+
+    def _setExcInfo(self, excInfo):
+        self._excInfo = excInfo
+        self._finish()
+
+    def _finish(self):
+        self._lock.acquire()
+        try:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        finally:
+            self._lock.release()
+        for callback in callbacks:
+            self._runCallback(callback)
+
+    def _runCallback(self, callback):
+        try:
+            callback(self)
+        except Exception:
+            moduleLogger.exception('Exception in a Future callback')
+
+    def _wait(self, timeout):
+        # Event.wait() without a timeout can't be interrupted on Python 2,
+        # so wait in short slices
+        if timeout is None:
+            while not self._done.wait(1):
+                pass
+        elif not self._done.wait(timeout):
+            raise CmisException('Timed out waiting for a result')
+
+
+class WorkerPool(object):
+
+    """
+    A fixed-size pool of daemon threads that runs submitted calls and hands
+    back a :class:`Future` for each. Threads are started on demand, up to
+    maxWorkers.
+
+    If queueSize is greater than zero, :meth:`submit` blocks while that many
+    calls are already waiting for a thread, which keeps a fast producer from
+    queueing up unbounded work.
+    """
+
+    def __init__(self, maxWorkers=4, queueSize=0):
+
+        """
+        >>> pool = WorkerPool(maxWorkers=8)
+        >>> future = pool.submit(repo.getObject, objectId)
+        """
+
+        self.maxWorkers = maxWorkers
+        self._queue = Queue.Queue(queueSize)
+        self._threads = []
+        self._idle = 0
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, func, *args, **kwargs):
+
+        """
+        Schedules func(*args, **kwargs) to run on one of the pool's threads
+        and returns a :class:`Future` for its result.
+        """
+
+        future = Future()
+        self._lock.acquire()
+        try:
+            if self._shutdown:
+                raise RuntimeError('Cannot submit to a WorkerPool that was shut down')
+            if self._idle == 0 and len(self._threads) < self.maxWorkers:
+                thread = threading.Thread(target=self._work,
+                                          name='cmislib-worker-%d' % len(self._threads))
+                thread.setDaemon(True)
+                self._threads.append(thread)
+                thread.start()
+            else:
+                self._idle -= 1
+        finally:
+            self._lock.release()
+        self._queue.put((future, func, args, kwargs))
+        return future
+
+    def map(self, func, iterable, maxPending=None):
+
+        """
+        Returns a generator over func(item) for each item of iterable, in
+        the order of the items, while the calls run on the pool's threads.
+        At most maxPending calls, twice the number of workers by default,
+        are submitted ahead of the one the caller is waiting for, so results
+        don't pile up when the caller is slower than the workers.
+
+        >>> for doc in pool.map(repo.getObject, objectIds):
+        ...     print doc.name
+        """
+
+        if maxPending is None:
+            maxPending = self.maxWorkers * 2
+        pending = deque()
+        for item in iterable:
+            pending.append(self.submit(func, item))
+            if len(pending) >= maxPending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def shutdown(self, wait=True):
+
+        """
+        Stops the pool's threads once the calls already submitted are done.
+        If wait is True, blocks until they have all exited.
+        """
+
+        self._lock.acquire()
+        try:
+            self._shutdown = True
+            threads = list(self._threads)
+        finally:
+            self._lock.release()
+        for thread in threads:
+            self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, func, args, kwargs = item
+            try:
+                future._setResult(func(*args, **kwargs))
+            except:
+                future._setExcInfo(sys.exc_info())
+            # drop references to the call before waiting for the next one
+            item = future = func = args = kwargs = None
+            self._lock.acquire()
+            try:
+                self._idle += 1
+            finally:
+                self._lock.release()
+
+
+def parallelPages(fetchPage, pageSize, maxWorkers=4):
+
+    """
+    Returns a generator over every result of a query whose pages can be
+    addressed by skipCount. fetchPage(skipCount, maxItems) must return the
+    :class:`cmislib.domain.ResultSet` holding up to maxItems results that
+    start at skipCount. The first page is fetched on its own to learn the
+    total number of results, numItems. The remaining windows of pageSize
+    results are then fetched by up to maxWorkers threads at once, and
+    their results are handed back in order.
+
+    Servers may return fewer results than asked for, for instance because
+    they cap maxItems. The rest of a window that comes back short is then
+    fetched page by page, so no result is skipped.
+
+    Servers don't have to report numItems. When it is missing, the pages
+    are fetched one after the other by following the first result set.
+    """
+
+    first = fetchPage(0, pageSize)
+    total = first.getNumItems()
+    if total is None or total < 0:
+        for result in first.iterAll():
+            yield result
+        return
+    stop = threading.Event()
+    for result in _fetchWindow(fetchPage, 0, min(pageSize, total), stop, first):
+        yield result
+    pool = WorkerPool(maxWorkers)
+    try:
+        for page in pool.map(lambda skipCount: _fetchWindow(fetchPage, skipCount,
+                                                            min(skipCount + pageSize, total), stop),
+                             xrange(pageSize, total, pageSize)):
+            for result in page:
+                yield result
+    finally:
+        # the windows still queued see the stop event and return at once
+        stop.set()
+        pool.shutdown()
+
+
+def _fetchWindow(fetchPage, start, end, stop, first=None):
+
+    """
+    Returns the list of the results from start up to end, fetching the
+    pages that a short first page leaves out.
+    """
+
+    results = []
+    skipCount = start
+    page = first
+    while skipCount < end and not stop.isSet():
+        if page is None:
+            page = fetchPage(skipCount, end - skipCount)
+        pageResults = page.getResults()
+        if not pageResults:
+            # the query has fewer results than it had when numItems was read
+            break
+        if len(pageResults) < end - skipCount:
+            moduleLogger.debug('Got %d of %d results at %d, fetching the rest',
+                               len(pageResults), end - skipCount, skipCount)
+        results.extend(pageResults[:end - skipCount])
+        skipCount += len(pageResults)
+        page = None
+    return results
+
+
+_END = object()
+
+
+def readAhead(iterable, depth=1):
+
+    """
+    Returns a generator over the items of iterable that consumes the
+    iterable in a background thread, keeping up to depth items ready ahead
+    of the caller. The item being produced counts as one of them, so no
+    more than depth items are ever held besides the one the caller has.
+    This overlaps the time it takes to produce the next items
+    (typically fetching the next page from the server) with the time the
+    caller spends on the current one. An exception raised by the iterable
+    is raised by the generator, in the caller's thread, at the point where
+    the caller would have received the item. Closing the generator, or
+    letting it be garbage collected, stops the background thread after at
+    most one more item.
+
+    >>> for page in readAhead(resultSet.iterPages(), depth=2):
+    ...     export(page)
+    """
+
+    queue = Queue.Queue()
+    # the producer takes a slot before each item and the caller gives it
+    # back once it has the item
+    slots = Queue.Queue()
+    for i in range(max(depth, 1)):
+        slots.put(None)
+    stop = threading.Event()
+
+    def waitForSlot():
+        while not stop.isSet():
+            try:
+                slots.get(True, 1)
+                return True
+            except Queue.Empty:
+                pass
+        return False
+
+    def produce():
+        try:
+            iterator = iter(iterable)
+            while waitForSlot():
+                try:
+                    item = iterator.next()
+                except StopIteration:
+                    queue.put((_END, None))
+                    return
+                queue.put((item, None))
+        except:
+            queue.put((None, sys.exc_info()))
+
+    thread = threading.Thread(target=produce, name='cmislib-read-ahead')
+    thread.setDaemon(True)
+    thread.start()
+    try:
+        while True:
+            # Queue.get() without a timeout can't be interrupted on Python 2
+            try:
+                item, excInfo = queue.get(True, 1)
+            except Queue.Empty:
+                continue
+            slots.put(None)
+            if excInfo is not None:
+                raise excInfo[0], excInfo[1], excInfo[2]
+            if item is _END:
+                return
+            yield item
+    finally:
+        stop.set()
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+#
+#      Licensed to the Apache Software Foundation (ASF) under one
+#      or more contributor license agreements.  See the NOTICE file
+#      distributed with this work for additional information
+#      regarding copyright ownership.  The ASF licenses this file
+#      to you under the Apache License, Version 2.0 (the
+#      "License"); you may not use this file except in compliance
+#      with the License.  You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#      Unless required by applicable law or agreed to in writing,
+#      software distributed under the License is distributed on an
+#      "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#      KIND, either express or implied.  See the License for the
+#      specific language governing permissions and limitations
+#      under the License.
+#
+
+
+"""
+Offline micro-benchmarks for turning server responses into cmislib objects
+and for sending content. They need no CMIS server and are not run with the
+unit tests:
+
+    python benchmark.py [entries] [megabytes]
+
+Each result set benchmark prints the time it takes per entry to build the
+objects of a result set and read their properties, and how many bytes the
+objects of a listing held in memory take per entry. The ingest benchmark
+prints the rate at which a document of the given size is created against a
+local stub server, with the content embedded in the Atom entry and sent on
+its own.
+"""
+
+import gc
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import types
+from xml.dom import minidom
+from cmislib import CmisClient
+from cmislib.atompub.binding import AtomPubResultSet, FeedReader, \
+    getSpecializedObjectFromEntry
+from cmislib.browser.binding import BrowserResultSet, ResultsSerializer
+from stubserver import StubServer, atomEntry, atomFeed, atomServiceDocument, \
+    browserObject, ATOM_HEADERS, SERVICE_HEADERS
+
+BASE_URL = 'http://localhost/cmis'
+
+
+def makeProperties(i):
+
+    """ Returns the extra properties of the i-th benchmark object. """
+
+    return {'cmis:contentStreamLength': ('Integer', i * 10),
+            'cmis:creationDate': ('DateTime', '2010-01-01T10:00:00.000Z'),
+            'cmis:isLatestVersion': ('Boolean', 'true'),
+            'cmis:createdBy': ('String', 'admin')}
+
+
+def timePerEntry(label, count, func):
+
+    """ Runs func() once and prints how long it took per entry. """
+
+    start = time.time()
+    func()
+    elapsed = time.time() - start
+    print '%-36s %8.1f us/entry' % (label, elapsed / count * 1000000)
+
+
+def retainedSize(root):
+
+    """
+    Returns the number of bytes taken by root and everything it references,
+    counting shared objects once. Classes, modules, functions and loggers
+    are not counted.
+    """
+
+    skip = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+            logging.Logger)
+    seen = set()
+    stack = [root]
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, skip):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return size
+
+
+def bytesPerEntry(label, count, build):
+
+    """ Prints the retained size per entry of the list build() returns. """
+
+    print '%-36s %8.0f bytes/entry' % (label, float(retainedSize(build())) / count)
+
+
+def benchAtomPubResultSet(count):
+    feed = atomFeed([atomEntry(BASE_URL, 'doc-%d' % i, 'doc %d' % i, root=False,
+                               properties=makeProperties(i),
+                               allowableActions={'canGetProperties': True})
+                     for i in range(count)])
+
+    def run():
+        resultSet = AtomPubResultSet(None, None, minidom.parseString(feed))
+        for obj in resultSet.getResults():
+            obj.getProperties()['cmis:contentStreamLength']
+
+    timePerEntry('AtomPub DOM result set', count, run)
+
+    def runFeedReader():
+        for entry in FeedReader(feed):
+            obj = getSpecializedObjectFromEntry(None, None, entry)
+            obj.getProperties()['cmis:contentStreamLength']
+
+    timePerEntry('AtomPub FeedReader', count, runFeedReader)
+
+    def buildObjects():
+        objects = [getSpecializedObjectFromEntry(None, None, entry) for entry in FeedReader(feed)]
+        for obj in objects:
+            obj.getProperties()
+        return objects
+
+    bytesPerEntry('AtomPub FeedReader objects', count, buildObjects)
+    bytesPerEntry('AtomPub FeedReader dict rows', count,
+                  lambda: [entry['properties'] for entry in FeedReader(feed)])
+
+
+def benchBrowserResultSet(count):
+    results = json.dumps({'results': [browserObject('doc-%d' % i, 'doc %d' % i,
+                                                    properties=dict([(k, (t.lower(), v))
+                                                                     for k, (t, v) in makeProperties(i).items()]))
+                                      for i in range(count)],
+                          'numItems': count, 'hasMoreItems': False})
+
+    def run():
+        resultSet = BrowserResultSet(None, None, json.loads(results), serializer=ResultsSerializer())
+        for obj in resultSet.getResults():
+            obj.getProperties()['cmis:contentStreamLength']
+
+    timePerEntry('Browser result set', count, run)
+
+    def buildObjects():
+        objects = BrowserResultSet(None, None, json.loads(results), serializer=ResultsSerializer()).getResults()
+        for obj in objects:
+            obj.getProperties()
+        return objects
+
+    bytesPerEntry('Browser objects', count, buildObjects)
+
+
+def benchAtomPubIngest(megabytes):
+    server = StubServer().start()
+    baseUrl = server.getUrl()
+    server.routes['/service'] = (200, SERVICE_HEADERS, atomServiceDocument(baseUrl))
+    server.routes['/id'] = (200, ATOM_HEADERS, atomEntry(baseUrl, 'root', 'root', 'cmis:folder'))
+    server.routes['/children'] = (201, ATOM_HEADERS, atomEntry(baseUrl, 'new', 'new'))
+    server.routes['/content'] = (201, ATOM_HEADERS, atomEntry(baseUrl, 'new', 'new'))
+    fd, path = tempfile.mkstemp()
+    try:
+        chunk = os.urandom(1024 * 1024)
+        for i in range(megabytes):
+            os.write(fd, chunk)
+        os.close(fd)
+        for label, threshold in (('AtomPub ingest, base64 entry', None),
+                                 ('AtomPub ingest, edit-media PUT', 0)):
+            client = CmisClient(server.getUrl('/service'), 'admin', 'admin',
+                                mediaUploadThreshold=threshold)
+            folder = client.getDefaultRepository().getRootFolder()
+            contentFile = open(path, 'rb')
+            start = time.time()
+            folder.createDocument('new', contentFile=contentFile)
+            elapsed = time.time() - start
+            contentFile.close()
+            client.connectionPool.clear()
+            print '%-36s %8.1f MB/s' % (label, megabytes / elapsed)
+    finally:
+        os.remove(path)
+        server.stop()
+
+
+if __name__ == "__main__":
+    entries = 10000
+    if len(sys.argv) > 1:
+        entries = int(sys.argv[1])
+    megabytes = 64
+    if len(sys.argv) > 2:
+        megabytes = int(sys.argv[2])
+    print 'Building %d objects per benchmark' % entries
+    benchAtomPubResultSet(entries)
+    benchBrowserResultSet(entries)
+    print 'Creating a document of %d MB' % megabytes
+    benchAtomPubIngest(megabytes)
@@ -0,0 +1,416 @@
+# -*- coding: utf-8 -*-
+#
+#      Licensed to the Apache Software Foundation (ASF) under one
+#      or more contributor license agreements.  See the NOTICE file
+#      distributed with this work for additional information
+#      regarding copyright ownership.  The ASF licenses this file
+#      to you under the Apache License, Version 2.0 (the
+#      "License"); you may not use this file except in compliance
+#      with the License.  You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#      Unless required by applicable law or agreed to in writing,
+#      software distributed under the License is distributed on an
+#      "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#      KIND, either express or implied.  See the License for the
+#      specific language governing permissions and limitations
+#      under the License.
+#
+
+
+"""
+A tiny HTTP/1.1 server used by the offline unit tests. It serves canned
+responses from memory, keeps connections alive and counts the connections
+and requests it sees.
+"""
+
+import BaseHTTPServer
+import socket
+import SocketServer
+import sys
+import json
+import re
+import threading
+from urlparse import urlparse, parse_qs
+from xml.sax.saxutils import escape, quoteattr
+
+ATOM_HEADERS = {'Content-Type': 'application/atom+xml;type=entry'}
+ATOM_FEED_HEADERS = {'Content-Type': 'application/atom+xml;type=feed'}
+SERVICE_HEADERS = {'Content-Type': 'application/atomsvc+xml'}
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+TYPE_DESCENDANTS_REL = 'http://docs.oasis-open.org/ns/cmis/link/200908/typedescendants'
+
+NAMESPACES = ('xmlns:atom="http://www.w3.org/2005/Atom" '
+              'xmlns:app="http://www.w3.org/2007/app" '
+              'xmlns:cmis="http://docs.oasis-open.org/ns/cmis/core/200908/" '
+              'xmlns:cmisra="http://docs.oasis-open.org/ns/cmis/restatom/200908/"')
+
+
+class StubRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    """ Answers every request from the routes of the owning server. """
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        self.server.countConnection(self.connection)
+
+    def finish(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.finish(self)
+        self.server.forgetConnection(self.connection)
+
+    def do_GET(self):
+        self._respond()
+
+    def do_POST(self):
+        self._respond()
+
+    def do_PUT(self):
+        self._respond()
+
+    def do_DELETE(self):
+        self._respond()
+
+    def do_CONNECT(self):
+        # act as a proxy whose tunnels lead back to this server; the
+        # request is counted with its Proxy-Authorization as the body
+        self.server.countRequest(self.command, self.path, self.headers.get('Proxy-Authorization'))
+        self.send_response(200)
+        self.end_headers()
+        self.close_connection = 0
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = length and self.rfile.read(length) or ''
+        self.server.countRequest(self.command, self.path, body)
+        route = self.server.routes.get(self.path.split('?')[0])
+        if route is None:
+            status, headers, content = 404, {}, ''
+        elif callable(route):
+            status, headers, content = route(self, body)
+        else:
+            status, headers, content = route
+        if status is None:
+            # the route acts as a connection dropped before the response
+            self.close_connection = 1
+            return
+        # a route can claim a longer body to act as a dropped connection
+        headers = dict(headers)
+        contentLength = headers.pop('Content-Length', str(len(content)))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', contentLength)
+        self.end_headers()
+        self.wfile.write(content)
+        if int(contentLength) != len(content):
+            self.close_connection = 1
+
+    def getQuery(self):
+
+        """ Returns the query string parameters as a dict of single values. """
+
+        query = parse_qs(urlparse(self.path).query, keep_blank_values=True)
+        return dict([(k, v[0]) for k, v in query.items()])
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serveContent(handler, content, contentType='application/octet-stream'):
+
+    """
+    Returns the response to a GET of content, honouring a Range header
+    asking for a single range of bytes.
+    """
+
+    match = re.match(r'bytes=(\d+)-(\d*)$', handler.headers.get('Range') or '')
+    if not match:
+        return 200, {'Content-Type': contentType}, content
+    first = int(match.group(1))
+    last = len(content) - 1
+    if match.group(2):
+        last = min(int(match.group(2)), last)
+    if first > last:
+        return 416, {'Content-Range': 'bytes */%d' % len(content)}, ''
+    return 206, {'Content-Type': contentType,
+                 'Content-Range': 'bytes %d-%d/%d' % (first, last, len(content))}, \
+        content[first:last + 1]
+
+
+class StubServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    """
+    Threaded stub server listening on an ephemeral localhost port. Routes
+    map a path, without its query string, to a (status, headers, body)
+    tuple or to a callable taking the handler and the request body and
+    returning one.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, routes=None):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0),
+                                           StubRequestHandler)
+        self.routes = routes or {}
+        self.connections = 0
+        self.requests = []
+        self._sockets = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def getUrl(self, path=''):
+        return 'http://127.0.0.1:%d%s' % (self.server_address[1], path)
+
+    def countConnection(self, sock):
+        self._lock.acquire()
+        try:
+            self.connections += 1
+            self._sockets.add(sock)
+        finally:
+            self._lock.release()
+
+    def forgetConnection(self, sock):
+        self._lock.acquire()
+        try:
+            self._sockets.discard(sock)
+        finally:
+            self._lock.release()
+
+    def countRequest(self, method, path, body):
+        self._lock.acquire()
+        try:
+            self.requests.append((method, path, body))
+        finally:
+            self._lock.release()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.setDaemon(True)
+        self._thread.start()
+        return self
+
+    def handle_error(self, request, clientAddress):
+        # clients that close a stream before its end hang up on purpose
+        if isinstance(sys.exc_info()[1], socket.error):
+            return
+        BaseHTTPServer.HTTPServer.handle_error(self, request, clientAddress)
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        # wake up the handler threads waiting on keep-alive connections
+        self._lock.acquire()
+        try:
+            sockets = list(self._sockets)
+        finally:
+            self._lock.release()
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+
+def atomServiceDocument(baseUrl, repositoryId='repo1'):
+
+    """
+    Returns an AtomPub service document describing a single repository
+    whose URLs all point below baseUrl.
+    """
+
+    capabilities = {'ACL': 'none', 'AllVersionsSearchable': 'false',
+                    'Changes': 'objectidsonly', 'ContentStreamUpdatability': 'anytime',
+                    'GetDescendants': 'true', 'GetFolderTree': 'true',
+                    'Multifiling': 'true', 'PWCSearchable': 'false',
+                    'PWCUpdatable': 'true', 'Query': 'bothcombined',
+                    'Renditions': 'none', 'Unfiling': 'false',
+                    'VersionSpecificFiling': 'false', 'Join': 'none'}
+    capabilityXml = ''.join(['<cmis:capability%s>%s</cmis:capability%s>' % (k, v, k)
+                             for k, v in sorted(capabilities.items())])
+    collections = [('root', '/children?id=root'), ('query', '/query'),
+                   ('types', '/types'), ('checkedout', '/checkedout'),
+                   ('unfiled', '/unfiled')]
+    collectionXml = ''.join(['<app:collection href=%s><cmisra:collectionType>%s</cmisra:collectionType></app:collection>'
+                             % (quoteattr(baseUrl + href), collType)
+                             for collType, href in collections])
+    templates = [('objectbyid', '/id?id={id}&filter={filter}&includeAllowableActions={includeAllowableActions}'
+                                '&includePolicyIds={includePolicyIds}&includeRelationships={includeRelationships}'
+                                '&includeACL={includeACL}&renditionFilter={renditionFilter}'),
+                 ('objectbypath', '/path?path={path}&filter={filter}&includeAllowableActions={includeAllowableActions}'
+                                  '&includePolicyIds={includePolicyIds}&includeRelationships={includeRelationships}'
+                                  '&includeACL={includeACL}&renditionFilter={renditionFilter}'),
+                 ('typebyid', '/type?id={id}'),
+                 ('query', '/query?q={q}&searchAllVersions={searchAllVersions}&maxItems={maxItems}'
+                           '&skipCount={skipCount}&includeAllowableActions={includeAllowableActions}'
+                           '&includeRelationships={includeRelationships}')]
+    templateXml = ''.join(['<cmisra:uritemplate><cmisra:template>%s</cmisra:template>'
+                           '<cmisra:type>%s</cmisra:type>'
+                           '<cmisra:mediatype>application/atom+xml;type=entry</cmisra:mediatype>'
+                           '</cmisra:uritemplate>' % (escape(baseUrl + template), templType)
+                           for templType, template in templates])
+    return ('<?xml version="1.0" encoding="utf-8"?>'
+            '<app:service %s><app:workspace><atom:title>Stub</atom:title>'
+            '<cmisra:repositoryInfo><cmis:repositoryId>%s</cmis:repositoryId>'
+            '<cmis:repositoryName>Stub Repository</cmis:repositoryName>'
+            '<cmis:repositoryDescription>Stub</cmis:repositoryDescription>'
+            '<cmis:vendorName>Apache</cmis:vendorName><cmis:productName>stub</cmis:productName>'
+            '<cmis:productVersion>1.0</cmis:productVersion><cmis:rootFolderId>root</cmis:rootFolderId>'
+            '<cmis:latestChangeLogToken>0</cmis:latestChangeLogToken>'
+            '<cmis:capabilities>%s</cmis:capabilities>'
+            '<cmis:cmisVersionSupported>1.0</cmis:cmisVersionSupported>'
+            '</cmisra:repositoryInfo>%s%s<atom:link rel=%s href=%s/></app:workspace></app:service>'
+            % (NAMESPACES, repositoryId, capabilityXml, collectionXml, templateXml,
+               quoteattr(TYPE_DESCENDANTS_REL), quoteattr(baseUrl + '/typedescendants')))
+
+
+def atomEntry(baseUrl, objectId, name, baseTypeId='cmis:document',
+              properties=None, allowableActions=None, root=True):
+
+    """
+    Returns an Atom entry for a CMIS object. Extra properties are given as a
+    dict of property id to (CMIS property type, value).
+    """
+
+    props = {'cmis:objectId': ('Id', objectId),
+             'cmis:name': ('String', name),
+             'cmis:baseTypeId': ('Id', baseTypeId),
+             'cmis:objectTypeId': ('Id', baseTypeId),
+             'cmis:changeToken': ('String', '1')}
+    props.update(properties or {})
+    propXml = ''.join(['<cmis:property%s propertyDefinitionId=%s><cmis:value>%s</cmis:value></cmis:property%s>'
+                       % (propType, quoteattr(propId), escape(unicode(value)), propType)
+                       for propId, (propType, value) in sorted(props.items())])
+    actionsXml = ''
+    if allowableActions is not None:
+        actionsXml = '<cmis:allowableActions>%s</cmis:allowableActions>' % \
+            ''.join(['<cmis:%s>%s</cmis:%s>' % (k, str(v).lower(), k)
+                     for k, v in sorted(allowableActions.items())])
+    links = '<atom:link rel="self" href=%s/>' % quoteattr('%s/id?id=%s' % (baseUrl, objectId))
+    if baseTypeId == 'cmis:folder':
+        links += '<atom:link rel="down" type="application/atom+xml;type=feed" href=%s/>' % \
+            quoteattr('%s/children?id=%s' % (baseUrl, objectId))
+        content = ''
+    else:
+        links += '<atom:link rel="edit-media" href=%s/>' % quoteattr('%s/content?id=%s' % (baseUrl, objectId))
+        content = '<atom:content src=%s/>' % quoteattr('%s/content?id=%s' % (baseUrl, objectId))
+    entry = ('<atom:entry%s><atom:id>urn:%s</atom:id><atom:title>%s</atom:title>%s%s'
+             '<cmisra:object><cmis:properties>%s</cmis:properties>%s</cmisra:object></atom:entry>'
+             % (root and ' ' + NAMESPACES or '', escape(objectId), escape(name), links, content,
+                propXml, actionsXml))
+    if root:
+        entry = '<?xml version="1.0" encoding="utf-8"?>' + entry
+    return entry
+
+
+def atomFeed(entries, links=None, numItems=None):
+
+    """
+    Returns an Atom feed wrapping entries created with atomEntry(...,
+    root=False). Links is a dict of rel to href.
+    """
+
+    linkXml = ''.join(['<atom:link rel=%s href=%s/>' % (quoteattr(rel), quoteattr(href))
+                       for rel, href in sorted((links or {}).items())])
+    numItemsXml = ''
+    if numItems is not None:
+        numItemsXml = '<cmisra:numItems>%d</cmisra:numItems>' % numItems
+    return ('<?xml version="1.0" encoding="utf-8"?><atom:feed %s><atom:title>Feed</atom:title>%s%s%s</atom:feed>'
+            % (NAMESPACES, linkXml, numItemsXml, ''.join(entries)))
+
+
+def atomTypeEntry(typeId, baseId='cmis:document', propertyTypes=None, root=True):
+
+    """
+    Returns an Atom entry for a type definition. Property definitions are
+    given as a dict of property id to CMIS property type, such as
+    'integer'.
+    """
+
+    propXml = ''.join(['<cmis:property%sDefinition><cmis:id>%s</cmis:id>'
+                       '<cmis:propertyType>%s</cmis:propertyType>'
+                       '<cmis:cardinality>single</cmis:cardinality></cmis:property%sDefinition>'
+                       % (propType.capitalize(), escape(propId), propType, propType.capitalize())
+                       for propId, propType in sorted((propertyTypes or {}).items())])
+    entry = ('<atom:entry%s><atom:id>urn:type:%s</atom:id><atom:title>%s</atom:title>'
+             '<cmisra:type><cmis:id>%s</cmis:id><cmis:localName>%s</cmis:localName>'
+             '<cmis:baseId>%s</cmis:baseId>%s</cmisra:type></atom:entry>'
+             % (root and ' ' + NAMESPACES or '', escape(typeId), escape(typeId),
+                escape(typeId), escape(typeId), baseId, propXml))
+    if root:
+        entry = '<?xml version="1.0" encoding="utf-8"?>' + entry
+    return entry
+
+
+def browserServiceDocument(baseUrl, repositoryId='repo1'):
+
+    """
+    Returns the Browser binding repository info JSON for a single
+    repository whose URLs all point below baseUrl.
+    """
+
+    return json.dumps({repositoryId: {
+        'repositoryId': repositoryId,
+        'repositoryName': 'Stub Repository',
+        'repositoryDescription': 'Stub',
+        'vendorName': 'Apache',
+        'productName': 'stub',
+        'productVersion': '1.0',
+        'rootFolderId': 'root',
+        'repositoryUrl': baseUrl + '/browser/repo',
+        'rootFolderUrl': baseUrl + '/browser/root',
+        'latestChangeLogToken': '0',
+        'cmisVersionSupported': '1.1',
+        'changesIncomplete': False,
+        'changesOnType': [],
+        'principalIdAnonymous': 'anonymous',
+        'principalIdAnyone': 'anyone',
+        'capabilities': {'capabilityQuery': 'bothcombined',
+                         'capabilityChanges': 'objectidsonly',
+                         'capabilityGetDescendants': True,
+                         'capabilityContentStreamUpdatability': 'anytime',
+                         'capabilityRenditions': 'none',
+                         'capabilityACL': 'none'}}})
+
+
+def browserObject(objectId, name, baseTypeId='cmis:document', properties=None,
+                  allowableActions=None):
+
+    """
+    Returns the Browser binding JSON for a CMIS object as a dict. Extra
+    properties are given as a dict of property id to (CMIS property type,
+    value).
+    """
+
+    props = {'cmis:objectId': ('id', objectId),
+             'cmis:name': ('string', name),
+             'cmis:baseTypeId': ('id', baseTypeId),
+             'cmis:objectTypeId': ('id', baseTypeId),
+             'cmis:changeToken': ('string', '1')}
+    props.update(properties or {})
+    data = {'properties': dict([(propId, {'id': propId, 'type': propType, 'value': value})
+                                for propId, (propType, value) in props.items()])}
+    if allowableActions is not None:
+        data['allowableActions'] = allowableActions
+    return data
+
+
+def browserType(typeId, baseId='cmis:document', propertyTypes=None):
+
+    """
+    Returns the Browser binding JSON for a type definition as a dict.
+    Property definitions are given as a dict of property id to CMIS
+    property type, such as 'integer'.
+    """
+
+    return {'id': typeId,
+            'localName': typeId,
+            'baseId': baseId,
+            'propertyDefinitions': dict([(propId, {'id': propId, 'propertyType': propType,
+                                                   'cardinality': 'single'})
+                                         for propId, propType in (propertyTypes or {}).items()])}
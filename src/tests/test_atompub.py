@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+#
+#      Licensed to the Apache Software Foundation (ASF) under one
+#      or more contributor license agreements.  See the NOTICE file
+#      distributed with this work for additional information
+#      regarding copyright ownership.  The ASF licenses this file
+#      to you under the Apache License, Version 2.0 (the
+#      "License"); you may not use this file except in compliance
+#      with the License.  You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#      Unless required by applicable law or agreed to in writing,
+#      software distributed under the License is distributed on an
+#      "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#      KIND, either express or implied.  See the License for the
+#      specific language governing permissions and limitations
+#      under the License.
+#
+
+
+"""
+Unit tests for logic unique to the AtomPub binding
+"""
+
+import datetime
+import StringIO
+import unittest
+from unittest import TestSuite, TestLoader
+from xml.dom import minidom
+from cmislib import CmisClient
+from cmislib.atompub import binding as atompubBinding
+from cmislib.atompub.binding import AtomPubBinding, AtomPubCmisObject, \
+    AtomPubResultSet, AtomPubDocument, AtomPubFolder, AtomEntryBody, FeedReader, UriTemplate, \
+    getEntryXmlDoc, getSpecializedObjectFromEntry, ATOM_NS
+from cmislib.domain import CmisId
+from cmislib.exceptions import CmisException
+from stubserver import StubServer, atomEntry, atomFeed, atomServiceDocument, \
+    ATOM_FEED_HEADERS, ATOM_HEADERS, SERVICE_HEADERS, NAMESPACES
+
+BASE_URL = 'http://localhost/cmis'
+
+MULTI_VALUED_ENTRY = (
+    '<atom:entry %s><atom:id>urn:multi</atom:id><atom:title>multi</atom:title>'
+    '<cmisra:pathSegment>multi.txt</cmisra:pathSegment>'
+    '<cmisra:object><cmis:properties>'
+    '<cmis:propertyId propertyDefinitionId="cmis:objectId"><cmis:value>multi</cmis:value></cmis:propertyId>'
+    '<cmis:propertyString propertyDefinitionId="tags"><cmis:value>a</cmis:value><cmis:value>b</cmis:value></cmis:propertyString>'
+    '<cmis:propertyString propertyDefinitionId="empty"/>'
+    '</cmis:properties></cmisra:object></atom:entry>' % NAMESPACES)
+
+
+class FeedReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.entries = [
+            atomEntry(BASE_URL, 'doc-%d' % i, u'caf\xe9 %d' % i, root=False,
+                      properties={'size': ('Integer', i),
+                                  'done': ('Boolean', 'true'),
+                                  'when': ('DateTime', '2010-01-01T10:00:00.000Z')},
+                      allowableActions={'canDeleteObject': True, 'canCheckIn': False})
+            for i in range(3)]
+        self.entries.append(atomEntry(BASE_URL, 'folder', 'folder', 'cmis:folder', root=False))
+        self.entries.append(MULTI_VALUED_ENTRY)
+        self.feed = atomFeed(self.entries, links={'next': BASE_URL + '/next'},
+                             numItems=10).encode('utf-8')
+
+    def test_entries(self):
+        reader = FeedReader(self.feed)
+        entries = list(reader)
+        self.assertEqual(len(entries), 5)
+        self.assertEqual(reader.links['next'], BASE_URL + '/next')
+        self.assertEqual(reader.numItems, 10)
+        first = entries[0]
+        self.assertEqual(first['title'], u'caf\xe9 0')
+        props = first['properties']
+        self.assertEqual(props['cmis:objectId'], 'doc-0')
+        self.assertTrue(isinstance(props['cmis:objectId'], CmisId))
+        self.assertEqual(props['cmis:name'], u'caf\xe9 0')
+        self.assertEqual(props['size'], 0)
+        self.assertEqual(props['done'], True)
+        self.assertTrue(isinstance(props['when'], datetime.datetime))
+        self.assertEqual(first['allowableActions'],
+                         {'canDeleteObject': True, 'canCheckIn': False})
+        self.assertEqual(first['content'], BASE_URL + '/content?id=doc-0')
+        self.assertEqual([l['rel'] for l in first['links']], ['self', 'edit-media'])
+        self.assertEqual(entries[3]['allowableActions'], None)
+        multi = entries[4]['properties']
+        self.assertEqual(multi['tags'], ['a', 'b'])
+        self.assertEqual(multi['empty'], None)
+        self.assertEqual(multi['cmisra:pathSegment'], 'multi.txt')
+
+    def test_same_properties_as_minidom(self):
+        doc = minidom.parseString(self.feed)
+        entryElements = doc.getElementsByTagNameNS(ATOM_NS, 'entry')
+        for entry, entryElement in zip(FeedReader(self.feed), entryElements):
+            properties = AtomPubCmisObject(None, None, xmlDoc=entryElement).getProperties()
+            # the DOM path also picks up the cmisra:object element itself
+            del properties['cmisra:object']
+            self.assertEqual(entry['properties'], properties)
+
+    def test_single_entry(self):
+        entries = list(FeedReader(atomEntry(BASE_URL, 'one', 'one')))
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]['properties']['cmis:name'], 'one')
+
+    def test_parse_error(self):
+        self.assertRaises(CmisException, list, FeedReader('<atom:feed'))
+
+    def test_specialized_object(self):
+        entries = list(FeedReader(self.feed))
+        doc = getSpecializedObjectFromEntry(None, None, entries[0])
+        self.assertTrue(isinstance(doc, AtomPubDocument))
+        self.assertEqual(doc.getObjectId(), 'doc-0')
+        self.assertEqual(doc.getName(), u'caf\xe9 0')
+        self.assertTrue(doc.getAllowableActions()['canDeleteObject'])
+        self.assertEqual(doc.xmlDoc, None)
+        folder = getSpecializedObjectFromEntry(None, None, entries[3])
+        self.assertTrue(isinstance(folder, AtomPubFolder))
+
+
+class AtomPubBindingFeedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        feed = atomFeed([atomEntry(BASE_URL, 'doc', 'doc', root=False)])
+        self.server.routes['/feed'] = (200, ATOM_FEED_HEADERS, feed)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_get_feed(self):
+        binding = AtomPubBinding()
+        reader = binding.getFeed(self.server.getUrl('/feed'), 'admin', 'admin', maxItems=10)
+        self.assertEqual([e['id'] for e in reader], ['urn:doc'])
+        self.assertEqual(self.server.requests[0][1], '/feed?maxItems=10')
+        reader = binding.postFeed(self.server.getUrl('/feed'), 'admin', 'admin', '<query/>', 'text/xml')
+        self.assertEqual(len(list(reader)), 1)
+
+    def test_change_log_token(self):
+        feed = atomFeed([], links={'next': BASE_URL + '/changes?changeLogToken=42&maxItems=10'})
+        resultSet = AtomPubResultSet(None, None, minidom.parseString(feed))
+        self.assertEqual(resultSet.getChangeLogToken(), '42')
+        resultSet = AtomPubResultSet(None, None, minidom.parseString(atomFeed([])))
+        self.assertEqual(resultSet.getChangeLogToken(), None)
+
+
+class FeedResultSetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        baseUrl = self.server.getUrl()
+        pages = {'1': atomFeed([atomEntry(baseUrl, 'sub', 'sub', 'cmis:folder', root=False),
+                                atomEntry(baseUrl, 'doc', 'doc', root=False)],
+                               links={'next': baseUrl + '/children?id=root&page=2'}, numItems=3),
+                 '2': atomFeed([atomEntry(baseUrl, 'last', 'last', root=False)], numItems=3)}
+        self.server.routes['/service'] = (200, SERVICE_HEADERS, atomServiceDocument(baseUrl))
+        self.server.routes['/id'] = (200, ATOM_HEADERS, atomEntry(baseUrl, 'root', 'root', 'cmis:folder'))
+        self.server.routes['/children'] = lambda handler, body: \
+            (200, ATOM_FEED_HEADERS, pages[handler.getQuery().get('page', '1')])
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_children_without_dom(self):
+        client = CmisClient(self.server.getUrl('/service'), 'admin', 'admin')
+        folder = client.getDefaultRepository().getRootFolder()
+        folder.reload()
+        parseString = atompubBinding.minidom.parseString
+
+        def noDom(content):
+            raise AssertionError('a DOM was built')
+
+        atompubBinding.minidom.parseString = noDom
+        try:
+            resultSet = folder.getChildren()
+            self.assertEqual([r.name for r in resultSet.getResults()], ['sub', 'doc'])
+            self.assertEqual(resultSet.getNumItems(), 3)
+            self.assertTrue(resultSet.hasNext())
+            # the entry's links are used rather than reloading the object
+            requests = len(self.server.requests)
+            self.assertTrue(resultSet[0].getChildrenLink().endswith('/children?id=sub'))
+            self.assertEqual(len(self.server.requests), requests)
+            self.assertEqual([r.name for r in resultSet.getNext()], ['last'])
+            self.assertFalse(resultSet.hasNext())
+        finally:
+            atompubBinding.minidom.parseString = parseString
+        client.connectionPool.clear()
+
+    def test_minidom_feeds(self):
+        client = CmisClient(self.server.getUrl('/service'), 'admin', 'admin', minidomFeeds=True)
+        resultSet = client.getDefaultRepository().getRootFolder().getChildren()
+        self.assertNotEqual(resultSet._xmlDoc, None)
+        self.assertEqual([r.name for r in resultSet.getResults()], ['sub', 'doc'])
+        self.assertEqual([r.name for r in resultSet.getNext()], ['last'])
+        client.connectionPool.clear()
+
+
+class UriTemplateTest(unittest.TestCase):
+
+    def test_expand(self):
+        template = UriTemplate(BASE_URL + '/id?id={id}&filter={filter}&x={unknown}', 'objectbyid', None)
+        self.assertEqual(template.variables, frozenset(['id', 'filter', 'unknown']))
+        self.assertEqual(template.expand({'id': 'doc', 'filter': '*'}),
+                         BASE_URL + '/id?id=doc&filter=*&x=')
+        self.assertEqual(UriTemplate(BASE_URL, 'plain', None).expand({'id': 'doc'}), BASE_URL)
+
+    def test_split_args(self):
+        template = UriTemplate(BASE_URL + '/id?id={id}&includeACL={includeACL}', 'objectbyid', None)
+        self.assertEqual(template.splitArgs({'includeACL': True, 'returnVersion': 'latest'}),
+                         ({'includeACL': 'true'}, {'returnVersion': 'latest'}))
+
+    def test_get_object_url(self):
+        server = StubServer().start()
+        try:
+            baseUrl = server.getUrl()
+            server.routes['/service'] = (200, SERVICE_HEADERS, atomServiceDocument(baseUrl))
+            server.routes['/id'] = (200, ATOM_HEADERS, atomEntry(baseUrl, 'doc', 'doc'))
+            client = CmisClient(server.getUrl('/service'), 'admin', 'admin')
+            repo = client.getDefaultRepository()
+            repo.getObject('doc', filter='cmis:name', includeAllowableActions=True, returnVersion='latest')
+            self.assertEqual(server.requests[-1][1],
+                             '/id?id=doc&filter=cmis:name&includeAllowableActions=true'
+                             '&includePolicyIds=false&includeRelationships=&includeACL=false'
+                             '&renditionFilter=&returnVersion=latest')
+            client.connectionPool.clear()
+        finally:
+            server.stop()
+
+
+class AtomEntryBodyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.properties = {'cmis:name': u'caf\xe9.bin',
+                           'cmis:objectTypeId': CmisId('cmis:document')}
+
+    def test_same_as_entry(self):
+        for size in (0, 1, 56, 57, 58, 57 * 1024, 57 * 1024 + 1, 200000):
+            data = ''.join([chr(i % 251) for i in range(size)])
+            body = AtomEntryBody(None, None, self.properties, StringIO.StringIO(data),
+                                 'application/octet-stream')
+            expected = getEntryXmlDoc(None, None, self.properties, StringIO.StringIO(data),
+                                      'application/octet-stream').toxml(encoding='utf-8')
+            self.assertEqual(''.join(body), expected)
+            self.assertEqual(body.contentLength, len(expected))
+            # the body can be sent again, when a request is retried
+            self.assertEqual(''.join(body), expected)
+
+    def test_short_reads(self):
+
+        class ShortReadFile(StringIO.StringIO):
+            def read(self, size=-1):
+                return StringIO.StringIO.read(self, min(size, 1000))
+
+        data = ''.join([chr(i % 251) for i in range(200000)])
+        body = AtomEntryBody(None, None, self.properties, ShortReadFile(data),
+                             'application/octet-stream')
+        expected = getEntryXmlDoc(None, None, self.properties, StringIO.StringIO(data),
+                                  'application/octet-stream').toxml(encoding='utf-8')
+        self.assertEqual(''.join(body), expected)
+        self.assertEqual(body.contentLength, len(expected))
+
+    def test_post(self):
+        server = StubServer().start()
+        try:
+            baseUrl = server.getUrl()
+            server.routes['/service'] = (200, SERVICE_HEADERS, atomServiceDocument(baseUrl))
+            server.routes['/id'] = (200, ATOM_HEADERS, atomEntry(baseUrl, 'root', 'root', 'cmis:folder'))
+            server.routes['/children'] = (201, ATOM_HEADERS, atomEntry(baseUrl, 'new', 'new'))
+            client = CmisClient(server.getUrl('/service'), 'admin', 'admin')
+            folder = client.getDefaultRepository().getRootFolder()
+            data = 'x' * 100000
+            doc = folder.createDocument('new', contentFile=StringIO.StringIO(data))
+            self.assertEqual(doc.getObjectId(), 'new')
+            body = server.requests[-1][2]
+            self.assertTrue(data.encode('base64') in body)
+            self.assertTrue('<title>new</title>' in body)
+            client.connectionPool.clear()
+        finally:
+            server.stop()
+
+
+class TwoPhaseCreateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        baseUrl = self.server.getUrl()
+        self.contentStatus = 201
+        self.server.routes['/service'] = (200, SERVICE_HEADERS, atomServiceDocument(baseUrl))
+        self.server.routes['/id'] = (200, ATOM_HEADERS, atomEntry(baseUrl, 'root', 'root', 'cmis:folder'))
+        self.server.routes['/children'] = (201, ATOM_HEADERS, atomEntry(baseUrl, 'new', 'new'))
+        self.server.routes['/content'] = lambda handler, body: \
+            (self.contentStatus, ATOM_HEADERS, atomEntry(baseUrl, 'new', 'new'))
+        self.client = CmisClient(self.server.getUrl('/service'), 'admin', 'admin',
+                                 mediaUploadThreshold=1000)
+        self.folder = self.client.getDefaultRepository().getRootFolder()
+        self.data = 'x' * 5000
+
+    def tearDown(self):
+        self.client.connectionPool.clear()
+        self.server.stop()
+
+    def test_large_content(self):
+        doc = self.folder.createDocument('new', contentFile=StringIO.StringIO(self.data),
+                                         contentType='text/plain')
+        self.assertEqual(doc.getObjectId(), 'new')
+        requests = self.server.requests[-2:]
+        self.assertEqual([(r[0], r[1].split('?')[0]) for r in requests],
+                         [('POST', '/children'), ('PUT', '/content')])
+        self.assertFalse('cmisra:base64' in requests[0][2])
+        self.assertEqual(requests[1][2], self.data)
+
+    def test_small_content(self):
+        self.folder.createDocument('new', contentFile=StringIO.StringIO(self.data[:1000]))
+        self.assertEqual(self.server.requests[-1][0], 'POST')
+        self.assertTrue('cmisra:base64' in self.server.requests[-1][2])
+
+    def test_failed_content(self):
+        self.contentStatus = 500
+        self.assertRaises(CmisException, self.folder.createDocument, 'new',
+                          contentFile=StringIO.StringIO(self.data))
+        self.assertEqual([r[0] for r in self.server.requests[-3:]], ['POST', 'PUT', 'DELETE'])
+
+
+if __name__ == "__main__":
+    tts = TestSuite()
+    tts.addTests(TestLoader().loadTestsFromTestCase(FeedReaderTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(AtomPubBindingFeedTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(FeedResultSetTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(UriTemplateTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(AtomEntryBodyTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(TwoPhaseCreateTest))
+    unittest.TextTestRunner().run(tts)
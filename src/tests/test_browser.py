@@ -22,10 +22,12 @@
 Unit tests for logic unique to the Browser binding
 """
 
+import StringIO
 import unittest
 from unittest import TestSuite, TestLoader
 from cmislib.browser.binding import BrowserACE
 from cmislib.browser.binding import BrowserACL
+from cmislib.browser.binding import MultipartFormData
 
 
 class BrowserACLTest(unittest.TestCase):
@@ -96,7 +98,52 @@ class BrowserACLTest(unittest.TestCase):
             toCheck,
             BrowserACE(self.aceUser1.principalId, ['cmis:write'], True))
 
+
+class MultipartFormDataTest(unittest.TestCase):
+
+    class Unseekable(object):
+
+        def __init__(self, data):
+            self.data = data
+
+        def read(self):
+            return self.data
+
+    def setUp(self):
+        self.fields = {'cmisaction': 'createDocument', 'cmis:name': u'r\xe9sum\xe9.txt'}
+        self.content = ''.join([chr(i % 256) for i in range(150000)])
+
+    def test_body(self):
+        contentFile = StringIO.StringIO('skipped' + self.content)
+        contentFile.read(7)
+        body = MultipartFormData(self.fields, contentFile, 'text/plain')
+        boundary = body.contentType.split('boundary=')[1]
+        data = ''.join(body)
+        self.assertEqual(len(data), body.contentLength)
+        self.assertTrue(data.startswith('--' + boundary + '\r\n'))
+        self.assertTrue(data.endswith('\r\n\r\n' + self.content + '\r\n--' + boundary + '--\r\n'))
+        self.assertTrue('filename=r\xc3\xa9sum\xc3\xa9.txt' in data)
+        self.assertTrue('\r\nContent-Type: text/plain\r\n' in data)
+        # the file is read in chunks, and again from the start when resent
+        self.assertTrue(len(list(body)) > 3)
+        self.assertEqual(''.join(body), data)
+
+    def test_unseekable_file(self):
+        body = MultipartFormData(None, self.Unseekable(self.content), 'text/plain')
+        data = ''.join(body)
+        self.assertEqual(len(data), body.contentLength)
+        self.assertTrue(self.content in data)
+
+    def test_without_content(self):
+        body = MultipartFormData(self.fields, None, None)
+        boundary = body.contentType.split('boundary=')[1]
+        data = ''.join(body)
+        self.assertEqual(len(data), body.contentLength)
+        self.assertTrue(data.endswith('\r\nr\xc3\xa9sum\xc3\xa9.txt\r\n--' + boundary + '--\r\n'))
+
+
 if __name__ == "__main__":
     tts = TestSuite()
     tts.addTests(TestLoader().loadTestsFromTestCase(BrowserACLTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(MultipartFormDataTest))
     unittest.TextTestRunner().run(tts)
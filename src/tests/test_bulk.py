@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+#
+#      Licensed to the Apache Software Foundation (ASF) under one
+#      or more contributor license agreements.  See the NOTICE file
+#      distributed with this work for additional information
+#      regarding copyright ownership.  The ASF licenses this file
+#      to you under the Apache License, Version 2.0 (the
+#      "License"); you may not use this file except in compliance
+#      with the License.  You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#      Unless required by applicable law or agreed to in writing,
+#      software distributed under the License is distributed on an
+#      "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#      KIND, either express or implied.  See the License for the
+#      specific language governing permissions and limitations
+#      under the License.
+#
+
+
+
+"""
+Unit tests for the bulk operations of cmislib.bulk, run against a stub
+server on localhost.
+"""
+
+import json
+import os
+import re
+import StringIO
+import tempfile
+import unittest
+from unittest import TestSuite, TestLoader
+from cmislib import CmisClient
+from cmislib.browser.binding import BrowserBinding
+from cmislib.bulk import NOT_FOUND
+from cmislib.exceptions import InvalidArgumentException
+from stubserver import StubServer, atomServiceDocument, atomEntry, atomFeed, \
+    browserServiceDocument, browserObject, ATOM_HEADERS, ATOM_FEED_HEADERS, \
+    SERVICE_HEADERS, JSON_HEADERS
+
+OBJECTS = {'doc-1': 'cmis:document', 'doc-2': 'cmis:document',
+           "doc-'3'": 'cmis:document', 'folder-1': 'cmis:folder',
+           'rel-1': 'cmis:relationship'}
+IDS = ['doc-1', 'folder-1', 'nope', 'rel-1', "doc-'3'", 'doc-2', 'doc-1']
+
+
+def selectObjects(statement):
+
+    """
+    Returns the ids and base types of the objects a getObjects query
+    selects.
+    """
+
+    match = re.search(r'FROM (\S+) WHERE cmis:objectId IN \((.*)\)', statement)
+    baseType = match.group(1)
+    ids = [i.replace("\\'", "'") for i in re.findall(r"'((?:[^'\\]|\\.)*)'", match.group(2))]
+    return [(i, baseType) for i in ids if OBJECTS.get(i) == baseType]
+
+
+class AtomPubGetObjectsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        baseUrl = self.server.getUrl()
+
+        def query(handler, body):
+            statement = re.search(r'statement>(.*?)</', body).group(1)
+            entries = [atomEntry(baseUrl, i, i, baseType, root=False)
+                       for i, baseType in selectObjects(statement)]
+            return 200, ATOM_FEED_HEADERS, atomFeed(entries)
+
+        def getObject(handler, body):
+            objectId = handler.getQuery()['id']
+            if objectId not in OBJECTS:
+                return 404, {}, ''
+            return 200, ATOM_HEADERS, atomEntry(baseUrl, objectId, objectId, OBJECTS[objectId])
+
+        self.server.routes['/service'] = (200, SERVICE_HEADERS, atomServiceDocument(baseUrl))
+        self.server.routes['/query'] = query
+        self.server.routes['/id'] = getObject
+        self.client = CmisClient(self.server.getUrl('/service'), 'admin', 'admin')
+        self.repo = self.client.getDefaultRepository()
+
+    def tearDown(self):
+        self.client.connectionPool.clear()
+        self.server.stop()
+
+    def test_get_objects(self):
+        objects = self.repo.getObjects(IDS, chunkSize=2, maxWorkers=3)
+        self.assertEqual([obj and obj.getObjectId() for obj in objects],
+                         ['doc-1', 'folder-1', NOT_FOUND, 'rel-1', "doc-'3'", 'doc-2', 'doc-1'])
+        self.assertEqual(objects[1].getProperties()['cmis:baseTypeId'], 'cmis:folder')
+        # three chunks of two ids, each queried for documents and folders
+        self.assertEqual(len([r for r in self.server.requests if r[0] == 'POST']), 6)
+        # only what the queries didn't find is fetched one by one
+        self.assertEqual(sorted([r[1].split('&')[0] for r in self.server.requests if r[1].startswith('/id')]),
+                         ['/id?id=nope', '/id?id=rel-1'])
+
+    def test_filter(self):
+        self.repo.getObjects(['doc-1'], filter='cmis:name')
+        self.assertTrue('SELECT cmis:objectId, cmis:baseTypeId, cmis:objectTypeId, cmis:name FROM'
+                        in self.server.requests[-1][2])
+
+    def test_other_args(self):
+        objects = self.repo.getObjects(IDS[:3], filter='cmis:name', includeACL=True)
+        self.assertEqual([obj and obj.getObjectId() for obj in objects],
+                         ['doc-1', 'folder-1', NOT_FOUND])
+        # the queries can't include the ACLs, so none are run
+        self.assertEqual(len([r for r in self.server.requests if r[0] == 'POST']), 0)
+        self.assertEqual(len([r for r in self.server.requests
+                              if r[1].startswith('/id') and 'includeACL=true' in r[1]]), 3)
+
+
+class AtomPubCreateDocumentsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        baseUrl = self.server.getUrl()
+        self.attempts = {}
+        self.created = set()
+
+        def children(handler, body):
+            name = re.search(r'<title>(.*?)</title>', body).group(1)
+            self.attempts[name] = self.attempts.get(name, 0) + 1
+            if name == 'flaky' and self.attempts[name] < 3:
+                return 503, {}, ''
+            if name == 'bad':
+                return 400, {}, ''
+            if name == 'failed' and self.attempts[name] < 2:
+                return 500, {}, ''
+            self.created.add(name)
+            if name == 'lost':
+                return 500, {}, ''
+            return 201, ATOM_HEADERS, atomEntry(baseUrl, 'new-' + name, name)
+
+        def path(handler, body):
+            name = handler.getQuery()['path'].lstrip('/')
+            if name not in self.created:
+                return 404, {}, ''
+            return 200, ATOM_HEADERS, atomEntry(baseUrl, 'new-' + name, name)
+
+        self.server.routes['/service'] = (200, SERVICE_HEADERS, atomServiceDocument(baseUrl))
+        self.server.routes['/id'] = (200, ATOM_HEADERS, atomEntry(baseUrl, 'root', 'root', 'cmis:folder',
+                                                                  {'cmis:path': ('String', '/')}))
+        self.server.routes['/children'] = children
+        self.server.routes['/path'] = path
+        self.client = CmisClient(self.server.getUrl('/service'), 'admin', 'admin')
+        self.folder = self.client.getDefaultRepository().getRootFolder()
+        fd, self.path = tempfile.mkstemp()
+        os.write(fd, 'from a file')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+        self.client.connectionPool.clear()
+        self.server.stop()
+
+    def getItems(self):
+        return iter([('a', {}, self.path), ('flaky', {}, StringIO.StringIO('data')),
+                     ('bad', {}, None), ('b', {'cmis:description': 'b'}, None, 'text/plain')])
+
+    def test_create_documents(self):
+        results = list(self.folder.createDocuments(self.getItems(), maxWorkers=2, retryDelay=0))
+        self.assertEqual([r.name for r in results], ['a', 'flaky', 'bad', 'b'])
+        self.assertEqual([r.index for r in results], [0, 1, 2, 3])
+        self.assertEqual(results[0].document.getObjectId(), 'new-a')
+        self.assertEqual(results[1].document.getObjectId(), 'new-flaky')
+        self.assertEqual(results[1].attempts, 3)
+        self.assertTrue(isinstance(results[2].error, InvalidArgumentException))
+        self.assertEqual(results[2].attempts, 1)
+
+    def test_callback(self):
+        done = []
+        returned = self.folder.createDocuments(self.getItems(), maxWorkers=2, retryDelay=0,
+                                               callback=done.append)
+        # every document is created before createDocuments returns
+        self.assertEqual(returned, None)
+        self.assertEqual(sorted([r.name for r in done]), ['a', 'b', 'bad', 'flaky'])
+        self.assertEqual(self.created, set(['a', 'b', 'flaky']))
+
+    def test_retries_exhausted(self):
+        result = list(self.folder.createDocuments([('flaky', {}, None)], maxRetries=1, retryDelay=0))[0]
+        self.assertEqual(result.document, None)
+        self.assertEqual(result.error.status, '503')
+        self.assertEqual(self.attempts['flaky'], 2)
+
+    def test_no_duplicates(self):
+        results = list(self.folder.createDocuments([('lost', {}, None), ('failed', {}, None)],
+                                                   retryDelay=0))
+        # the server created the document before failing, so it isn't sent again
+        self.assertEqual(results[0].document.getObjectId(), 'new-lost')
+        self.assertEqual(self.attempts['lost'], 1)
+        # the server failed without creating it, so it is
+        self.assertEqual(results[1].document.getObjectId(), 'new-failed')
+        self.assertEqual(self.attempts['failed'], 2)
+
+
+class BrowserGetObjectsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        baseUrl = self.server.getUrl()
+
+        def root(handler, body):
+            objectId = handler.getQuery().get('objectId')
+            if objectId not in OBJECTS:
+                return 404, {}, ''
+            return 200, JSON_HEADERS, json.dumps(browserObject(objectId, objectId, OBJECTS[objectId]))
+
+        self.server.routes['/browser'] = (200, JSON_HEADERS, browserServiceDocument(baseUrl))
+        self.server.routes['/browser/root'] = root
+        self.client = CmisClient(self.server.getUrl('/browser'), 'admin', 'admin',
+                                 binding=BrowserBinding())
+        self.repo = self.client.getDefaultRepository()
+
+    def tearDown(self):
+        self.client.connectionPool.clear()
+        self.server.stop()
+
+    def test_get_objects(self):
+        def query(handler, body):
+            results = [browserObject(i, i, baseType)
+                       for i, baseType in selectObjects(handler.getQuery()['q'])]
+            return 200, JSON_HEADERS, json.dumps({'results': results, 'hasMoreItems': False})
+
+        self.server.routes['/browser/repo'] = query
+        objects = self.repo.getObjects(IDS)
+        self.assertEqual([obj and obj.getObjectId() for obj in objects],
+                         ['doc-1', 'folder-1', NOT_FOUND, 'rel-1', "doc-'3'", 'doc-2', 'doc-1'])
+        self.assertEqual(len([r for r in self.server.requests if r[0] == 'POST']), 2)
+
+    def test_query_refused(self):
+        self.server.routes['/browser/repo'] = (400, JSON_HEADERS, '{}')
+        objects = self.repo.getObjects(IDS[:3])
+        self.assertEqual([obj and obj.getObjectId() for obj in objects],
+                         ['doc-1', 'folder-1', NOT_FOUND])
+        self.assertEqual(len([r for r in self.server.requests if r[1].startswith('/browser/root')]), 3)
+
+
+if __name__ == "__main__":
+    tts = TestSuite()
+    tts.addTests(TestLoader().loadTestsFromTestCase(AtomPubGetObjectsTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(AtomPubCreateDocumentsTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(BrowserGetObjectsTest))
+    unittest.TextTestRunner().run(tts)
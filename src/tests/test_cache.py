@@ -0,0 +1,631 @@
+# -*- coding: utf-8 -*-
+#
+#      Licensed to the Apache Software Foundation (ASF) under one
+#      or more contributor license agreements.  See the NOTICE file
+#      distributed with this work for additional information
+#      regarding copyright ownership.  The ASF licenses this file
+#      to you under the Apache License, Version 2.0 (the
+#      "License"); you may not use this file except in compliance
+#      with the License.  You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#      Unless required by applicable law or agreed to in writing,
+#      software distributed under the License is distributed on an
+#      "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#      KIND, either express or implied.  See the License for the
+#      specific language governing permissions and limitations
+#      under the License.
+#
+
+
+"""
+Unit tests for the caches in cmislib.cache, the service document cache,
+conditional reloads, the repository type cache and the object cache. The client tests run against a stub server on
+localhost.
+"""
+
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import TestSuite, TestLoader
+from cmislib import CmisClient
+from cmislib.atompub.binding import getEntryXmlDoc
+from cmislib.browser.binding import BrowserBinding
+from cmislib.cache import LRUCache, FileCache, ObjectCache
+from cmislib.domain import CmisId
+from stubserver import StubServer, atomServiceDocument, atomTypeEntry, atomFeed, \
+    atomEntry, browserServiceDocument, browserType, browserObject, ATOM_HEADERS, \
+    ATOM_FEED_HEADERS, SERVICE_HEADERS, JSON_HEADERS
+
+PROPERTY_TYPES = {'size': 'integer'}
+
+
+class LRUCacheTest(unittest.TestCase):
+
+    def test_get_put(self):
+        cache = LRUCache(maxSize=10)
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(cache.get('a', 'default'), 'default')
+        cache.put('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertTrue('a' in cache)
+        self.assertEqual(cache.getStats(), {'hits': 2, 'misses': 2, 'evictions': 0, 'size': 1})
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxSize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.getStats()['evictions'], 1)
+
+    def test_ttl(self):
+        cache = LRUCache(ttl=0.1)
+        cache.put('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        time.sleep(0.2)
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(len(cache), 0)
+
+    def test_invalidate(self):
+        cache = LRUCache()
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.invalidate('a')
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(cache.get('b'), 2)
+        cache.invalidate()
+        self.assertEqual(len(cache), 0)
+
+    def test_disabled(self):
+        cache = LRUCache(maxSize=0)
+        cache.put('a', 1)
+        self.assertEqual(cache.get('a'), None)
+
+    def test_max_bytes(self):
+        cache = LRUCache(maxBytes=10)
+        cache.put('a', 'x' * 4)
+        cache.put('b', 'x' * 4)
+        cache.put('a', 'x' * 5)
+        cache.put('c', 'x' * 3)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.getStats()['bytes'], 8)
+        cache.put('d', 'x' * 11)
+        self.assertEqual(cache.get('d'), None)
+        cache.invalidate('a')
+        self.assertEqual(cache.getStats()['bytes'], 3)
+
+
+class FileCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_put(self):
+        cache = FileCache(self.directory)
+        self.assertEqual(cache.get(u'caf\xe9'), None)
+        cache.put(u'caf\xe9', '\x00\xff')
+        cache.put('other', 'value')
+        self.assertEqual(FileCache(self.directory).get(u'caf\xe9'), '\x00\xff')
+        cache.invalidate(u'caf\xe9')
+        self.assertEqual(cache.get(u'caf\xe9'), None)
+        self.assertEqual(cache.get('other'), 'value')
+        cache.invalidate()
+        self.assertEqual(cache.get('other'), None)
+
+    def test_limits(self):
+        cache = FileCache(self.directory, maxEntries=2, maxBytes=10)
+        cache.pruneInterval = 1
+        cache.put('a', 'x' * 4)
+        cache.put('b', 'x' * 4)
+        os.utime(cache._getPath('a'), (100, 100))
+        os.utime(cache._getPath('b'), (200, 200))
+        # reading a makes b the least recently used
+        cache.get('a')
+        cache.put('c', 'x' * 4)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('a'), 'x' * 4)
+        cache.put('c', 'x' * 8)
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(cache.get('c'), 'x' * 8)
+
+
+def conditional(headers, body, etag='"v1"'):
+
+    """
+    Returns a stub server route that answers with body and an ETag, or with
+    a 304 when the request carries that ETag.
+    """
+
+    def route(handler, requestBody):
+        if handler.headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, ''
+        responseHeaders = dict(headers)
+        responseHeaders['ETag'] = etag
+        return 200, responseHeaders, body
+    return route
+
+
+class AtomPubServiceDocumentCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        self.server.routes['/service'] = conditional(SERVICE_HEADERS,
+                                                     atomServiceDocument(self.server.getUrl()))
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def getServiceRequests(self):
+        return [r for r in self.server.requests if r[1].startswith('/service')]
+
+    def test_conditional_get(self):
+        client = CmisClient(self.server.getUrl('/service'), 'admin', 'admin')
+        repo = client.getDefaultRepository()
+        self.assertEqual(repo.getCapabilities()['Query'], 'bothcombined')
+        # unchanged document: same repository object, nothing parsed again
+        self.assertTrue(client.getDefaultRepository() is repo)
+        self.assertTrue(client.getRepository('repo1') is repo)
+        self.assertEqual(client.getRepositories()[0]['repositoryId'], 'repo1')
+        self.assertEqual(len(self.getServiceRequests()), 4)
+        client.invalidateServiceDocument()
+        self.assertFalse(client.getDefaultRepository() is repo)
+
+    def test_changed_document(self):
+        client = CmisClient(self.server.getUrl('/service'), 'admin', 'admin')
+        repo = client.getDefaultRepository()
+        self.server.routes['/service'] = conditional(SERVICE_HEADERS,
+                                                     atomServiceDocument(self.server.getUrl(), 'repo2'),
+                                                     etag='"v2"')
+        self.assertEqual(client.getDefaultRepository().getRepositoryId(), 'repo2')
+        self.assertEqual(repo.getRepositoryId(), 'repo1')
+
+    def test_max_age(self):
+        client = CmisClient(self.server.getUrl('/service'), 'admin', 'admin',
+                            serviceDocumentMaxAge=60)
+        for i in range(3):
+            client.getDefaultRepository()
+        self.assertEqual(len(self.getServiceRequests()), 1)
+
+    def test_file_cache(self):
+        url = self.server.getUrl('/service')
+        client = CmisClient(url, 'admin', 'admin', serviceDocumentMaxAge=60,
+                            serviceDocumentCache=FileCache(self.directory))
+        client.getDefaultRepository()
+        # a new client, as in a new process, starts from the stored copy
+        client = CmisClient(url, 'admin', 'admin', serviceDocumentMaxAge=60,
+                            serviceDocumentCache=FileCache(self.directory))
+        self.assertEqual(client.getDefaultRepository().getRepositoryId(), 'repo1')
+        self.assertEqual(len(self.getServiceRequests()), 1)
+        # and revalidates it once it is too old
+        client = CmisClient(url, 'admin', 'admin',
+                            serviceDocumentCache=FileCache(self.directory))
+        self.assertEqual(client.getDefaultRepository().getRepositoryId(), 'repo1')
+        self.assertEqual(len(self.getServiceRequests()), 2)
+
+
+class BrowserServiceDocumentCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        self.server.routes['/browser'] = conditional(JSON_HEADERS,
+                                                     browserServiceDocument(self.server.getUrl()))
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_conditional_get(self):
+        client = CmisClient(self.server.getUrl('/browser'), 'admin', 'admin',
+                            binding=BrowserBinding())
+        repo = client.getDefaultRepository()
+        self.assertTrue(client.getRepository('repo1') is repo)
+        self.assertEqual(client.getRepositories(),
+                         [{'repositoryId': 'repo1', 'repositoryName': 'Stub Repository'}])
+        self.assertEqual(len(self.server.requests), 3)
+
+
+class AtomPubConditionalReloadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        baseUrl = self.server.getUrl()
+        self.server.routes['/service'] = (200, SERVICE_HEADERS, atomServiceDocument(baseUrl))
+        self.server.routes['/id'] = conditional(ATOM_HEADERS, atomEntry(baseUrl, 'doc', 'doc'))
+        self.client = CmisClient(self.server.getUrl('/service'), 'admin', 'admin')
+        self.repo = self.client.getDefaultRepository()
+
+    def tearDown(self):
+        self.client.connectionPool.clear()
+        self.server.stop()
+
+    def test_reload_unchanged(self):
+        doc = self.repo.getObject('doc')
+        xmlDoc = doc.xmlDoc
+        properties = doc.getProperties()
+        for i in range(3):
+            doc.reload()
+        self.assertTrue(doc.xmlDoc is xmlDoc)
+        self.assertTrue(doc.getProperties() is properties)
+
+    def test_reload_changed(self):
+        doc = self.repo.getObject('doc')
+        self.server.routes['/id'] = conditional(ATOM_HEADERS, atomEntry(self.server.getUrl(), 'doc', 'renamed'),
+                                                etag='"v2"')
+        doc.reload()
+        self.assertEqual(doc.getName(), 'renamed')
+
+    def test_evicted_response(self):
+        doc = self.repo.getObject('doc')
+        self.client.binding.getResponseCache().invalidate()
+        count = len(self.server.requests)
+        doc.reload()
+        self.assertEqual(doc.getName(), 'doc')
+        # no validators are sent, so there is no 304 to retry
+        self.assertEqual(len(self.server.requests), count + 1)
+
+    def test_large_response(self):
+        client = CmisClient(self.server.getUrl('/service'), 'admin', 'admin', responseCacheMaxBytes=100)
+        doc = client.getDefaultRepository().getObject('doc')
+        self.assertEqual(len(client.binding.getResponseCache()), 0)
+        xmlDoc = doc.xmlDoc
+        doc.reload()
+        self.assertFalse(doc.xmlDoc is xmlDoc)
+        client.connectionPool.clear()
+
+    def test_disabled(self):
+        client = CmisClient(self.server.getUrl('/service'), 'admin', 'admin', responseCacheSize=0)
+        doc = client.getDefaultRepository().getObject('doc')
+        xmlDoc = doc.xmlDoc
+        doc.reload()
+        self.assertFalse(doc.xmlDoc is xmlDoc)
+
+
+class BrowserConditionalReloadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        self.server.routes['/browser'] = (200, JSON_HEADERS, browserServiceDocument(self.server.getUrl()))
+        self.server.routes['/browser/root'] = conditional(JSON_HEADERS, json.dumps(browserObject('doc', 'doc')))
+        self.client = CmisClient(self.server.getUrl('/browser'), 'admin', 'admin',
+                                 binding=BrowserBinding())
+
+    def tearDown(self):
+        self.client.connectionPool.clear()
+        self.server.stop()
+
+    def test_reload_unchanged(self):
+        doc = self.client.getDefaultRepository().getObject('doc')
+        data = doc.data
+        properties = doc.getProperties()
+        doc.reload()
+        doc.reload()
+        self.assertTrue(doc.data is data)
+        self.assertTrue(doc.getProperties() is properties)
+
+    def test_users_isolated(self):
+        seen = []
+        route = self.server.routes['/browser/root']
+
+        def recording(handler, body):
+            seen.append((handler.headers.get('Authorization'), handler.headers.get('If-None-Match')))
+            return route(handler, body)
+
+        self.server.routes['/browser/root'] = recording
+        doc = self.client.getDefaultRepository().getObject('doc')
+        other = CmisClient(self.server.getUrl('/browser'), 'bob', 'secret', binding=self.client.binding)
+        otherDoc = other.getDefaultRepository().getObject('doc')
+        # the other user neither sends the first one's ETag nor gets its result
+        self.assertEqual(seen[-1][1], None)
+        self.assertFalse(otherDoc.data is doc.data)
+        otherDoc.reload()
+        self.assertEqual(seen[-1][1], '"v1"')
+
+    def test_shared_binding_kept(self):
+        binding = self.client.binding
+        responseCache = binding.getResponseCache()
+        other = CmisClient(self.server.getUrl('/browser'), 'bob', 'secret', binding=binding)
+        self.assertTrue(binding.getResponseCache() is responseCache)
+        self.assertTrue(other.connectionPool is self.client.connectionPool)
+        CmisClient(self.server.getUrl('/browser'), 'bob', 'secret', binding=binding, responseCacheSize=10)
+        self.assertEqual(binding.getResponseCache().maxSize, 10)
+
+
+class AtomPubTypeCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        baseUrl = self.server.getUrl()
+        self.server.routes['/service'] = (200, SERVICE_HEADERS, atomServiceDocument(baseUrl))
+        self.server.routes['/type'] = lambda handler, body: (
+            200, ATOM_HEADERS, atomTypeEntry(handler.getQuery()['id'], propertyTypes=PROPERTY_TYPES))
+        self.server.routes['/typedescendants'] = (
+            200, ATOM_FEED_HEADERS,
+            atomFeed([atomTypeEntry(typeId, propertyTypes=PROPERTY_TYPES, root=False)
+                      for typeId in ('cmis:document', 'custom:a', 'custom:b')]))
+        self.client = CmisClient(self.server.getUrl('/service'), 'admin', 'admin')
+        self.repo = self.client.getDefaultRepository()
+
+    def tearDown(self):
+        self.client.connectionPool.clear()
+        self.server.stop()
+
+    def getTypeRequests(self):
+        return [r for r in self.server.requests if r[1].startswith('/type?')]
+
+    def test_get_type_definition(self):
+        for i in range(5):
+            self.assertEqual(self.repo.getTypeDefinition('custom:a').getTypeId(), 'custom:a')
+        self.assertEqual(len(self.getTypeRequests()), 1)
+        self.repo.invalidateTypeCache('custom:a')
+        self.repo.getTypeDefinition('custom:a')
+        self.assertEqual(len(self.getTypeRequests()), 2)
+
+    def test_warm_type_cache(self):
+        self.assertEqual(self.repo.warmTypeCache(), 3)
+        self.assertEqual(self.repo.getTypeDefinition('custom:b').getTypeId(), 'custom:b')
+        self.assertEqual(self.getTypeRequests(), [])
+
+    def test_entry_type_lookup(self):
+        properties = {'cmis:objectTypeId': CmisId('custom:a'), 'size': None}
+        for i in range(3):
+            xml = getEntryXmlDoc(self.repo, properties=properties).toxml()
+            self.assertTrue('cmis:propertyInteger propertyDefinitionId="size"' in xml)
+        self.assertEqual(len(self.getTypeRequests()), 1)
+
+    def test_ttl(self):
+        client = CmisClient(self.server.getUrl('/service'), 'admin', 'admin', typeCacheTtl=0)
+        repo = client.getDefaultRepository()
+        repo.getTypeDefinition('custom:a')
+        time.sleep(0.01)
+        repo.getTypeDefinition('custom:a')
+        self.assertEqual(len(self.getTypeRequests()), 2)
+
+
+class BrowserTypeCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        baseUrl = self.server.getUrl()
+
+        def repo(handler, body):
+            query = handler.getQuery()
+            if query['cmisselector'] == 'typeDescendants':
+                return (200, JSON_HEADERS,
+                        json.dumps([{'type': browserType('cmis:document', propertyTypes=PROPERTY_TYPES),
+                                     'children': [{'type': browserType('custom:a')},
+                                                  {'type': browserType('custom:b')}]}]))
+            return 200, JSON_HEADERS, json.dumps(browserType(query['typeId'], propertyTypes=PROPERTY_TYPES))
+
+        self.server.routes['/browser'] = (200, JSON_HEADERS, browserServiceDocument(baseUrl))
+        self.server.routes['/browser/repo'] = repo
+        self.client = CmisClient(self.server.getUrl('/browser'), 'admin', 'admin',
+                                 binding=BrowserBinding())
+        self.repo = self.client.getDefaultRepository()
+
+    def tearDown(self):
+        self.client.connectionPool.clear()
+        self.server.stop()
+
+    def getTypeRequests(self):
+        return [r for r in self.server.requests if 'cmisselector=typeDefinition' in r[1]]
+
+    def test_get_type_definition(self):
+        for i in range(5):
+            self.assertEqual(self.repo.getTypeDefinition('custom:a').getTypeId(), 'custom:a')
+        self.assertEqual(len(self.getTypeRequests()), 1)
+        self.repo.invalidateTypeCache()
+        self.repo.getTypeDefinition('custom:a')
+        self.assertEqual(len(self.getTypeRequests()), 2)
+
+    def test_warm_type_cache(self):
+        self.assertEqual(self.repo.warmTypeCache(), 3)
+        self.assertEqual(self.repo.getTypeDefinition('custom:b').getTypeId(), 'custom:b')
+        self.assertEqual(self.getTypeRequests(), [])
+
+
+class BrowserObjectCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        baseUrl = self.server.getUrl()
+        self.changeToken = '1'
+        self.created = 1262304000000
+
+        def root(handler, body):
+            objectId = handler.getQuery().get('objectId', 'folder')
+            baseTypeId = {'folder': 'cmis:folder', 'policy': 'cmis:policy'}.get(objectId, 'cmis:document')
+            properties = {'cmis:changeToken': ('string', self.changeToken),
+                          'cmis:creationDate': ('datetime', self.created)}
+            if objectId == 'folder':
+                properties['cmis:path'] = ('string', '/shared')
+            return 200, JSON_HEADERS, json.dumps(browserObject(objectId, objectId, baseTypeId, properties,
+                                                               allowableActions={'canGetProperties': True}))
+
+        def repo(handler, body):
+            objects = [{'properties': {'cmis:objectId': {'value': 'doc'}},
+                        'changeEventInfo': {'changeType': 'updated'}}]
+            return 200, JSON_HEADERS, json.dumps({'objects': objects, 'hasMoreItems': False,
+                                                  'changeLogToken': '1'})
+
+        self.server.routes['/browser'] = (200, JSON_HEADERS, browserServiceDocument(baseUrl))
+        self.server.routes['/browser/root'] = root
+        self.server.routes['/browser/root/shared'] = root
+        self.server.routes['/browser/repo'] = repo
+        self.directory = tempfile.mkdtemp()
+        self.objectCache = ObjectCache()
+        self.client = self.getClient(self.objectCache)
+        self.repo = self.client.getDefaultRepository()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        self.client.connectionPool.clear()
+        self.server.stop()
+
+    def getClient(self, objectCache):
+        return CmisClient(self.server.getUrl('/browser'), 'admin', 'admin',
+                          binding=BrowserBinding(), objectCache=objectCache)
+
+    def getObjectRequests(self):
+        return [r for r in self.server.requests if r[1].startswith('/browser/root')]
+
+    def test_get_object(self):
+        doc = self.repo.getObject('doc')
+        self.assertEqual(doc.getAllowableActions(), {'canGetProperties': True})
+        for i in range(3):
+            doc = self.repo.getObject('doc')
+            self.assertEqual(doc.getName(), 'doc')
+            self.assertEqual(doc.getAllowableActions(), {'canGetProperties': True})
+            self.assertEqual(doc.getProperties()['cmis:creationDate'], datetime.datetime.fromtimestamp(1262304000))
+        self.assertEqual(len(self.getObjectRequests()), 1)
+        self.assertEqual(doc.__class__.__name__, 'BrowserDocument')
+        # optional arguments bypass the cache
+        self.repo.getObject('doc', filter='*')
+        self.assertEqual(len(self.getObjectRequests()), 2)
+
+    def test_get_policy(self):
+        self.repo.getObject('policy')
+        policy = self.repo.getObject('policy')
+        self.assertEqual(policy.__class__.__name__, 'BrowserPolicy')
+        self.assertEqual(policy.getName(), 'policy')
+        self.assertEqual(len(self.getObjectRequests()), 1)
+
+    def test_get_object_by_path(self):
+        folder = self.repo.getObjectByPath('/shared')
+        folder = self.repo.getObjectByPath('/shared')
+        self.assertEqual(folder.getObjectId(), 'folder')
+        self.assertEqual(self.repo.getObject('folder').getProperties()['cmis:path'], '/shared')
+        self.assertEqual(len(self.getObjectRequests()), 1)
+        self.objectCache.invalidate(self.repo, 'folder')
+        self.assertEqual(self.objectCache.store.get(self.objectCache._getKey(self.repo, 'path', '/shared')),
+                         None)
+        self.repo.getObjectByPath('/shared')
+        self.assertEqual(len(self.getObjectRequests()), 2)
+
+    def test_change_token(self):
+        doc = self.repo.getObject('doc')
+        doc.reload()
+        self.repo.getObject('doc')
+        self.assertEqual(len(self.getObjectRequests()), 2)
+        self.changeToken = '2'
+        doc.reload()
+        self.assertEqual(self.repo.getObject('doc').getProperties()['cmis:changeToken'], '2')
+        self.assertEqual(len(self.getObjectRequests()), 4)
+
+    def test_update_properties(self):
+        doc = self.repo.getObject('doc')
+        doc.updateProperties({'cmis:name': 'doc'})
+        self.repo.getObject('doc')
+        self.assertEqual(len(self.getObjectRequests()), 3)
+
+    def test_invalidate_changes(self):
+        self.repo.getObject('doc')
+        self.objectCache.invalidateChanges(self.repo, self.repo.getContentChanges(changeLogToken='0'))
+        self.repo.getObject('doc')
+        self.assertEqual(len(self.getObjectRequests()), 2)
+
+    def test_ttl(self):
+        client = self.getClient(ObjectCache(ttl=0))
+        repo = client.getDefaultRepository()
+        repo.getObject('doc')
+        time.sleep(0.01)
+        repo.getObject('doc')
+        self.assertEqual(len(self.getObjectRequests()), 2)
+
+    def test_file_store(self):
+        self.getClient(ObjectCache(FileCache(self.directory))).getDefaultRepository().getObject('doc')
+        doc = self.getClient(ObjectCache(FileCache(self.directory))).getDefaultRepository().getObject('doc')
+        self.assertEqual(doc.getProperties()['cmis:creationDate'], datetime.datetime.fromtimestamp(1262304000))
+        self.assertEqual(doc.getAllowableActions(), {'canGetProperties': True})
+        self.assertEqual(len(self.getObjectRequests()), 1)
+
+    def test_users_isolated(self):
+        objectCache = ObjectCache(FileCache(self.directory))
+        self.getClient(objectCache).getDefaultRepository().getObject('doc')
+        client = CmisClient(self.server.getUrl('/browser'), 'guest', 'guest',
+                            binding=BrowserBinding(), objectCache=objectCache)
+        client.getDefaultRepository().getObject('doc')
+        self.assertEqual(len(self.getObjectRequests()), 2)
+        self.getClient(objectCache).getDefaultRepository().getObject('doc')
+        self.assertEqual(len(self.getObjectRequests()), 2)
+
+    def test_invalidate_repository(self):
+        objectCache = ObjectCache(FileCache(self.directory))
+        repo = self.getClient(objectCache).getDefaultRepository()
+        repo.getObject('doc')
+        guest = CmisClient(self.server.getUrl('/browser'), 'guest', 'guest',
+                           binding=BrowserBinding(), objectCache=objectCache).getDefaultRepository()
+        guest.getObject('doc')
+        objectCache.invalidate(repo)
+        # only the objects of the repository passed in are dropped
+        guest.getObject('doc')
+        self.assertEqual(len(self.getObjectRequests()), 2)
+        repo.getObject('doc')
+        repo.getObject('doc')
+        self.assertEqual(len(self.getObjectRequests()), 3)
+
+
+class AtomPubObjectCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        baseUrl = self.server.getUrl()
+        self.server.routes['/service'] = (200, SERVICE_HEADERS, atomServiceDocument(baseUrl))
+        self.server.routes['/id'] = (200, ATOM_HEADERS, atomEntry(baseUrl, 'doc', 'doc',
+                                                                  allowableActions={'canGetProperties': True}))
+        self.server.routes['/path'] = (200, ATOM_HEADERS, atomFeed([atomEntry(
+            baseUrl, 'folder', 'shared', 'cmis:folder', properties={'cmis:path': ('String', '/shared')},
+            allowableActions={'canGetChildren': True}, root=False)]))
+        self.client = CmisClient(self.server.getUrl('/service'), 'admin', 'admin',
+                                 objectCache=ObjectCache())
+        self.repo = self.client.getDefaultRepository()
+
+    def tearDown(self):
+        self.client.connectionPool.clear()
+        self.server.stop()
+
+    def getObjectRequests(self):
+        return [r for r in self.server.requests if r[1].startswith(('/id', '/path'))]
+
+    def test_get_object(self):
+        for i in range(3):
+            doc = self.repo.getObject('doc')
+            self.assertEqual(doc.getName(), 'doc')
+            self.assertEqual(doc.getAllowableActions(), {'canGetProperties': True})
+        self.assertEqual(len(self.getObjectRequests()), 1)
+        self.assertTrue('includeAllowableActions=true' in self.getObjectRequests()[0][1])
+
+    def test_get_object_by_path(self):
+        for i in range(3):
+            folder = self.repo.getObjectByPath('/shared')
+            self.assertEqual(folder.getAllowableActions(), {'canGetChildren': True})
+        self.assertEqual(folder.__class__.__name__, 'AtomPubFolder')
+        self.assertEqual(self.repo.getObject('folder').getName(), 'shared')
+        self.assertEqual(len(self.getObjectRequests()), 1)
+
+
+if __name__ == "__main__":
+    tts = TestSuite()
+    tts.addTests(TestLoader().loadTestsFromTestCase(LRUCacheTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(FileCacheTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(AtomPubServiceDocumentCacheTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(BrowserServiceDocumentCacheTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(AtomPubConditionalReloadTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(BrowserConditionalReloadTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(AtomPubTypeCacheTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(BrowserTypeCacheTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(BrowserObjectCacheTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(AtomPubObjectCacheTest))
+    unittest.TextTestRunner().run(tts)
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+#
+#      Licensed to the Apache Software Foundation (ASF) under one
+#      or more contributor license agreements.  See the NOTICE file
+#      distributed with this work for additional information
+#      regarding copyright ownership.  The ASF licenses this file
+#      to you under the Apache License, Version 2.0 (the
+#      "License"); you may not use this file except in compliance
+#      with the License.  You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#      Unless required by applicable law or agreed to in writing,
+#      software distributed under the License is distributed on an
+#      "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#      KIND, either express or implied.  See the License for the
+#      specific language governing permissions and limitations
+#      under the License.
+#
+
+
+
+"""
+Unit tests for the change log follower of cmislib.changelog, run against
+a stub server on localhost.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestSuite, TestLoader
+from cmislib import CmisClient
+from cmislib.browser.binding import BrowserBinding
+from cmislib.changelog import ChangeLogFollower, FileCheckpoint
+from stubserver import StubServer, browserServiceDocument, atomServiceDocument, \
+    JSON_HEADERS, SERVICE_HEADERS
+
+
+class ChangeLogFollowerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        baseUrl = self.server.getUrl()
+        # the change with token n is self.changes[n - 1]
+        self.changes = []
+
+        def service(handler, body):
+            info = json.loads(browserServiceDocument(baseUrl))
+            info['repo1']['latestChangeLogToken'] = str(len(self.changes))
+            return 200, JSON_HEADERS, json.dumps(info)
+
+        def contentChanges(handler, body):
+            query = handler.getQuery()
+            start = int(query.get('changeLogToken', 0))
+            end = min(start + int(query['maxItems']), len(self.changes))
+            objects = [{'properties': {'cmis:objectId': {'value': objectId}},
+                        'changeEventInfo': {'changeType': changeType}}
+                       for objectId, changeType in self.changes[start:end]]
+            return 200, JSON_HEADERS, json.dumps({'objects': objects,
+                                                  'hasMoreItems': end < len(self.changes),
+                                                  'changeLogToken': str(end)})
+
+        self.server.routes['/browser'] = service
+        self.server.routes['/browser/repo'] = contentChanges
+        self.client = CmisClient(self.server.getUrl('/browser'), 'admin', 'admin',
+                                 binding=BrowserBinding())
+        self.repo = self.client.getDefaultRepository()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'changes.json')
+        self.batches = []
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        self.client.connectionPool.clear()
+        self.server.stop()
+
+    def handler(self, changes):
+        self.batches.append([(change.objectId, change.changeType) for change in changes])
+
+    def getChangeRequests(self):
+        return [r for r in self.server.requests if 'contentChanges' in r[1]]
+
+    def test_poll(self):
+        self.changes = [('x', 'created')]
+        follower = ChangeLogFollower(self.repo, self.handler, self.path, batchSize=3, pageSize=2)
+        # the first poll starts from the latest token
+        self.assertEqual(follower.poll(), 0)
+        self.assertEqual(FileCheckpoint(self.path).load(), '1')
+        self.changes += [('a', 'created'), ('b', 'created'), ('a', 'updated'), ('c', 'created'),
+                         ('b', 'deleted'), ('d', 'created'), ('e', 'created')]
+        self.assertEqual(follower.poll(), 7)
+        self.assertEqual(self.batches, [[('b', 'created'), ('a', 'updated'), ('c', 'created')],
+                                        [('b', 'deleted'), ('d', 'created'), ('e', 'created')]])
+        self.assertEqual(FileCheckpoint(self.path).load(), '8')
+        self.assertEqual(len(self.getChangeRequests()), 4)
+        # nothing new, so the changes aren't asked for
+        self.assertEqual(follower.poll(), 0)
+        self.assertEqual(len(self.getChangeRequests()), 4)
+
+    def test_from_start(self):
+        self.changes = [('a', 'created'), ('a', 'updated')]
+        follower = ChangeLogFollower(self.repo, self.handler, self.path, fromStart=True)
+        self.assertEqual(follower.poll(), 2)
+        self.assertEqual(self.batches, [[('a', 'updated')]])
+
+    def test_handler_failure(self):
+        FileCheckpoint(self.path).save('0')
+        self.changes = [('a', 'created')]
+
+        def failingHandler(changes):
+            raise ValueError('index down')
+
+        follower = ChangeLogFollower(self.repo, failingHandler, self.path)
+        self.assertRaises(ValueError, follower.poll)
+        self.assertEqual(FileCheckpoint(self.path).load(), '0')
+        follower.handler = self.handler
+        self.assertEqual(follower.poll(), 1)
+        self.assertEqual(self.batches, [[('a', 'created')]])
+
+    def test_checkpoint_per_batch(self):
+        FileCheckpoint(self.path).save('0')
+        self.changes = [('a', 'created'), ('b', 'created'), ('c', 'created'),
+                        ('d', 'created'), ('e', 'created')]
+
+        def failingHandler(changes):
+            if self.batches:
+                raise ValueError('index down')
+            self.handler(changes)
+
+        follower = ChangeLogFollower(self.repo, failingHandler, self.path, batchSize=2, pageSize=2)
+        self.assertRaises(ValueError, follower.poll)
+        # the first batch stays handled
+        self.assertEqual(FileCheckpoint(self.path).load(), '2')
+        follower.handler = self.handler
+        self.assertEqual(follower.poll(), 3)
+        self.assertEqual(self.batches, [[('a', 'created'), ('b', 'created')],
+                                        [('c', 'created'), ('d', 'created')],
+                                        [('e', 'created')]])
+        self.assertEqual(FileCheckpoint(self.path).load(), '5')
+
+    def test_checkpoint(self):
+        checkpoint = FileCheckpoint(self.path)
+        self.assertEqual(checkpoint.load(), None)
+        checkpoint.save('41')
+        checkpoint.save('42')
+        self.assertEqual(checkpoint.load(), '42')
+        self.assertEqual(os.listdir(self.directory), ['changes.json'])
+
+
+
+class AtomPubRepositoryReloadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        baseUrl = self.server.getUrl()
+        second = atomServiceDocument(baseUrl, 'repo2')
+        second = second[second.index('<app:workspace>'):second.index('</app:service>')]
+        self.server.routes['/service'] = (200, SERVICE_HEADERS, atomServiceDocument(baseUrl).replace(
+            '</app:service>', second + '</app:service>'))
+        self.client = CmisClient(self.server.getUrl('/service'), 'admin', 'admin')
+
+    def tearDown(self):
+        self.client.connectionPool.clear()
+        self.server.stop()
+
+    def test_reload_keeps_workspace(self):
+        repo = self.client.getRepository('repo2')
+        repo.reload()
+        self.assertEqual(repo.getRepositoryId(), 'repo2')
+        self.assertEqual(repo.getRepositoryInfo()['latestChangeLogToken'], '0')
+
+
+if __name__ == "__main__":
+    tts = TestSuite()
+    tts.addTests(TestLoader().loadTestsFromTestCase(ChangeLogFollowerTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(AtomPubRepositoryReloadTest))
+    unittest.TextTestRunner().run(tts)
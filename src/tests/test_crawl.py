@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+#
+#      Licensed to the Apache Software Foundation (ASF) under one
+#      or more contributor license agreements.  See the NOTICE file
+#      distributed with this work for additional information
+#      regarding copyright ownership.  The ASF licenses this file
+#      to you under the Apache License, Version 2.0 (the
+#      "License"); you may not use this file except in compliance
+#      with the License.  You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#      Unless required by applicable law or agreed to in writing,
+#      software distributed under the License is distributed on an
+#      "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#      KIND, either express or implied.  See the License for the
+#      specific language governing permissions and limitations
+#      under the License.
+#
+
+
+
+"""
+Unit tests for the folder tree crawler of cmislib.crawl, run against a
+stub server on localhost.
+"""
+
+import unittest
+from unittest import TestSuite, TestLoader
+from cmislib import CmisClient
+from cmislib.crawl import walk
+from cmislib.exceptions import PermissionDeniedException
+from stubserver import StubServer, atomServiceDocument, atomEntry, atomFeed, \
+    ATOM_HEADERS, ATOM_FEED_HEADERS, SERVICE_HEADERS
+
+PAGE_SIZE = 3
+
+# folder id -> (subfolder names, number of documents)
+TREE = {'root': (['a', 'b'], 4),
+        'a': (['c'], 2),
+        'b': ([], 5),
+        'c': (['d'], 1),
+        'd': ([], 1)}
+
+
+def getTreePaths(folderId='root', path=''):
+
+    """ Returns the paths of the descendants of folderId in TREE. """
+
+    folders, docs = TREE[folderId]
+    paths = []
+    for name in folders:
+        paths.append(path + '/' + name)
+        paths.extend(getTreePaths(name, path + '/' + name))
+    paths.extend(['%s/%s-doc-%d' % (path, folderId, i) for i in range(docs)])
+    return paths
+
+
+class WalkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        baseUrl = self.server.getUrl()
+        self.forbidden = set()
+
+        def children(handler, body):
+            query = handler.getQuery()
+            folderId = query['id']
+            if folderId in self.forbidden:
+                return 403, {}, ''
+            folders, docs = TREE[folderId]
+            entries = [atomEntry(baseUrl, name, name, 'cmis:folder', root=False) for name in folders]
+            entries += [atomEntry(baseUrl, '%s-doc-%d' % (folderId, i), '%s-doc-%d' % (folderId, i),
+                                  root=False) for i in range(docs)]
+            skipCount = int(query.get('skipCount', 0))
+            links = {}
+            if skipCount + PAGE_SIZE < len(entries):
+                links['next'] = '%s/children?id=%s&skipCount=%d' % (baseUrl, folderId, skipCount + PAGE_SIZE)
+            return 200, ATOM_FEED_HEADERS, atomFeed(entries[skipCount:skipCount + PAGE_SIZE], links,
+                                                    len(entries))
+
+        self.server.routes['/service'] = (200, SERVICE_HEADERS, atomServiceDocument(baseUrl))
+        self.server.routes['/id'] = (200, ATOM_HEADERS, atomEntry(baseUrl, 'root', 'root', 'cmis:folder'))
+        self.server.routes['/path'] = (200, ATOM_HEADERS, atomEntry(baseUrl, 'a', 'a', 'cmis:folder'))
+        self.server.routes['/children'] = children
+        self.client = CmisClient(self.server.getUrl('/service'), 'admin', 'admin')
+        self.repo = self.client.getDefaultRepository()
+
+    def tearDown(self):
+        self.client.connectionPool.clear()
+        self.server.stop()
+
+    def test_walk(self):
+        pairs = list(self.repo.getRootFolder().walk(path='/', maxWorkers=3))
+        self.assertEqual(sorted([path for path, obj in pairs]), sorted(getTreePaths()))
+        for path, obj in pairs:
+            self.assertEqual(path.split('/')[-1], obj.getName())
+        # every page of every folder was fetched once
+        self.assertEqual(len([r for r in self.server.requests if r[1].startswith('/children')]), 7)
+
+    def test_breadth_first_depth(self):
+        paths = [path for path, obj in self.repo.getRootFolder().walk(path='/', maxWorkers=1, maxDepth=2)]
+        self.assertEqual(sorted(paths), sorted([p for p in getTreePaths() if p.count('/') <= 2]))
+        self.assertTrue(paths.index('/a') < paths.index('/a/c'))
+
+    def test_max_pending(self):
+        paths = [path for path, obj in self.repo.getRootFolder().walk(path='/', maxWorkers=1, maxPending=0)]
+        self.assertEqual(sorted(paths), sorted(getTreePaths()))
+        # past maxPending, the folder found last is listed first
+        self.assertTrue(paths.index('/b/b-doc-0') < paths.index('/a/c'))
+
+    def test_crawl(self):
+        paths = [path for path, obj in self.repo.crawl('/a', filter='cmis:name')]
+        self.assertEqual(sorted(paths), sorted(['/a' + p for p in getTreePaths('a')]))
+        childRequests = [r[1] for r in self.server.requests if r[1].startswith('/children')]
+        self.assertTrue('filter=cmis%3Aname%2Ccmis%3AobjectId' in childRequests[0])
+
+    def test_errors(self):
+        self.forbidden.add('c')
+        self.assertRaises(PermissionDeniedException, list, self.repo.getRootFolder().walk(path='/'))
+        errors = []
+        paths = [path for path, obj in self.repo.getRootFolder().walk(
+            path='/', onError=lambda path, e: errors.append(path))]
+        self.assertEqual(errors, ['/a/c'])
+        self.assertEqual(sorted(paths), sorted([p for p in getTreePaths() if not p.startswith('/a/c/')]))
+
+    def test_worker_failure(self):
+        class Abort(BaseException):
+            pass
+
+        class BrokenFolder(object):
+            def getProperties(self):
+                return {'cmis:path': '/'}
+
+            def getChildren(self, **kwargs):
+                raise Abort()
+
+        # not an Exception, but the crawl still ends with it
+        self.assertRaises(Abort, list, walk(BrokenFolder()))
+
+    def test_close_early(self):
+        walk = self.repo.getRootFolder().walk(path='/', prefetch=1)
+        self.assertEqual(len([walk.next() for i in range(3)]), 3)
+        walk.close()
+
+
+if __name__ == "__main__":
+    tts = TestSuite()
+    tts.addTests(TestLoader().loadTestsFromTestCase(WalkTest))
+    unittest.TextTestRunner().run(tts)
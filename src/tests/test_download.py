@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+#
+#      Licensed to the Apache Software Foundation (ASF) under one
+#      or more contributor license agreements.  See the NOTICE file
+#      distributed with this work for additional information
+#      regarding copyright ownership.  The ASF licenses this file
+#      to you under the Apache License, Version 2.0 (the
+#      "License"); you may not use this file except in compliance
+#      with the License.  You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#      Unless required by applicable law or agreed to in writing,
+#      software distributed under the License is distributed on an
+#      "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#      KIND, either express or implied.  See the License for the
+#      specific language governing permissions and limitations
+#      under the License.
+#
+
+
+
+"""
+Unit tests for the content downloads of cmislib.download, run against a
+stub server on localhost.
+"""
+
+import httplib
+import os
+import tempfile
+import unittest
+from unittest import TestSuite, TestLoader
+from cmislib import CmisClient
+from cmislib.exceptions import CmisException
+from cmislib.net import parseContentRange
+from stubserver import StubServer, atomServiceDocument, atomEntry, serveContent, \
+    ATOM_HEADERS, SERVICE_HEADERS
+
+
+class DownloadToTest(unittest.TestCase):
+
+    def setUp(self):
+        self.content = ''.join([chr(i % 251) for i in range(200000)])
+        self.cuts = 0
+        self.ranges = True
+        self.failAt = None
+        self.overshoot = 0
+
+        def content(handler, body):
+            if not self.ranges:
+                return 200, {}, self.content
+            status, headers, data = serveContent(handler, self.content)
+            if status == 206 and self.overshoot:
+                # send more than the range asked for
+                first, last, total = parseContentRange(headers['Content-Range'])
+                headers['Content-Range'] = 'bytes %d-%d/%d' % (first, last + self.overshoot, total)
+                data += 'x' * self.overshoot
+            first = (parseContentRange(headers.get('Content-Range')) or (0,))[0]
+            if self.failAt is not None and first <= self.failAt < first + len(data):
+                # never get past failAt
+                headers['Content-Length'] = str(len(data))
+                return status, headers, data[:self.failAt - first]
+            if self.cuts:
+                # send part of the content, then drop the connection
+                self.cuts -= 1
+                headers['Content-Length'] = str(len(data))
+                return status, headers, data[:min(50000, len(data) - 1)]
+            return status, headers, data
+
+        self.server = StubServer().start()
+        baseUrl = self.server.getUrl()
+        self.server.routes['/service'] = (200, SERVICE_HEADERS, atomServiceDocument(baseUrl))
+        self.server.routes['/id'] = (200, ATOM_HEADERS, atomEntry(
+            baseUrl, 'doc', 'doc', properties={'cmis:contentStreamLength': ('Integer', len(self.content))}))
+        self.server.routes['/content'] = content
+        self.client = CmisClient(self.server.getUrl('/service'), 'admin', 'admin')
+        self.doc = self.client.getDefaultRepository().getObject('doc')
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+        self.client.connectionPool.clear()
+        self.server.stop()
+
+    def getContentRequests(self):
+        return [r for r in self.server.requests if r[1].startswith('/content')]
+
+    def read(self):
+        f = open(self.path, 'rb')
+        try:
+            return f.read()
+        finally:
+            f.close()
+
+    def test_get_range(self):
+        stream = self.doc.getContentStream(offset=1000, length=10)
+        self.assertEqual(stream.read(), self.content[1000:1010])
+
+    def test_resume(self):
+        f = open(self.path, 'wb')
+        f.write(self.content[:120000])
+        f.close()
+        self.assertEqual(self.doc.downloadTo(self.path), len(self.content))
+        self.assertEqual(self.read(), self.content)
+        self.assertEqual(len(self.getContentRequests()), 1)
+        # a complete file is left alone
+        self.doc.downloadTo(self.path)
+        self.assertEqual(len(self.getContentRequests()), 1)
+
+    def test_resume_complete_unknown_length(self):
+        self.server.routes['/id'] = (200, ATOM_HEADERS, atomEntry(self.server.getUrl(), 'doc', 'doc'))
+        doc = self.client.getDefaultRepository().getObject('doc')
+        f = open(self.path, 'wb')
+        f.write(self.content)
+        f.close()
+        # the server answers 416 with the length of the file as the total
+        self.assertEqual(doc.downloadTo(self.path), len(self.content))
+        self.assertEqual(self.read(), self.content)
+        self.assertEqual(len(self.getContentRequests()), 1)
+        # a file longer than the content is still an error
+        f = open(self.path, 'ab')
+        f.write('x')
+        f.close()
+        self.assertRaises(CmisException, doc.downloadTo, self.path)
+
+    def test_retry_cut_transfer(self):
+        self.cuts = 2
+        self.assertEqual(self.doc.downloadTo(self.path, retryDelay=0), len(self.content))
+        self.assertEqual(self.read(), self.content)
+        self.assertEqual(len(self.getContentRequests()), 3)
+
+    def test_retries_exhausted(self):
+        self.cuts = 3
+        self.assertRaises(httplib.IncompleteRead, self.doc.downloadTo, self.path, maxRetries=1, retryDelay=0)
+        self.assertEqual(self.read(), self.content[:100000])
+
+    def test_no_resume(self):
+        f = open(self.path, 'wb')
+        f.write('x' * 300000)
+        f.close()
+        self.doc.downloadTo(self.path, resume=False)
+        self.assertEqual(self.read(), self.content)
+
+    def test_parallel(self):
+        for useMmap in (False, True):
+            del self.server.requests[:]
+            self.assertEqual(self.doc.downloadTo(self.path, resume=False, parallelThreshold=100000,
+                                                 partSize=30000, useMmap=useMmap), len(self.content))
+            self.assertEqual(self.read(), self.content)
+            self.assertEqual(len(self.getContentRequests()), 7)
+            self.assertFalse(os.path.exists(self.path + '.part'))
+
+    def test_parallel_long_ranges(self):
+        self.overshoot = 100
+        for useMmap in (False, True):
+            self.assertEqual(self.doc.downloadTo(self.path, resume=False, parallelThreshold=100000,
+                                                 partSize=30000, useMmap=useMmap), len(self.content))
+            self.assertEqual(self.read(), self.content)
+
+    def test_parallel_without_ranges(self):
+        self.ranges = False
+        self.assertEqual(self.doc.downloadTo(self.path, resume=False, parallelThreshold=100000,
+                                             partSize=30000), len(self.content))
+        self.assertEqual(self.read(), self.content)
+
+    def test_parallel_failure(self):
+        self.failAt = 60000
+        self.assertRaises(httplib.IncompleteRead, self.doc.downloadTo, self.path, resume=False,
+                          parallelThreshold=100000, partSize=30000, maxRetries=1, retryDelay=0)
+        # the ranges before the failed one are kept, and the rest is resumed
+        self.assertEqual(self.read(), self.content[:60000])
+        self.failAt = None
+        self.assertEqual(self.doc.downloadTo(self.path), len(self.content))
+        self.assertEqual(self.read(), self.content)
+
+
+if __name__ == "__main__":
+    tts = TestSuite()
+    tts.addTests(TestLoader().loadTestsFromTestCase(DownloadToTest))
+    unittest.TextTestRunner().run(tts)
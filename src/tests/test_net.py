@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+#
+#      Licensed to the Apache Software Foundation (ASF) under one
+#      or more contributor license agreements.  See the NOTICE file
+#      distributed with this work for additional information
+#      regarding copyright ownership.  The ASF licenses this file
+#      to you under the Apache License, Version 2.0 (the
+#      "License"); you may not use this file except in compliance
+#      with the License.  You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#      Unless required by applicable law or agreed to in writing,
+#      software distributed under the License is distributed on an
+#      "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#      KIND, either express or implied.  See the License for the
+#      specific language governing permissions and limitations
+#      under the License.
+#
+
+
+"""
+Unit tests for the network layer. These run against a stub server on
+localhost, so no CMIS repository is needed.
+"""
+
+import httplib
+import httplib2
+import StringIO
+import unittest
+from unittest import TestSuite, TestLoader
+from cmislib.net import ConnectionPool, RESTService, getBasicAuthorization, \
+    parseContentRange
+from stubserver import StubServer, serveContent
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = ConnectionPool(maxPerHost=2, idleTimeout=60)
+
+    def test_miss_then_hit(self):
+        http = self.pool.acquire('http://example.com/a')
+        self.pool.release('http://example.com/a', http)
+        again = self.pool.acquire('http://example.com/b?c=d')
+        self.assertEqual(id(http), id(again))
+        stats = self.pool.getStats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['idle'], 0)
+
+    def test_pool_is_keyed_by_host(self):
+        http = self.pool.acquire('http://example.com/a')
+        self.pool.release('http://example.com/a', http)
+        other = self.pool.acquire('https://example.com/a')
+        self.assertNotEqual(id(http), id(other))
+        other = self.pool.acquire('http://example.org/a')
+        self.assertNotEqual(id(http), id(other))
+        self.assertEqual(self.pool.getStats()['misses'], 3)
+
+    def test_max_per_host(self):
+        https = [self.pool.acquire('http://example.com/') for i in range(3)]
+        for http in https:
+            self.pool.release('http://example.com/', http)
+        stats = self.pool.getStats()
+        self.assertEqual(stats['idle'], 2)
+        self.assertEqual(stats['evictions'], 1)
+
+    def test_idle_eviction(self):
+        self.pool.idleTimeout = -1
+        http = self.pool.acquire('http://example.com/')
+        self.pool.release('http://example.com/', http)
+        again = self.pool.acquire('http://example.com/')
+        self.assertNotEqual(id(http), id(again))
+        stats = self.pool.getStats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['hits'], 0)
+
+    def test_clear(self):
+        http = self.pool.acquire('http://example.com/')
+        self.pool.release('http://example.com/', http)
+        self.pool.clear()
+        self.assertEqual(self.pool.getStats()['idle'], 0)
+
+
+class RESTServiceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer({'/hello': (200, {'Content-Type': 'text/plain'}, 'hello')}).start()
+        self.pool = ConnectionPool()
+
+    def tearDown(self):
+        self.pool.clear()
+        self.server.stop()
+
+    def test_connection_reuse(self):
+        rest = RESTService(self.pool)
+        for i in range(5):
+            resp, content = rest.get(self.server.getUrl('/hello'),
+                                     username='admin', password='admin', i=i)
+            self.assertEqual(resp['status'], '200')
+            self.assertEqual(content, 'hello')
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(len(self.server.requests), 5)
+        self.assertEqual(self.pool.getStats()['hits'], 4)
+
+    def test_pool_shared_between_services(self):
+        RESTService(self.pool).get(self.server.getUrl('/hello'))
+        RESTService(self.pool).post(self.server.getUrl('/hello'), 'x', 'text/plain')
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.server.requests[1], ('POST', '/hello', 'x'))
+
+    def test_conditional_get(self):
+        seen = []
+
+        def tagged(handler, body):
+            seen.append(handler.headers.get('If-None-Match'))
+            if seen[-1] == '"1"':
+                return 304, {}, ''
+            return 200, {'ETag': '"1"'}, 'tagged'
+
+        self.server.routes['/tagged'] = tagged
+        rest = RESTService(self.pool)
+        url = self.server.getUrl('/tagged')
+        self.assertEqual(rest.get(url, conditional=True, a=1)[0].status, 200)
+        self.assertEqual(rest.get(url, conditional=True, a=1)[0].status, 304)
+        # validators are per URL, only sent when asked for, and never
+        # override the caller's own
+        self.assertEqual(rest.get(url, conditional=True, a=2)[0].status, 200)
+        self.assertEqual(rest.get(url, a=1)[0].status, 200)
+        self.assertEqual(rest.get(url, conditional=True, a=1,
+                                  headers={'Cache-Control': 'no-cache'})[0].status, 200)
+        self.assertEqual(seen, [None, '"1"', None, None, None])
+
+
+class ContentStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.content = ''.join([chr(i % 256) for i in range(200000)])
+        self.authorizations = []
+
+        def content(handler, body):
+            self.authorizations.append(handler.headers.get('Authorization'))
+            return 200, {'Content-Type': 'application/octet-stream'}, self.content
+
+        self.server = StubServer({'/content': content,
+                                  '/moved': (302, {'Location': '/content'}, 'moved')}).start()
+        self.pool = ConnectionPool()
+        self.rest = RESTService(self.pool)
+
+    def tearDown(self):
+        self.pool.clear()
+        self.server.stop()
+
+    def test_read_in_chunks(self):
+        stream = self.rest.getStream(self.server.getUrl('/content'), 'admin', 'admin')
+        self.assertEqual(stream.status, 200)
+        self.assertEqual(stream.contentType, 'application/octet-stream')
+        self.assertEqual(stream.contentLength, len(self.content))
+        chunks = list(stream.iterChunks(65536))
+        self.assertEqual([len(c) for c in chunks], [65536, 65536, 65536, 3392])
+        self.assertEqual(''.join(chunks), self.content)
+        self.assertEqual(stream.read(), '')
+        stream.close()
+        self.assertEqual(self.authorizations, [getBasicAuthorization('admin', 'admin')])
+
+    def test_readinto_and_copy(self):
+        stream = self.rest.getStream(self.server.getUrl('/content'))
+        buf = bytearray(1000)
+        self.assertEqual(stream.readinto(buf), 1000)
+        self.assertEqual(str(buf), self.content[:1000])
+        out = StringIO.StringIO()
+        self.assertEqual(stream.copyTo(out), len(self.content) - 1000)
+        self.assertEqual(out.getvalue(), self.content[1000:])
+        self.assertEqual(self.authorizations, [None])
+
+    def test_connection_reuse(self):
+        for i in range(3):
+            stream = self.rest.getStream(self.server.getUrl('/content'), i=i)
+            self.assertEqual(len(stream.read()), len(self.content))
+            stream.close()
+        self.assertEqual(self.server.connections, 1)
+        # a stream closed before the end takes its connection with it
+        stream = self.rest.getStream(self.server.getUrl('/content'))
+        stream.read(10)
+        stream.close()
+        self.assertRaises(ValueError, stream.read)
+        stream = self.rest.getStream(self.server.getUrl('/content'))
+        stream.close()
+        self.assertEqual(self.server.connections, 2)
+
+    def test_redirect(self):
+        stream = self.rest.getStream(self.server.getUrl('/moved'), 'admin', 'admin')
+        self.assertEqual(stream.read(), self.content)
+        self.assertEqual([r[1] for r in self.server.requests], ['/moved', '/content'])
+        self.assertEqual(self.server.connections, 1)
+
+
+class RangeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.content = ''.join([chr(i % 256) for i in range(200000)])
+        self.server = StubServer({
+            '/ranged': lambda handler, body: serveContent(handler, self.content),
+            '/whole': (200, {}, self.content),
+            '/cut': (200, {'Content-Length': str(len(self.content))}, self.content[:70000])}).start()
+        self.pool = ConnectionPool()
+        self.rest = RESTService(self.pool)
+
+    def tearDown(self):
+        self.pool.clear()
+        self.server.stop()
+
+    def test_parse_content_range(self):
+        self.assertEqual(parseContentRange('bytes 0-99/100'), (0, 99, 100))
+        self.assertEqual(parseContentRange('bytes 10-19/*'), (10, 19, None))
+        self.assertEqual(parseContentRange(None), None)
+
+    def test_range(self):
+        stream = self.rest.getRange(self.server.getUrl('/ranged'), 1000, 500)
+        self.assertEqual((stream.status, stream.offset, stream.totalLength), (206, 1000, 200000))
+        self.assertEqual(stream.read(), self.content[1000:1500])
+        stream = self.rest.getRange(self.server.getUrl('/ranged'), 150000)
+        self.assertEqual(stream.read(), self.content[150000:])
+        self.assertEqual(self.server.connections, 1)
+
+    def test_range_not_supported(self):
+        stream = self.rest.getRange(self.server.getUrl('/whole'), 1000, 500)
+        self.assertEqual((stream.status, stream.offset, stream.totalLength), (200, 1000, 200000))
+        self.assertEqual(stream.read(100) + stream.read(), self.content[1000:1500])
+        self.assertEqual(stream.read(), '')
+        stream = self.rest.getRange(self.server.getUrl('/whole'), 150000)
+        self.assertEqual(stream.contentLength, 50000)
+        self.assertEqual(stream.read(), self.content[150000:])
+
+    def test_cut_transfer(self):
+        stream = self.rest.getStream(self.server.getUrl('/cut'))
+        out = StringIO.StringIO()
+        self.assertRaises(httplib.IncompleteRead, stream.copyTo, out)
+        self.assertEqual(out.getvalue(), self.content[:70000])
+
+
+class StreamingBodyTest(unittest.TestCase):
+
+    class Body(object):
+
+        def __init__(self, chunks):
+            self.chunks = chunks
+            self.contentLength = sum([len(chunk) for chunk in chunks])
+
+        def __iter__(self):
+            return iter(self.chunks)
+
+    def setUp(self):
+        self.received = []
+
+        def upload(handler, body):
+            self.received.append((handler.headers.get('Content-Length'),
+                                  handler.headers.get('Content-Type'),
+                                  handler.headers.get('Authorization'),
+                                  body))
+            return 201, {'Content-Type': 'application/json'}, '{}'
+
+        self.server = StubServer({'/upload': upload}).start()
+        self.pool = ConnectionPool()
+        self.rest = RESTService(self.pool)
+
+    def tearDown(self):
+        self.pool.clear()
+        self.server.stop()
+
+    def test_post_stream(self):
+        chunks = ['head', 'x' * 100000, 'tail']
+        for i in range(2):
+            resp, content = self.rest.post(self.server.getUrl('/upload'), self.Body(chunks),
+                                           'application/octet-stream', 'admin', 'admin', i=i)
+            self.assertEqual(resp['status'], '201')
+            self.assertEqual(content, '{}')
+        self.assertEqual(self.received[0], ('100008', 'application/octet-stream',
+                                            getBasicAuthorization('admin', 'admin'),
+                                            ''.join(chunks)))
+        self.assertEqual(self.server.requests[1][1], '/upload?i=1')
+        self.assertEqual(self.server.connections, 1)
+
+    def test_dropped_after_body(self):
+        self.rest.post(self.server.getUrl('/upload'), self.Body(['a']), 'text/plain', 'admin', 'admin')
+        self.server.routes['/drop'] = (None, {}, '')
+        # a POST that was sent whole isn't repeated on the new connection
+        self.assertRaises(httplib.HTTPException, self.rest.post, self.server.getUrl('/drop'),
+                          self.Body(['b']), 'text/plain', 'admin', 'admin')
+        self.assertEqual([r[0] for r in self.server.requests], ['POST', 'POST'])
+        # a PUT is, and fails again on the new connection
+        self.rest.post(self.server.getUrl('/upload'), self.Body(['a']), 'text/plain', 'admin', 'admin')
+        self.assertRaises(httplib.HTTPException, self.rest.put, self.server.getUrl('/drop'),
+                          self.Body(['b']), 'text/plain', 'admin', 'admin')
+        self.assertEqual([r[0] for r in self.server.requests], ['POST', 'POST', 'POST', 'PUT', 'PUT'])
+
+
+class ProxyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer({'/content': (200, {}, 'hello'),
+                                  'http://cmis.example/content': (200, {}, 'hello')}).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def getService(self, proxyType):
+        proxyInfo = httplib2.ProxyInfo(proxyType, '127.0.0.1', self.server.server_address[1],
+                                       proxy_user='proxy', proxy_pass='secret')
+        return RESTService(ConnectionPool(proxy_info=proxyInfo))
+
+    def test_tunnel(self):
+        rest = self.getService(3)
+        self.assertEqual(rest.getStream('http://cmis.example/content').read(), 'hello')
+        self.assertEqual(self.server.requests, [('CONNECT', 'cmis.example:80',
+                                                 getBasicAuthorization('proxy', 'secret')),
+                                                ('GET', '/content', '')])
+        rest.connectionPool.clear()
+
+    def test_no_tunnel(self):
+        rest = self.getService(4)
+        self.assertEqual(rest.getStream('http://cmis.example/content').read(), 'hello')
+        self.assertEqual([r[:2] for r in self.server.requests], [('GET', 'http://cmis.example/content')])
+        rest.connectionPool.clear()
+
+    def test_socks(self):
+        # only httplib2 can talk to a SOCKS proxy
+        self.assertFalse(self.getService(2).connectionPool.canUseRaw('http://cmis.example/content'))
+
+
+class DigestAuthTest(unittest.TestCase):
+
+    def setUp(self):
+        self.schemes = []
+
+        def digest(handler, body):
+            authorization = handler.headers.get('Authorization', '')
+            self.schemes.append(authorization.split(' ')[0])
+            if not authorization.startswith('Digest '):
+                return 401, {'WWW-Authenticate': 'Digest realm="cmis", nonce="abc123", qop="auth"'}, ''
+            return 200, {}, body or 'secret'
+
+        self.server = StubServer({'/digest': digest}).start()
+        self.rest = RESTService(ConnectionPool())
+
+    def tearDown(self):
+        self.rest.connectionPool.clear()
+        self.server.stop()
+
+    def test_get_stream(self):
+        stream = self.rest.getStream(self.server.getUrl('/digest'), 'admin', 'admin')
+        self.assertEqual((stream.status, stream.contentLength, stream.read()), (200, 6, 'secret'))
+        self.assertEqual(self.schemes, ['Basic', '', 'Digest'])
+        # the server is known not to take Basic from now on
+        self.assertEqual(self.rest.getStream(self.server.getUrl('/digest'), 'admin', 'admin').read(),
+                         'secret')
+        self.assertEqual(self.schemes[3:], ['', 'Digest'])
+
+    def test_post_stream(self):
+        resp, content = self.rest.post(self.server.getUrl('/digest'), StreamingBodyTest.Body(['a', 'b']),
+                                       'text/plain', 'admin', 'admin')
+        self.assertEqual((resp.status, content), (200, 'ab'))
+        self.assertEqual(self.schemes, ['Basic', '', 'Digest'])
+
+
+if __name__ == "__main__":
+    tts = TestSuite()
+    tts.addTests(TestLoader().loadTestsFromTestCase(ConnectionPoolTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(RESTServiceTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(ContentStreamTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(RangeTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(StreamingBodyTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(ProxyTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(DigestAuthTest))
+    unittest.TextTestRunner().run(tts)
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+#
+#      Licensed to the Apache Software Foundation (ASF) under one
+#      or more contributor license agreements.  See the NOTICE file
+#      distributed with this work for additional information
+#      regarding copyright ownership.  The ASF licenses this file
+#      to you under the Apache License, Version 2.0 (the
+#      "License"); you may not use this file except in compliance
+#      with the License.  You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#      Unless required by applicable law or agreed to in writing,
+#      software distributed under the License is distributed on an
+#      "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#      KIND, either express or implied.  See the License for the
+#      specific language governing permissions and limitations
+#      under the License.
+#
+
+
+"""
+Unit tests for walking every page of a result set, run against a stub
+server on localhost.
+"""
+
+import json
+import re
+import time
+import unittest
+from unittest import TestSuite, TestLoader
+from cmislib import CmisClient
+from cmislib.browser.binding import BrowserBinding
+from cmislib.exceptions import InvalidArgumentException
+from cmislib.util import getSelectColumns
+from stubserver import StubServer, atomServiceDocument, atomEntry, atomFeed, \
+    browserServiceDocument, browserObject, ATOM_FEED_HEADERS, SERVICE_HEADERS, \
+    JSON_HEADERS
+
+TOTAL = 10
+PAGE_SIZE = 3
+
+
+def getPage(handler, body=''):
+
+    """
+    Returns the skipCount asked for, in the query string or in an AtomPub
+    query document, and the object ids on that page.
+    """
+
+    skipCount = int(handler.getQuery().get('skipCount', 0))
+    match = re.search(r'skipCount>(\d+)<', body)
+    if match:
+        skipCount = int(match.group(1))
+    return skipCount, ['doc-%d' % i for i in range(skipCount, min(skipCount + PAGE_SIZE, TOTAL))]
+
+
+class AtomPubPagingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        baseUrl = self.server.getUrl()
+
+        def query(handler, body):
+            skipCount, ids = getPage(handler, body)
+            links = {}
+            if skipCount + PAGE_SIZE < TOTAL:
+                links['next'] = '%s/query?skipCount=%d' % (baseUrl, skipCount + PAGE_SIZE)
+            entries = [atomEntry(baseUrl, objectId, objectId, root=False) for objectId in ids]
+            return 200, ATOM_FEED_HEADERS, atomFeed(entries, links=links, numItems=TOTAL)
+
+        self.server.routes['/service'] = (200, SERVICE_HEADERS, atomServiceDocument(baseUrl))
+        self.server.routes['/query'] = query
+        self.client = CmisClient(self.server.getUrl('/service'), 'admin', 'admin')
+        self.repo = self.client.getDefaultRepository()
+
+    def tearDown(self):
+        self.client.connectionPool.clear()
+        self.server.stop()
+
+    def test_iter_pages(self):
+        rs = self.repo.query('select * from cmis:document')
+        pages = [[obj.getObjectId() for obj in page] for page in rs.iterPages()]
+        self.assertEqual([len(page) for page in pages], [3, 3, 3, 1])
+        self.assertEqual(pages[-1], ['doc-9'])
+        # the result set is left on its own page
+        self.assertEqual(len(rs.getResults()), PAGE_SIZE)
+        self.assertTrue(rs.hasNext())
+
+    def test_iter_all_limit(self):
+        rs = self.repo.query('select * from cmis:document')
+        ids = [obj.getObjectId() for obj in rs.iterAll(limit=5)]
+        self.assertEqual(ids, ['doc-%d' % i for i in range(5)])
+        # pages are only fetched when needed
+        self.assertEqual(len([r for r in self.server.requests if r[1].startswith('/query')]), 2)
+        self.assertEqual(len(list(rs.iterAll())), TOTAL)
+
+    def test_prefetch(self):
+        rs = self.repo.query('select * from cmis:document')
+        pages = rs.iterPages(prefetch=1)
+        pages.next()
+        # the next page gets fetched while the caller holds the first one,
+        # and none beyond it
+        for i in range(50):
+            if len(self.server.requests) > 2:
+                break
+            time.sleep(0.1)
+        time.sleep(0.2)
+        self.assertEqual([r[1] for r in self.server.requests[2:]],
+                         ['/query?skipCount=3'])
+        self.assertEqual([obj.getObjectId() for page in pages for obj in page],
+                         ['doc-%d' % i for i in range(3, TOTAL)])
+
+    def test_iter_query(self):
+        ids = [obj.getObjectId() for obj in
+               self.repo.iterQuery('select * from cmis:document', pageSize=PAGE_SIZE, maxWorkers=3)]
+        self.assertEqual(ids, ['doc-%d' % i for i in range(TOTAL)])
+        posts = [r[2] for r in self.server.requests if r[0] == 'POST']
+        self.assertEqual(len(posts), 4)
+        self.assertEqual(sorted([int(re.search(r'skipCount>(\d+)<', body).group(1)) for body in posts]),
+                         [0, 3, 6, 9])
+
+    def test_iter_query_capped(self):
+        # the server returns PAGE_SIZE results at most, fewer than asked for
+        ids = [obj.getObjectId() for obj in
+               self.repo.iterQuery('select * from cmis:document', pageSize=5, maxWorkers=2)]
+        self.assertEqual(ids, ['doc-%d' % i for i in range(TOTAL)])
+        posts = [r[2] for r in self.server.requests if r[0] == 'POST']
+        self.assertEqual(sorted([int(re.search(r'skipCount>(\d+)<', body).group(1)) for body in posts]),
+                         [0, 3, 5, 8])
+
+
+    def test_query_rows(self):
+        q = 'select d.cmis:objectId as id, cmis:name from cmis:document d'
+        rows = list(self.repo.query(q, rowFormat='tuple'))
+        self.assertEqual(rows, [('doc-%d' % i, 'doc-%d' % i) for i in range(PAGE_SIZE)])
+        rows = list(self.repo.query(q, rowFormat='dict', skipCount='9'))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['cmis:objectId'], 'doc-9')
+        self.assertEqual(rows[0]['cmis:baseTypeId'], 'cmis:document')
+        self.assertRaises(InvalidArgumentException, self.repo.query,
+                          'select * from cmis:document', rowFormat='tuple')
+        self.assertRaises(InvalidArgumentException, self.repo.query, q, rowFormat='list')
+
+    def test_select_columns(self):
+        self.assertEqual(getSelectColumns('SELECT cmis:objectId,D.cmis:name N, SCORE() AS s\nFROM cmis:document D'),
+                         ['cmis:objectId', 'cmis:name', 'SCORE()'])
+        self.assertEqual(getSelectColumns('select d.* from cmis:document d'), None)
+
+
+class BrowserPagingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        baseUrl = self.server.getUrl()
+
+        def query(handler, body):
+            skipCount, ids = getPage(handler)
+            return (200, JSON_HEADERS,
+                    json.dumps({'results': [browserObject(objectId, objectId) for objectId in ids],
+                                'hasMoreItems': skipCount + PAGE_SIZE < TOTAL,
+                                'numItems': TOTAL}))
+
+        def root(handler, body):
+            if handler.getQuery().get('cmisselector') == 'children':
+                skipCount, ids = getPage(handler)
+                return (200, JSON_HEADERS,
+                        json.dumps({'objects': [{'object': browserObject(objectId, objectId)}
+                                                for objectId in ids],
+                                    'hasMoreItems': skipCount + PAGE_SIZE < TOTAL,
+                                    'numItems': TOTAL}))
+            return 200, JSON_HEADERS, json.dumps(browserObject('root', 'root', 'cmis:folder'))
+
+        self.server.routes['/browser'] = (200, JSON_HEADERS, browserServiceDocument(baseUrl))
+        self.server.routes['/browser/repo'] = query
+        self.server.routes['/browser/root'] = root
+        self.client = CmisClient(self.server.getUrl('/browser'), 'admin', 'admin',
+                                 binding=BrowserBinding())
+        self.repo = self.client.getDefaultRepository()
+
+    def tearDown(self):
+        self.client.connectionPool.clear()
+        self.server.stop()
+
+    def test_query_iter_pages(self):
+        rs = self.repo.query('select * from cmis:document', maxItems=PAGE_SIZE)
+        pages = [[obj.getObjectId() for obj in page] for page in rs.iterPages()]
+        self.assertEqual([len(page) for page in pages], [3, 3, 3, 1])
+        self.assertEqual(sum(pages, []), ['doc-%d' % i for i in range(TOTAL)])
+        posts = [r for r in self.server.requests if r[0] == 'POST']
+        self.assertTrue('skipCount=9' in posts[-1][1])
+        self.assertTrue('maxItems=3' in posts[-1][1])
+
+    def test_children_iter_all_limit(self):
+        folder = self.repo.getRootFolder()
+        rs = folder.getChildren()
+        ids = [obj.getObjectId() for obj in rs.iterAll(limit=4)]
+        self.assertEqual(ids, ['doc-%d' % i for i in range(4)])
+        ids = [obj.getObjectId() for obj in rs.iterAll(prefetch=2)]
+        self.assertEqual(ids, ['doc-%d' % i for i in range(TOTAL)])
+
+    def test_iter_query(self):
+        ids = [obj.getObjectId() for obj in
+               self.repo.iterQuery('select * from cmis:document', pageSize=PAGE_SIZE, maxWorkers=3)]
+        self.assertEqual(ids, ['doc-%d' % i for i in range(TOTAL)])
+        # the windows were addressed directly instead of one after the other
+        self.assertEqual(len([r for r in self.server.requests if r[0] == 'POST']), 4)
+
+    def test_iter_query_capped(self):
+        # the server returns PAGE_SIZE results at most, fewer than asked for
+        ids = [obj.getObjectId() for obj in
+               self.repo.iterQuery('select * from cmis:document', pageSize=5, maxWorkers=2)]
+        self.assertEqual(ids, ['doc-%d' % i for i in range(TOTAL)])
+        self.assertEqual(len([r for r in self.server.requests if r[0] == 'POST']), 4)
+
+    def test_query_rows(self):
+        q = 'select cmis:name, cmis:objectId from cmis:document'
+        rows = list(self.repo.query(q, rowFormat='tuple', maxItems=PAGE_SIZE, skipCount=3))
+        self.assertEqual(rows, [('doc-%d' % i, 'doc-%d' % i) for i in range(3, 6)])
+        rows = list(self.repo.query(q, rowFormat='dict', skipCount=9))
+        self.assertEqual(rows, [{'cmis:objectId': 'doc-9', 'cmis:name': 'doc-9',
+                                 'cmis:baseTypeId': 'cmis:document',
+                                 'cmis:objectTypeId': 'cmis:document',
+                                 'cmis:changeToken': '1'}])
+
+    def test_get_next_and_first(self):
+        rs = self.repo.getRootFolder().getChildren()
+        self.assertEqual([obj.getObjectId() for obj in rs.getNext()], ['doc-3', 'doc-4', 'doc-5'])
+        self.assertEqual(rs.getResults()[0].getObjectId(), 'doc-3')
+        self.assertEqual(rs.getFirst()[0].getObjectId(), 'doc-0')
+
+
+if __name__ == "__main__":
+    tts = TestSuite()
+    tts.addTests(TestLoader().loadTestsFromTestCase(AtomPubPagingTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(BrowserPagingTest))
+    unittest.TextTestRunner().run(tts)
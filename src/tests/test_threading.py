@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+#
+#      Licensed to the Apache Software Foundation (ASF) under one
+#      or more contributor license agreements.  See the NOTICE file
+#      distributed with this work for additional information
+#      regarding copyright ownership.  The ASF licenses this file
+#      to you under the Apache License, Version 2.0 (the
+#      "License"); you may not use this file except in compliance
+#      with the License.  You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#      Unless required by applicable law or agreed to in writing,
+#      software distributed under the License is distributed on an
+#      "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#      KIND, either express or implied.  See the License for the
+#      specific language governing permissions and limitations
+#      under the License.
+#
+
+
+"""
+Stress tests that share one CmisClient between many threads. They run
+against a stub server on localhost, so no CMIS repository is needed.
+"""
+
+import json
+import threading
+import unittest
+from unittest import TestSuite, TestLoader
+from cmislib import CmisClient
+from cmislib.browser.binding import BrowserBinding
+from cmislib.net import ConnectionPool
+from stubserver import StubServer, atomServiceDocument, atomEntry, \
+    browserServiceDocument, browserObject, ATOM_HEADERS, SERVICE_HEADERS, \
+    JSON_HEADERS
+
+THREADS = 16
+ITERATIONS = 25
+
+
+def runThreads(target):
+
+    """
+    Runs target(threadNumber) in THREADS threads at once and returns the
+    exceptions they raised.
+    """
+
+    errors = []
+    start = threading.Event()
+
+    def run(number):
+        start.wait()
+        try:
+            target(number)
+        except Exception, e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    start.set()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+class AtomPubThreadSafetyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        baseUrl = self.server.getUrl()
+        self.server.routes['/service'] = (200, SERVICE_HEADERS, atomServiceDocument(baseUrl))
+        self.server.routes['/id'] = lambda handler, body: (
+            200, ATOM_HEADERS,
+            atomEntry(baseUrl, handler.getQuery()['id'], 'name-' + handler.getQuery()['id'],
+                      allowableActions={'canGetProperties': True}))
+        self.client = CmisClient(self.server.getUrl('/service'), 'admin', 'admin',
+                                 connectionPool=ConnectionPool(maxPerHost=THREADS))
+
+    def tearDown(self):
+        self.client.connectionPool.clear()
+        self.server.stop()
+
+    def test_shared_client(self):
+        repo = self.client.getDefaultRepository()
+        shared = repo.getObject('shared')
+
+        def work(number):
+            for i in range(ITERATIONS):
+                if number % 4 == 0:
+                    repo.reload()
+                    shared.reload()
+                self.assertEqual(self.client.getDefaultRepository().getRepositoryId(), 'repo1')
+                self.assertEqual(repo.getCapabilities()['Query'], 'bothcombined')
+                self.assertTrue('objectbyid' in repo.getUriTemplates())
+                self.assertEqual(repo.getRepositoryInfo()['rootFolderId'], 'root')
+                objectId = 'obj-%d-%d' % (number, i)
+                obj = repo.getObject(objectId)
+                self.assertEqual(obj.getName(), 'name-' + objectId)
+                self.assertEqual(shared.getProperties()['cmis:name'], 'name-shared')
+                self.assertTrue(shared.getAllowableActions()['canGetProperties'])
+
+        self.assertEqual(runThreads(work), [])
+        self.assertTrue(self.server.connections <= THREADS)
+        self.assertTrue(self.client.connectionPool.getStats()['hits'] > 0)
+
+
+class BrowserThreadSafetyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        baseUrl = self.server.getUrl()
+        self.server.routes['/browser'] = (200, JSON_HEADERS, browserServiceDocument(baseUrl))
+
+        def getObject(handler, body):
+            objectId = handler.getQuery()['objectId']
+            return (200, JSON_HEADERS,
+                    json.dumps(browserObject(objectId, 'name-' + objectId,
+                                             allowableActions={'canGetProperties': True})))
+
+        self.server.routes['/browser/root'] = getObject
+        self.client = CmisClient(self.server.getUrl('/browser'), 'admin', 'admin',
+                                 binding=BrowserBinding(),
+                                 connectionPool=ConnectionPool(maxPerHost=THREADS))
+
+    def tearDown(self):
+        self.client.connectionPool.clear()
+        self.server.stop()
+
+    def test_shared_client(self):
+        repo = self.client.getDefaultRepository()
+        shared = repo.getObject('shared')
+
+        def work(number):
+            for i in range(ITERATIONS):
+                if number % 4 == 0:
+                    shared.reload()
+                self.assertEqual(self.client.getRepository('repo1').getRepositoryId(), 'repo1')
+                self.assertEqual(repo.getCapabilities()['Query'], 'bothcombined')
+                objectId = 'obj-%d-%d' % (number, i)
+                obj = repo.getObject(objectId)
+                self.assertEqual(obj.getName(), 'name-' + objectId)
+                self.assertEqual(shared.getProperties()['cmis:name'], 'name-shared')
+
+        self.assertEqual(runThreads(work), [])
+        self.assertTrue(self.server.connections <= THREADS)
+
+
+if __name__ == "__main__":
+    tts = TestSuite()
+    tts.addTests(TestLoader().loadTestsFromTestCase(AtomPubThreadSafetyTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(BrowserThreadSafetyTest))
+    unittest.TextTestRunner().run(tts)
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+#
+#      Licensed to the Apache Software Foundation (ASF) under one
+#      or more contributor license agreements.  See the NOTICE file
+#      distributed with this work for additional information
+#      regarding copyright ownership.  The ASF licenses this file
+#      to you under the Apache License, Version 2.0 (the
+#      "License"); you may not use this file except in compliance
+#      with the License.  You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#      Unless required by applicable law or agreed to in writing,
+#      software distributed under the License is distributed on an
+#      "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+#      KIND, either express or implied.  See the License for the
+#      specific language governing permissions and limitations
+#      under the License.
+#
+
+
+"""
+Unit tests for the worker pool and the thread-pool client. The client
+tests run against a stub server on localhost.
+"""
+
+import threading
+import time
+import unittest
+from unittest import TestSuite, TestLoader
+from cmislib import AsyncCmisClient
+from cmislib.exceptions import CmisException, ObjectNotFoundException
+from cmislib.workers import WorkerPool, readAhead
+from stubserver import StubServer, atomServiceDocument, atomEntry, \
+    ATOM_HEADERS, SERVICE_HEADERS
+
+
+class WorkerPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = WorkerPool(maxWorkers=3)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_result(self):
+        futures = [self.pool.submit(pow, i, 2) for i in range(10)]
+        self.assertEqual([f.result() for f in futures], [i * i for i in range(10)])
+        self.assertTrue(futures[0].done())
+
+    def test_exception(self):
+        future = self.pool.submit(int, 'not a number')
+        self.assertRaises(ValueError, future.result)
+        self.assertTrue(isinstance(future.exception(), ValueError))
+
+    def test_callback(self):
+        called = threading.Event()
+        results = []
+
+        def callback(future):
+            results.append(future.result())
+            called.set()
+
+        self.pool.submit(len, 'abc').addCallback(callback)
+        called.wait(5)
+        self.assertEqual(results, [3])
+        # callbacks on a finished future run right away
+        future = self.pool.submit(len, 'ab')
+        future.result()
+        future.addCallback(callback)
+        self.assertEqual(results, [3, 2])
+
+    def test_bounded_concurrency(self):
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def work():
+            lock.acquire()
+            running[0] += 1
+            running[1] = max(running)
+            lock.release()
+            time.sleep(0.01)
+            lock.acquire()
+            running[0] -= 1
+            lock.release()
+
+        futures = [self.pool.submit(work) for i in range(20)]
+        for future in futures:
+            future.result()
+        self.assertTrue(running[1] <= 3)
+        self.assertTrue(len(self.pool._threads) <= 3)
+
+    def test_map(self):
+        def slow(i):
+            time.sleep((10 - i) * 0.01)
+            return i * i
+        self.assertEqual(list(self.pool.map(slow, range(10), maxPending=4)),
+                         [i * i for i in range(10)])
+
+    def test_timeout(self):
+        event = threading.Event()
+        future = self.pool.submit(event.wait)
+        self.assertRaises(CmisException, future.result, 0.01)
+        event.set()
+
+    def test_shutdown(self):
+        self.pool.shutdown()
+        self.assertRaises(RuntimeError, self.pool.submit, len, 'a')
+
+
+class ReadAheadTest(unittest.TestCase):
+
+    def test_order(self):
+        self.assertEqual(list(readAhead(iter(range(20)), depth=3)), range(20))
+
+    def test_runs_ahead(self):
+        produced = []
+        ready = threading.Event()
+
+        def produce():
+            for i in range(10):
+                produced.append(i)
+                if len(produced) == 3:
+                    ready.set()
+                yield i
+
+        items = readAhead(produce(), depth=2)
+        self.assertEqual(items.next(), 0)
+        ready.wait(5)
+        time.sleep(0.2)
+        # two items queued and none beyond them
+        self.assertEqual(len(produced), 3)
+        self.assertEqual(list(items), range(1, 10))
+
+    def test_exception(self):
+        def produce():
+            yield 1
+            raise ObjectNotFoundException('gone')
+
+        items = readAhead(produce())
+        self.assertEqual(items.next(), 1)
+        self.assertRaises(ObjectNotFoundException, items.next)
+
+    def test_close(self):
+        produced = []
+
+        def produce():
+            for i in range(1000):
+                produced.append(i)
+                yield i
+
+        items = readAhead(produce(), depth=1)
+        items.next()
+        items.close()
+        time.sleep(1.5)
+        self.assertTrue(len(produced) < 5)
+
+
+class AsyncCmisClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().start()
+        baseUrl = self.server.getUrl()
+        self.server.routes['/service'] = (200, SERVICE_HEADERS, atomServiceDocument(baseUrl))
+        self.server.routes['/id'] = lambda handler, body: (
+            200, ATOM_HEADERS,
+            atomEntry(baseUrl, handler.getQuery()['id'], 'name-' + handler.getQuery()['id']))
+        self.server.routes['/path'] = lambda handler, body: (
+            200, ATOM_HEADERS,
+            atomEntry(baseUrl, 'by-path', handler.getQuery()['path'].split('/')[-1]))
+        self.server.routes['/content'] = (200, {'Content-Type': 'text/plain'}, 'some content')
+        self.client = AsyncCmisClient(self.server.getUrl('/service'), 'admin', 'admin', maxWorkers=4)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_get_objects(self):
+        repo = self.client.getDefaultRepository().result()
+        futures = [self.client.getObject(repo, 'obj-%d' % i) for i in range(20)]
+        self.assertEqual([f.result().getName() for f in futures],
+                         ['name-obj-%d' % i for i in range(20)])
+        self.assertTrue(self.server.connections <= 4)
+
+    def test_get_object_by_path_and_content(self):
+        repo = self.client.getRepository('repo1').result()
+        doc = self.client.getObjectByPath(repo, '/folder/sample.txt').result()
+        self.assertEqual(doc.getName(), 'sample.txt')
+        stream = self.client.getContentStream(doc).result()
+        self.assertEqual(stream.read(), 'some content')
+
+    def test_error(self):
+        future = self.client.getRepository('unknown')
+        self.assertRaises(ObjectNotFoundException, future.result)
+
+
+if __name__ == "__main__":
+    tts = TestSuite()
+    tts.addTests(TestLoader().loadTestsFromTestCase(WorkerPoolTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(ReadAheadTest))
+    tts.addTests(TestLoader().loadTestsFromTestCase(AsyncCmisClientTest))
+    unittest.TextTestRunner().run(tts)